@@ -172,8 +172,10 @@ if [ "$FILETYPE" = "wgp" ]; then
     # Nettoyer le dossier de montage
     rm -rf "$MOUNT_BASE"
 elif [ "$FILETYPE" = "lgp" ]; then
-    # Pour les .lgp : extraire directement le fichier .icon.png avec unsquashfs
-    unsquashfs -cat "$EXE_PATH" ".icon.png" > "$ICON_PATH" 2>/dev/null
+    # Pour les .lgp : lire directement le fichier .icon.png dans l'image (unsquashfs en secours)
+    if ! /usr/share/ublue-os/gablue/scripts/squashfsreader.py "$EXE_PATH" cat ".icon.png" > "$ICON_PATH" 2>/dev/null; then
+        unsquashfs -cat "$EXE_PATH" ".icon.png" > "$ICON_PATH" 2>/dev/null
+    fi
 else
     # Pour les .exe : extraction avec exeiconextract.py
     python3 "$EXEICONEXTRACT" "$EXE_PATH" "$ICON_PATH" 2>/dev/null
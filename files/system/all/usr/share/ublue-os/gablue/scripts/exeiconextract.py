@@ -5,13 +5,24 @@ exeiconextract.py - Extract icon from Windows EXE to PNG
 Based on KDE's thumbnailer code for Windows executables.
 Parses the PE file format directly to extract icons correctly.
 
+The executable is memory-mapped, never read whole: only the DOS/PE headers,
+the section table, the resource directory and the icon data pages are
+touched, so extraction time and memory do not grow with the exe size.
+
+Importable: extract_icons(path or buffer) returns the icon frames,
+best_icon() the largest one (IconInfo.data is a standalone .ico file).
+
 Usage: python3 exeiconextract.py <input.exe> <output.png>
 """
 
+import mmap
+import os
 import struct
 import sys
 from typing import List, Dict, Optional, Tuple
 
+import icodecode
+
 
 class IconInfo:
     """Information about an extracted icon"""
@@ -22,40 +33,42 @@ class IconInfo:
         self.data = data
 
 
-def extract_icon_from_exe(data: bytes) -> List[IconInfo]:
+def extract_icon_from_exe(data) -> List[IconInfo]:
     """
     Extract all icons from a Windows PE executable.
+    data is any buffer (bytes, mmap, memoryview): fields are read in place
+    with struct.unpack_from, only the selected icon data is copied.
     Returns a list of IconInfo objects.
     """
     # Parse DOS header
     if len(data) < 64 or data[0:2] != b'MZ':
         return []
 
-    pe_offset = struct.unpack('<I', data[60:64])[0]
+    pe_offset = struct.unpack_from('<I', data, 60)[0]
 
     # Check PE signature
     if len(data) < pe_offset + 4 or data[pe_offset:pe_offset+4] != b'PE\0\0':
         return []
 
     # Get PE type (PE32 vs PE32+)
-    num_sections = struct.unpack('<H', data[pe_offset+6:pe_offset+8])[0]
-    optional_header_size = struct.unpack('<H', data[pe_offset+20:pe_offset+22])[0]
-    opt_magic = struct.unpack('<H', data[pe_offset+24:pe_offset+26])[0]
+    num_sections = struct.unpack_from('<H', data, pe_offset+6)[0]
+    optional_header_size = struct.unpack_from('<H', data, pe_offset+20)[0]
+    opt_magic = struct.unpack_from('<H', data, pe_offset+24)[0]
 
     is_pe32_plus = (opt_magic == 0x020b)
 
     # Build section lookup table
     section_table_offset = pe_offset + 24 + optional_header_size
-    sections: List[Tuple[int, int, int]] = []  # (VA, virtual_size, raw_offset)
+    sections: List[Tuple[int, int, int, int]] = []  # (VA, virtual_size, raw_size, raw_offset)
 
     for i in range(num_sections):
         offset = section_table_offset + i * 40
         if offset + 40 > len(data):
             break
-        virtual_address = struct.unpack('<I', data[offset+12:offset+16])[0]
-        virtual_size = struct.unpack('<I', data[offset+8:offset+12])[0]
-        size_of_raw_data = struct.unpack('<I', data[offset+16:offset+20])[0]
-        pointer_to_raw_data = struct.unpack('<I', data[offset+20:offset+24])[0]
+        virtual_address = struct.unpack_from('<I', data, offset+12)[0]
+        virtual_size = struct.unpack_from('<I', data, offset+8)[0]
+        size_of_raw_data = struct.unpack_from('<I', data, offset+16)[0]
+        pointer_to_raw_data = struct.unpack_from('<I', data, offset+20)[0]
         sections.append((virtual_address, virtual_size, size_of_raw_data, pointer_to_raw_data))
 
     def rva_to_offset(rva: int) -> int:
@@ -77,7 +90,7 @@ def extract_icon_from_exe(data: bytes) -> List[IconInfo]:
     if data_dir_offset + 8 > len(data):
         return []
 
-    resource_va = struct.unpack('<I', data[data_dir_offset:data_dir_offset+4])[0]
+    resource_va = struct.unpack_from('<I', data, data_dir_offset)[0]
     if resource_va == 0:
         return []
 
@@ -98,8 +111,8 @@ def extract_icon_from_exe(data: bytes) -> List[IconInfo]:
         if base_offset + 16 > len(data):
             return []
 
-        num_name_entries = struct.unpack('<H', data[base_offset + 12:base_offset + 14])[0]
-        num_id_entries = struct.unpack('<H', data[base_offset + 14:base_offset + 16])[0]
+        num_name_entries = struct.unpack_from('<H', data, base_offset + 12)[0]
+        num_id_entries = struct.unpack_from('<H', data, base_offset + 14)[0]
         total_entries = num_name_entries + num_id_entries
 
         entries = []
@@ -111,9 +124,9 @@ def extract_icon_from_exe(data: bytes) -> List[IconInfo]:
                 break
 
             # First uint32: resourceId (or name RVA for name entries)
-            resource_id = struct.unpack('<I', data[entry_offset:entry_offset + 4])[0]
+            resource_id = struct.unpack_from('<I', data, entry_offset)[0]
             # Second uint32: offset (with or without high bit)
-            offset = struct.unpack('<I', data[entry_offset + 4:entry_offset + 8])[0]
+            offset = struct.unpack_from('<I', data, entry_offset + 4)[0]
 
             entries.append((resource_id, offset))
 
@@ -161,8 +174,8 @@ def extract_icon_from_exe(data: bytes) -> List[IconInfo]:
 
                 data_entry_abs = resource_offset + data_offset_raw
                 if data_entry_abs + 16 <= len(data):
-                    data_va = struct.unpack('<I', data[data_entry_abs:data_entry_abs + 4])[0]
-                    data_size = struct.unpack('<I', data[data_entry_abs + 4:data_entry_abs + 8])[0]
+                    data_va = struct.unpack_from('<I', data, data_entry_abs)[0]
+                    data_size = struct.unpack_from('<I', data, data_entry_abs + 4)[0]
 
                     if type_id == 3:  # Icon
                         # Use resource_id from level 2 as the key (like KDE)
@@ -182,8 +195,8 @@ def extract_icon_from_exe(data: bytes) -> List[IconInfo]:
     if group_offset + 6 > len(data):
         return []
 
-    type_val = struct.unpack('<H', data[group_offset + 2:group_offset + 4])[0]
-    num_icons = struct.unpack('<H', data[group_offset + 4:group_offset + 6])[0]
+    type_val = struct.unpack_from('<H', data, group_offset + 2)[0]
+    num_icons = struct.unpack_from('<H', data, group_offset + 4)[0]
 
     if type_val != 1 or num_icons == 0:
         return []
@@ -208,18 +221,18 @@ def extract_icon_from_exe(data: bytes) -> List[IconInfo]:
         # For 14-byte format: w(1), h(1), color(1), reserved(1), planes(2), bpp(2), [corrupted size], id(2)
         # For 16-byte format: w(1), h(1), color(1), reserved(1), planes(2), bpp(2), size(4), id(2)
         if entry_size == 14:
-            width = struct.unpack('B', data[entry_offset:entry_offset + 1])[0]
-            height = struct.unpack('B', data[entry_offset + 1:entry_offset + 2])[0]
-            color_count = struct.unpack('B', data[entry_offset + 2:entry_offset + 3])[0]
+            width = struct.unpack_from('B', data, entry_offset)[0]
+            height = struct.unpack_from('B', data, entry_offset + 1)[0]
+            color_count = struct.unpack_from('B', data, entry_offset + 2)[0]
             # Size field is at offset 8 (4 bytes) but may be corrupted
-            resource_id = struct.unpack('<H', data[entry_offset + 12:entry_offset + 14])[0]
+            resource_id = struct.unpack_from('<H', data, entry_offset + 12)[0]
         else:  # 16-byte format
-            width = struct.unpack('B', data[entry_offset:entry_offset + 1])[0]
-            height = struct.unpack('B', data[entry_offset + 1:entry_offset + 2])[0]
-            color_count = struct.unpack('B', data[entry_offset + 2:entry_offset + 3])[0]
-            planes = struct.unpack('<H', data[entry_offset + 4:entry_offset + 6])[0]
-            bpp = struct.unpack('<H', data[entry_offset + 6:entry_offset + 8])[0]
-            resource_id = struct.unpack('<H', data[entry_offset + 14:entry_offset + 16])[0]
+            width = struct.unpack_from('B', data, entry_offset)[0]
+            height = struct.unpack_from('B', data, entry_offset + 1)[0]
+            color_count = struct.unpack_from('B', data, entry_offset + 2)[0]
+            planes = struct.unpack_from('<H', data, entry_offset + 4)[0]
+            bpp = struct.unpack_from('<H', data, entry_offset + 6)[0]
+            resource_id = struct.unpack_from('<H', data, entry_offset + 14)[0]
             actual_bpp = bpp if bpp > 0 else 32
             planes = planes if planes > 0 else 1
 
@@ -234,7 +247,7 @@ def extract_icon_from_exe(data: bytes) -> List[IconInfo]:
             icon_data_offset = rva_to_offset(icon_va)
 
             if icon_data_offset >= 0 and icon_data_offset + icon_size <= len(data):
-                icon_data = data[icon_data_offset:icon_data_offset + icon_size]
+                icon_data = bytes(data[icon_data_offset:icon_data_offset + icon_size])
 
                 # Build a proper .ico file
                 # .ico format: header (6 bytes) + entries (16 bytes each) + icon data
@@ -253,9 +266,45 @@ def extract_icon_from_exe(data: bytes) -> List[IconInfo]:
     return icons
 
 
+def extract_icons(source) -> List[IconInfo]:
+    """
+    Extract all icons from an executable given as a path or a buffer.
+    A path is memory-mapped for the duration of the call only: the returned
+    frames own their data. Raises OSError if the file cannot be opened.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return _extract_checked(source)
+    with open(source, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # Scattered header/resource reads: no readahead of the whole exe
+            data.madvise(mmap.MADV_RANDOM)
+            return _extract_checked(data)
+
+
+def _extract_checked(data) -> List[IconInfo]:
+    try:
+        return extract_icon_from_exe(data)
+    except struct.error:
+        return []  # Truncated or malformed PE
+
+
+def best_icon(source) -> Optional[IconInfo]:
+    """Largest icon of an executable (path or buffer), None if it has none"""
+    return select_best_icon(extract_icons(source))
+
+
 def ico_to_png(ico_data: bytes, output_path: str) -> bool:
     """Convert .ico data to PNG using available tools"""
-    # Try PIL (Pillow) first
+    # Native decoder first: PNG frames copied, BMP frames decoded in-process
+    png = icodecode.ico_png(ico_data)
+    if png is not None:
+        with open(output_path, 'wb') as f:
+            f.write(png)
+        return True
+
+    # Then PIL (Pillow)
     try:
         from PIL import Image
         import io
@@ -269,7 +318,6 @@ def ico_to_png(ico_data: bytes, output_path: str) -> bool:
 
     # Fallback: save as .ico and use ImageMagick
     try:
-        import os
         temp_ico = output_path.rsplit('.', 1)[0] + '_temp.ico'
         with open(temp_ico, 'wb') as f:
             f.write(ico_data)
@@ -303,14 +351,11 @@ def main():
     output_png = sys.argv[2]
 
     try:
-        with open(input_exe, 'rb') as f:
-            data = f.read()
-    except Exception as e:
+        icons = extract_icons(input_exe)
+    except OSError as e:
         print(f"Error reading {input_exe}: {e}", file=sys.stderr)
         return 1
 
-    icons = extract_icon_from_exe(data)
-
     if not icons:
         print(f"Error: No icons found in {input_exe}", file=sys.stderr)
         return 1
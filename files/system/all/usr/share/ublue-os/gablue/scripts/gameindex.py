@@ -0,0 +1,295 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Game Index - Index unique du dossier d'un jeu pour makewgp/makelgp
+
+Un seul parcours os.scandir par dossier de jeu, partagé par toutes les
+recherches (exécutables, icônes, images, tailles). L'index est invalidé
+incrémentalement : seuls les dossiers dont le mtime a changé sont relus,
+ou les sous-arbres explicitement signalés (saves/extras modifiés).
+
+Usage: gameindex.py <dossier_du_jeu> [extension...]
+"""
+
+import sys
+import os
+import stat
+import threading
+import time
+
+
+class IndexEntry:
+    """Fichier ou dossier indexé (chemin relatif au dossier du jeu)"""
+    __slots__ = ('rel_path', 'name', 'is_dir', 'is_symlink', 'size',
+                 'mtime_ns', 'inode', 'dev', 'mode')
+
+    def __init__(self, rel_path, name, is_dir, is_symlink, size, mtime_ns, inode, dev, mode):
+        self.rel_path = rel_path
+        self.name = name
+        self.is_dir = is_dir          # Dossier (symlinks suivis, comme os.walk)
+        self.is_symlink = is_symlink
+        self.size = size              # Taille de la cible pour les symlinks
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.dev = dev
+        self.mode = mode              # st_mode de la cible (0 si symlink cassé)
+
+    @property
+    def ext(self):
+        return os.path.splitext(self.name)[1].lower()
+
+
+class GameIndex:
+    """Index d'un dossier de jeu construit une fois, interrogé par tous les consommateurs"""
+
+    def __init__(self, game_dir):
+        self.game_dir = os.path.abspath(game_dir)
+        self._entries = {}     # rel_path -> IndexEntry
+        self._children = {}    # rel_path du dossier ('' = racine) -> [noms]
+        self._dir_mtimes = {}  # rel_path du dossier -> mtime_ns au moment du scan
+        self._lock = threading.RLock()
+        self.scan_time = 0.0
+        self.build()
+
+    # --- Construction et invalidation ---
+
+    def build(self):
+        """(Re)construit l'index complet"""
+        start = time.monotonic()
+        with self._lock:
+            self._entries.clear()
+            self._children.clear()
+            self._dir_mtimes.clear()
+            self._scan_tree('')
+        self.scan_time = time.monotonic() - start
+
+    def _abs(self, rel_path):
+        return os.path.join(self.game_dir, rel_path) if rel_path else self.game_dir
+
+    def _scan_tree(self, rel_dir):
+        """Parcourt itérativement un sous-arbre (sans suivre les symlinks de dossiers)"""
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            for sub in self._scan_dir(current):
+                stack.append(sub)
+
+    def _scan_dir(self, rel_dir):
+        """Lit un seul dossier, retourne la liste des sous-dossiers à parcourir"""
+        path = self._abs(rel_dir)
+        names = []
+        subdirs = []
+        try:
+            self._dir_mtimes[rel_dir] = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                for de in it:
+                    entry = self._make_entry(rel_dir, de)
+                    if entry is None:
+                        continue
+                    self._entries[entry.rel_path] = entry
+                    names.append(de.name)
+                    if entry.is_dir and not entry.is_symlink:
+                        subdirs.append(entry.rel_path)
+        except OSError:
+            self._dir_mtimes.pop(rel_dir, None)
+        names.sort()
+        self._children[rel_dir] = names
+        return subdirs
+
+    @staticmethod
+    def _make_entry(rel_dir, de):
+        rel_path = os.path.join(rel_dir, de.name) if rel_dir else de.name
+        try:
+            is_symlink = de.is_symlink()
+            lst = de.stat(follow_symlinks=False)
+        except OSError:
+            return None
+        st = lst
+        if is_symlink:
+            try:
+                st = de.stat()
+            except OSError:
+                st = None  # Symlink cassé
+        if st is None:
+            return IndexEntry(rel_path, de.name, False, True, 0, lst.st_mtime_ns,
+                              lst.st_ino, lst.st_dev, 0)
+        return IndexEntry(rel_path, de.name, stat.S_ISDIR(st.st_mode), is_symlink,
+                          st.st_size, st.st_mtime_ns, lst.st_ino, st.st_dev, st.st_mode)
+
+    def _drop_tree(self, rel_dir):
+        """Retire un dossier et tout son contenu de l'index"""
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            self._dir_mtimes.pop(current, None)
+            for name in self._children.pop(current, []):
+                child = os.path.join(current, name) if current else name
+                entry = self._entries.pop(child, None)
+                if entry is not None and entry.is_dir and not entry.is_symlink:
+                    stack.append(child)
+
+    def invalidate(self, rel_path=''):
+        """Relit entièrement un sous-arbre (ex: une save ou un extra modifié)"""
+        rel_path = rel_path.strip('/')
+        with self._lock:
+            if rel_path:
+                parent = os.path.dirname(rel_path)
+                self._refresh_dir(parent)
+                entry = self._entries.get(rel_path)
+                if entry is None or not entry.is_dir or entry.is_symlink:
+                    return
+            self._drop_tree(rel_path)
+            self._scan_tree(rel_path)
+
+    def refresh(self):
+        """Mise à jour incrémentale
+
+        Les dossiers dont le mtime a changé sont relus (entrées ajoutées ou
+        retirées). Les fichiers des autres dossiers sont re-statés : un fichier
+        modifié sur place (mise à jour du jeu) ne change pas le mtime de son
+        dossier mais change de taille.
+        """
+        changed = 0
+        with self._lock:
+            for rel_dir in list(self._dir_mtimes):
+                if rel_dir not in self._dir_mtimes:
+                    continue  # Retiré entre-temps (sous-dossier supprimé)
+                try:
+                    mtime = os.stat(self._abs(rel_dir)).st_mtime_ns
+                except OSError:
+                    mtime = None
+                if mtime != self._dir_mtimes[rel_dir]:
+                    self._refresh_dir(rel_dir)
+                    changed += 1
+                else:
+                    changed += self._restat_files(rel_dir)
+        return changed
+
+    def _restat_files(self, rel_dir):
+        """Met à jour taille et mtime des fichiers d'un dossier inchangé, retourne le nombre modifié"""
+        changed = 0
+        for name in self._children.get(rel_dir, []):
+            child = os.path.join(rel_dir, name) if rel_dir else name
+            entry = self._entries.get(child)
+            if entry is None or (entry.is_dir and not entry.is_symlink):
+                continue
+            try:
+                st = os.stat(self._abs(child))
+            except OSError:
+                st = None  # Symlink devenu cassé
+            size, mtime_ns = (st.st_size, st.st_mtime_ns) if st else (0, entry.mtime_ns)
+            if (size, mtime_ns) != (entry.size, entry.mtime_ns):
+                entry.size = size
+                entry.mtime_ns = mtime_ns
+                changed += 1
+        return changed
+
+    def _refresh_dir(self, rel_dir):
+        """Relit un dossier : nouvelles entrées ajoutées, disparues retirées"""
+        old_names = set(self._children.get(rel_dir, []))
+        for name in old_names:
+            child = os.path.join(rel_dir, name) if rel_dir else name
+            entry = self._entries.pop(child, None)
+            if entry is not None and entry.is_dir and not entry.is_symlink:
+                # Le contenu des sous-dossiers encore présents est conservé
+                if not os.path.isdir(self._abs(child)) or os.path.islink(self._abs(child)):
+                    self._drop_tree(child)
+        for sub in self._scan_dir(rel_dir):
+            if sub not in self._dir_mtimes:
+                self._scan_tree(sub)
+
+    # --- Requêtes ---
+
+    def walk(self, exclude_dirs=()):
+        """Parcourt les entrées non-dossiers (ordre trié), comme os.walk avec élagage
+
+        Args:
+            exclude_dirs: noms de dossiers ignorés à n'importe quelle profondeur
+        """
+        exclude = set(exclude_dirs)
+        with self._lock:
+            stack = ['']
+            while stack:
+                current = stack.pop()
+                subdirs = []
+                for name in self._children.get(current, []):
+                    child = os.path.join(current, name) if current else name
+                    entry = self._entries.get(child)
+                    if entry is None:
+                        continue
+                    if entry.is_dir:
+                        if not entry.is_symlink and name not in exclude:
+                            subdirs.append(child)
+                        continue
+                    yield entry
+                stack.extend(reversed(subdirs))
+
+    def files(self, extensions=None, exclude_dirs=()):
+        """Liste des fichiers filtrés par extension (tuple, en minuscules)"""
+        if extensions is None:
+            return list(self.walk(exclude_dirs))
+        extensions = tuple(e.lower() for e in extensions)
+        return [e for e in self.walk(exclude_dirs) if e.name.lower().endswith(extensions)]
+
+    def total_size(self, exclude_dirs=(), follow_symlinks=True):
+        """Taille cumulée des fichiers (symlinks comptés avec la taille de leur cible)"""
+        total = 0
+        for entry in self.walk(exclude_dirs):
+            if entry.is_symlink and not follow_symlinks:
+                continue
+            total += entry.size
+        return total
+
+    def get(self, rel_path):
+        """Entrée indexée pour un chemin relatif (ou None)"""
+        with self._lock:
+            return self._entries.get(rel_path.strip('/'))
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def tree_size(game_dir, exclude_dirs=()):
+    """Taille cumulée des fichiers d'un dossier, sans garder d'index en mémoire
+
+    Mêmes règles que GameIndex.total_size (symlinks comptés avec la taille de
+    leur cible, dossiers symlinkés non parcourus), pour ordonner un lot de
+    jeux sans construire leurs index.
+    """
+    exclude = set(exclude_dirs)
+    total = 0
+    stack = [os.path.abspath(game_dir)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for de in it:
+                    try:
+                        if de.is_dir():
+                            if not de.is_symlink() and de.name not in exclude:
+                                stack.append(de.path)
+                            continue
+                        total += de.stat().st_size
+                    except OSError:
+                        continue  # Symlink cassé ou entrée disparue
+        except OSError:
+            continue
+    return total
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <dossier_du_jeu> [extension...]")
+        return 1
+
+    index = GameIndex(sys.argv[1])
+    extensions = tuple(sys.argv[2:]) or None
+    matches = index.files(extensions)
+    for entry in matches:
+        print(entry.rel_path)
+    print(f"{len(index)} entrées indexées en {index.scan_time * 1000:.1f} ms, "
+          f"{len(matches)} fichiers, {index.total_size()} octets", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
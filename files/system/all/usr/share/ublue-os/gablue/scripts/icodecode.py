@@ -0,0 +1,260 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+ICO Decode - Décodage des icônes ICO/BMP en PNG dans le processus (sans Qt)
+
+Choisir la plus grande image d'un .ico et l'écrire en PNG lançait magick
+deux fois (identify, puis conversion). Ici, le répertoire ICO est lu
+directement :
+- image PNG : recopiée telle quelle
+- image BMP/DIB 1/4/8/24/32 bits (masque AND compris) : décodée en RGBA
+
+Le décodage travaille par ligne avec des tranches étendues et
+bytes.translate (boucles en C, pas de boucle Python par pixel), puis le PNG
+est écrit avec zlib. Les .bmp autonomes passent par le même décodeur.
+Formats non pris en charge (16 bits, RLE...) : None, l'appelant garde sa
+conversion habituelle.
+
+Usage: icodecode.py <icone.ico|image.bmp> <sortie.png>
+"""
+
+import sys
+import os
+import struct
+import zlib
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+BI_RGB = 0
+BI_BITFIELDS = 3
+BGRA_MASKS = (0x00FF0000, 0x0000FF00, 0x000000FF)
+PNG_LEVEL = 6
+
+# Tables de translate : bit k (du poids fort au poids faible) de chaque octet
+BIT_TABLES = [bytes((value >> (7 - k)) & 1 for value in range(256)) for k in range(8)]
+HIGH_NIBBLE = bytes(value >> 4 for value in range(256))
+LOW_NIBBLE = bytes(value & 0x0F for value in range(256))
+MASK_TO_ALPHA = bytes([255, 0] + [0] * 254)  # Bit AND à 1 : pixel transparent
+
+
+class Frame:
+    """Image du répertoire d'un .ico"""
+    __slots__ = ('width', 'height', 'bpp', 'offset', 'size', 'is_png')
+
+    def __init__(self, width, height, bpp, offset, size, is_png):
+        self.width = width
+        self.height = height
+        self.bpp = bpp
+        self.offset = offset
+        self.size = size
+        self.is_png = is_png
+
+
+def frames(data):
+    """Images d'un .ico, dimensions lues dans chaque image (le répertoire peut mentir)"""
+    if len(data) < 6 or data[:4] != b'\x00\x00\x01\x00':
+        return []
+    count = struct.unpack_from('<H', data, 4)[0]
+    result = []
+    for i in range(count):
+        position = 6 + 16 * i
+        if position + 16 > len(data):
+            break
+        width, height, _colors, _reserved, _planes, bpp, size, offset = \
+            struct.unpack_from('<BBBBHHII', data, position)
+        if offset + size > len(data) or size < 16:
+            continue
+        if data[offset:offset + 8] == PNG_SIGNATURE:
+            if data[offset + 12:offset + 16] != b'IHDR':
+                continue
+            width, height = struct.unpack_from('>II', data, offset + 16)
+            bpp = data[offset + 24] * 4  # Profondeur par canal, RGBA au mieux
+            result.append(Frame(width, height, bpp, offset, size, True))
+        elif size >= 40:
+            header_size, width, height, _planes, bpp = struct.unpack_from('<IiiHH', data, offset)
+            if header_size < 40:
+                continue
+            # Hauteur du DIB : image XOR + masque AND
+            result.append(Frame(width, abs(height) // 2, bpp, offset, size, False))
+    return result
+
+
+def best_frame(data):
+    """Plus grande image (PNG puis profondeur la plus haute à surface égale)"""
+    return max(frames(data), key=lambda f: (f.width * f.height, f.is_png, f.bpp), default=None)
+
+
+def _expand_bits(row, bpp, count):
+    """Indices de palette d'une ligne 1/4/8 bits, un octet par pixel"""
+    if bpp == 8:
+        return row[:count]
+    out = bytearray(len(row) * (8 // bpp))
+    if bpp == 4:
+        out[0::2] = row.translate(HIGH_NIBBLE)
+        out[1::2] = row.translate(LOW_NIBBLE)
+    else:
+        for k in range(8):
+            out[k::8] = row.translate(BIT_TABLES[k])
+    return bytes(out[:count])
+
+
+def decode_dib(data, offset=0, has_mask=True):
+    """Décode un DIB (BITMAPINFOHEADER) en (largeur, hauteur, RGBA) ou None
+
+    has_mask : image d'un .ico (hauteur doublée, masque AND après les pixels).
+    """
+    header_size, width, height, _planes, bpp, compression = \
+        struct.unpack_from('<IiiHHI', data, offset)
+    colors_used = struct.unpack_from('<I', data, offset + 32)[0]
+    top_down = height < 0
+    height = abs(height) // 2 if has_mask else abs(height)
+    if width <= 0 or height <= 0 or bpp not in (1, 4, 8, 24, 32):
+        return None
+    position = offset + header_size
+    if compression == BI_BITFIELDS and bpp == 32:
+        # Masques après un en-tête de 40 octets, ou dans l'en-tête V4/V5 : même position
+        if struct.unpack_from('<III', data, offset + 40) != BGRA_MASKS:
+            return None
+        if header_size == 40:
+            position += 12
+    elif compression != BI_RGB:
+        return None
+
+    palette = None
+    if bpp <= 8:
+        entries = colors_used or (1 << bpp)
+        palette = data[position:position + 4 * entries]
+        position += 4 * entries
+        # Tables index -> canal (BGRX), indices hors palette en noir
+        blue, green, red = (bytes(palette[c::4])[:256].ljust(256, b'\x00') for c in range(3))
+
+    stride = (width * bpp + 31) // 32 * 4
+    mask_stride = (width + 31) // 32 * 4
+    mask_position = position + stride * height
+    if mask_position > len(data):
+        return None
+    has_mask = has_mask and mask_position + mask_stride * height <= len(data)
+
+    pixels = width * 4
+    rgba = bytearray(pixels * height)
+    alpha_used = False
+    for y in range(height):
+        row = data[position + y * stride:position + (y + 1) * stride]
+        start = (y if top_down else height - 1 - y) * pixels
+        end = start + pixels
+        if bpp == 32:
+            rgba[start:end:4] = row[2:pixels:4]
+            rgba[start + 1:end:4] = row[1:pixels:4]
+            rgba[start + 2:end:4] = row[0:pixels:4]
+            rgba[start + 3:end:4] = alpha = row[3:pixels:4]
+            alpha_used = alpha_used or any(alpha)
+        elif bpp == 24:
+            rgba[start:end:4] = row[2:width * 3:3]
+            rgba[start + 1:end:4] = row[1:width * 3:3]
+            rgba[start + 2:end:4] = row[0:width * 3:3]
+        else:
+            indices = _expand_bits(row, bpp, width)
+            rgba[start:end:4] = indices.translate(red)
+            rgba[start + 1:end:4] = indices.translate(green)
+            rgba[start + 2:end:4] = indices.translate(blue)
+
+    if bpp < 32 or not alpha_used:
+        # Transparence donnée par le masque AND (opaque sans masque)
+        for y in range(height):
+            start = (y if top_down else height - 1 - y) * pixels
+            if has_mask:
+                row = data[mask_position + y * mask_stride:mask_position + (y + 1) * mask_stride]
+                rgba[start + 3:start + pixels:4] = _expand_bits(row, 1, width).translate(MASK_TO_ALPHA)
+            else:
+                rgba[start + 3:start + pixels:4] = b'\xff' * width
+    return width, height, bytes(rgba)
+
+
+def encode_png(width, height, rgba):
+    """PNG RGBA 8 bits (filtre None sur chaque ligne)"""
+    pixels = width * 4
+    raw = b''.join(b'\x00' + rgba[y * pixels:(y + 1) * pixels] for y in range(height))
+
+    def chunk(kind, body):
+        return (struct.pack('>I', len(body)) + kind + body
+                + struct.pack('>I', zlib.crc32(kind + body) & 0xFFFFFFFF))
+
+    return (PNG_SIGNATURE
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw, PNG_LEVEL))
+            + chunk(b'IEND', b''))
+
+
+def frame_png(data, frame):
+    """PNG d'une image du .ico (recopie ou décodage), None si non pris en charge"""
+    if frame.is_png:
+        return bytes(data[frame.offset:frame.offset + frame.size])
+    try:
+        decoded = decode_dib(data[frame.offset:frame.offset + frame.size])
+    except (struct.error, ValueError):
+        return None
+    return encode_png(*decoded) if decoded else None
+
+
+def ico_png(data):
+    """PNG de la plus grande image d'un .ico, None si illisible"""
+    frame = best_frame(data)
+    return frame_png(data, frame) if frame is not None else None
+
+
+def bmp_png(data):
+    """PNG d'un fichier .bmp (BITMAPFILEHEADER + DIB), None si non pris en charge"""
+    if len(data) < 54 or data[:2] != b'BM':
+        return None
+    pixel_offset = struct.unpack_from('<I', data, 10)[0]
+    try:
+        header_size = struct.unpack_from('<I', data, 14)[0]
+        if header_size < 40:
+            return None
+        # Pixels à l'offset indiqué par l'en-tête : DIB reconstitué sans trou
+        palette_end = 14 + header_size
+        compression = struct.unpack_from('<I', data, 30)[0]
+        if compression == BI_BITFIELDS and header_size == 40:
+            palette_end += 12
+        bpp = struct.unpack_from('<H', data, 28)[0]
+        if bpp <= 8:
+            entries = struct.unpack_from('<I', data, 46)[0] or (1 << bpp)
+            palette_end += 4 * entries
+        dib = data[14:palette_end] + data[pixel_offset:]
+        decoded = decode_dib(dib, has_mask=False)
+    except (struct.error, ValueError):
+        return None
+    return encode_png(*decoded) if decoded else None
+
+
+def convert(source, output):
+    """Convertit un .ico ou .bmp en PNG, retourne False si non pris en charge"""
+    with open(source, 'rb') as f:
+        data = f.read()
+    png = bmp_png(data) if data[:2] == b'BM' else ico_png(data)
+    if png is None:
+        return False
+    tmp = f"{output}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(png)
+    os.replace(tmp, output)
+    return True
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) != 2 or args[0] in ('-h', '--help'):
+        print(f"Usage: {sys.argv[0]} <icone.ico|image.bmp> <sortie.png>")
+        return 1
+    try:
+        if not convert(args[0], args[1]):
+            print(f"Erreur: format non pris en charge: {args[0]}", file=sys.stderr)
+            return 1
+    except OSError as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
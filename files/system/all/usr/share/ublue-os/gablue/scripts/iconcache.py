@@ -0,0 +1,247 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Icon Cache - Cache disque des icônes extraites (exe, AppImage, paquets) (sans Qt)
+
+makewgp/makelgp extrayaient à chaque ouverture d'un dossier les icônes de
+tous les exe/AppImage dans /tmp, supprimées à la fermeture, et les
+thumbnailers wgp/lgp relisaient .icon.png dans chaque paquet. Les icônes
+décodées sont gardées dans ~/.cache/gablue/icons, partagées par les trois :
+
+    keys/<périphérique>-<inode>-<taille>-<mtime>  -> ../data/<empreinte>  (symlink)
+    data/<empreinte>/<variante>                     (icon.ico, icon.png, thumb-256.png...)
+
+La recherche se fait par la seule clé (périphérique, inode, taille, mtime),
+sans relire le fichier. L'empreinte du contenu n'est calculée qu'à
+l'enregistrement (put), ou à la recherche si l'appelant demande le repli
+(fallback) : un fichier copié ou un dossier déplacé retrouve alors les
+icônes déjà extraites, au prix d'une lecture du fichier (blake2b du fichier
+entier jusqu'à 64 Mo, au-delà de la taille, du début et de la fin).
+
+Éviction LRU : une entrée lue voit sa date de modification rafraîchie, les
+plus anciennes sont supprimées quand le cache dépasse sa taille maximale
+(64 Mo par défaut).
+
+Usage: iconcache.py get <fichier> <variante> <sortie>   (code 1 si absente)
+       iconcache.py put <fichier> <variante> <image>
+       iconcache.py trim [taille_max]
+"""
+
+import sys
+import os
+import hashlib
+import shutil
+import uuid
+
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+FULL_HASH_LIMIT = 64 * 1024 * 1024  # Au-delà : empreinte sur le début et la fin
+SAMPLE_SIZE = 4 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+
+
+def cache_dir():
+    cache = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache, 'gablue', 'icons')
+
+
+def stat_key(st):
+    return f"{st.st_dev}-{st.st_ino}-{st.st_size}-{st.st_mtime_ns}"
+
+
+def content_hash(path, size):
+    """Empreinte du contenu (fichier entier, ou début et fin des gros fichiers)"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(size).encode())
+    with open(path, 'rb') as f:
+        if size <= FULL_HASH_LIMIT:
+            while data := f.read(READ_SIZE):
+                h.update(data)
+        else:
+            h.update(f.read(SAMPLE_SIZE))
+            f.seek(size - SAMPLE_SIZE)
+            h.update(f.read(SAMPLE_SIZE))
+    return h.hexdigest()
+
+
+class IconEntry:
+    """Icônes en cache d'un fichier source
+
+    Args:
+        cache: IconCache
+        path: fichier source (exe, AppImage, paquet)
+    """
+
+    def __init__(self, cache, path):
+        self.cache = cache
+        self.path = path
+        st = os.stat(path)
+        self.size = st.st_size
+        self.key_path = os.path.join(cache.directory, 'keys', stat_key(st))
+        self._data_dir = None
+
+    def data_dir(self, hash_content=True):
+        """Dossier des variantes (empreinte calculée au besoin)"""
+        if self._data_dir is None:
+            try:
+                target = os.readlink(self.key_path)
+                self._data_dir = os.path.normpath(os.path.join(os.path.dirname(self.key_path), target))
+            except OSError:
+                if not hash_content:
+                    return None
+                digest = content_hash(self.path, self.size)
+                self._data_dir = os.path.join(self.cache.directory, 'data', digest)
+        return self._data_dir
+
+    def get(self, variant, fallback=False):
+        """Chemin de la variante en cache, None si absente
+
+        Recherche par la clé seule ; avec fallback, une clé inconnue est
+        remplacée par l'empreinte du contenu (lecture du fichier).
+        """
+        data_dir = self.data_dir(hash_content=fallback)
+        if data_dir is None:
+            return None
+        path = os.path.join(data_dir, variant)
+        if not os.path.isfile(path):
+            return None
+        try:
+            os.utime(data_dir)  # Entrée récemment utilisée (LRU)
+            self._link()
+        except OSError:
+            pass
+        return path
+
+    def put(self, variant, data):
+        """Enregistre une variante (contenu bytes), retourne son chemin en cache"""
+        data_dir = self.data_dir()
+        os.makedirs(data_dir, exist_ok=True)
+        path = os.path.join(data_dir, variant)
+        tmp = os.path.join(data_dir, f".{variant}.{uuid.uuid4().hex}")
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)  # Lecteurs concurrents : jamais de fichier partiel
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._link()
+        return path
+
+    def put_file(self, variant, source):
+        with open(source, 'rb') as f:
+            return self.put(variant, f.read())
+
+    def _link(self):
+        """Clé (périphérique, inode, taille, mtime) vers le dossier des variantes"""
+        if os.path.islink(self.key_path):
+            return
+        os.makedirs(os.path.dirname(self.key_path), exist_ok=True)
+        tmp = f"{self.key_path}.{uuid.uuid4().hex}"
+        os.symlink(os.path.relpath(self._data_dir, os.path.dirname(self.key_path)), tmp)
+        os.replace(tmp, self.key_path)
+
+
+class IconCache:
+    """Cache d'icônes partagé (makewgp, makelgp, thumbnailers)
+
+    Args:
+        directory: dossier du cache (défaut : ~/.cache/gablue/icons)
+        max_size: taille maximale en octets avant éviction
+    """
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory or cache_dir()
+        self.max_size = max_size
+
+    def entry(self, path):
+        """Entrée du cache pour un fichier source (OSError si illisible)"""
+        return IconEntry(self, path)
+
+    def lookup(self, path, variant, fallback=False):
+        """Variante en cache d'un fichier, None si absente ou source illisible"""
+        try:
+            return self.entry(path).get(variant, fallback)
+        except OSError:
+            return None
+
+    def trim(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_size
+
+        Retourne le nombre d'entrées supprimées.
+        """
+        data_root = os.path.join(self.directory, 'data')
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(data_root)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            path = os.path.join(data_root, name)
+            try:
+                size = sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+                entries.append((os.stat(path).st_mtime_ns, size, path))
+            except OSError:
+                continue
+            total += size
+        removed = 0
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        if removed:
+            self._remove_dangling_keys()
+        return removed
+
+    def _remove_dangling_keys(self):
+        keys_root = os.path.join(self.directory, 'keys')
+        try:
+            names = os.listdir(keys_root)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(keys_root, name)
+            if not os.path.exists(path):  # Symlink vers une entrée supprimée
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def main():
+    args = sys.argv[1:]
+    usage = (f"Usage: {sys.argv[0]} get <fichier> <variante> <sortie>\n"
+             f"       {sys.argv[0]} put <fichier> <variante> <image>\n"
+             f"       {sys.argv[0]} trim [taille_max]")
+    if not args or args[0] in ('-h', '--help'):
+        print(usage)
+        return 1
+    try:
+        if args[0] == 'get' and len(args) == 4:
+            cached = IconCache().lookup(args[1], args[2])
+            if cached is None:
+                return 1
+            shutil.copyfile(cached, args[3])
+            return 0
+        if args[0] == 'put' and len(args) == 4:
+            cache = IconCache()
+            print(cache.entry(args[1]).put_file(args[2], args[3]))
+            cache.trim()
+            return 0
+        if args[0] == 'trim' and len(args) <= 2:
+            cache = IconCache(max_size=int(args[1]) if len(args) == 2 else DEFAULT_MAX_SIZE)
+            print(f"{cache.trim()} entrée(s) supprimée(s)")
+            return 0
+    except (OSError, ValueError) as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 2
+    print(usage, file=sys.stderr)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Image Probe - Dimensions d'une image lues dans son en-tête, sans décodage (sans Qt)
+
+makewgp/makelgp cherchent parmi les images du jeu celles qui ressemblent à
+une icône (carrées, entre 16 et 512 px). Décoder chaque image (QPixmap) dans
+le thread graphique rendait l'ouverture des jeux à milliers de textures très
+lente : seuls les octets d'en-tête sont lus ici (IHDR PNG, segment SOF JPEG,
+en-tête BMP, répertoire ICO, GIF, WebP). Un fichier trop gros pour une icône
+est écarté sans être ouvert.
+
+Usage: imageprobe.py <image...>
+"""
+
+import sys
+import os
+import struct
+
+
+MAX_ICON_FILE_SIZE = 2 * 1024 * 1024  # PNG RGBA 512x512 non compressé : 1 Mo
+MIN_ICON_SIZE = 16
+MAX_ICON_SIZE = 512
+SQUARE_TOLERANCE = 2  # Pixels
+HEAD_SIZE = 32
+JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_size(f):
+    """Parcourt les segments JPEG jusqu'au SOF (EXIF et miniatures sautés par seek)"""
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        while code == 0xFF:  # Octets de remplissage
+            code = _read_byte(f)
+            if code is None:
+                return None
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:  # Marqueurs sans longueur
+            continue
+        header = f.read(2)
+        if len(header) < 2:
+            return None
+        length = struct.unpack('>H', header)[0]
+        if code in JPEG_SOF:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>xHH', data)
+            return width, height
+        if code == 0xD9 or length < 2:
+            return None
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _read_byte(f):
+    data = f.read(1)
+    return data[0] if data else None
+
+
+def image_size(path):
+    """(largeur, hauteur) lues dans l'en-tête, None si format inconnu ou en-tête invalide"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(HEAD_SIZE)
+            if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+                return struct.unpack('>II', head[16:24])
+            if head.startswith(b'\xff\xd8'):
+                return _jpeg_size(f)
+            if head.startswith(b'BM') and len(head) >= 26:
+                header_size = struct.unpack('<I', head[14:18])[0]
+                if header_size == 12:  # BITMAPCOREHEADER (OS/2)
+                    width, height = struct.unpack('<HH', head[18:22])
+                else:
+                    width, height = struct.unpack('<ii', head[18:26])
+                return abs(width), abs(height)  # Hauteur négative : image de haut en bas
+            if head[:4] == b'\x00\x00\x01\x00' and len(head) >= 22:
+                # ICO : plus grande image du répertoire (0 = 256 px)
+                count = struct.unpack('<H', head[4:6])[0]
+                directory = head[6:] + f.read(max(0, 16 * count - (len(head) - 6)))
+                sizes = [(directory[i] or 256, directory[i + 1] or 256)
+                         for i in range(0, min(count, len(directory) // 16) * 16, 16)]
+                return max(sizes, default=None)
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', head[6:10])
+            if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+                chunk = head[12:16]
+                if chunk == b'VP8X':
+                    width = int.from_bytes(head[24:27], 'little') + 1
+                    height = int.from_bytes(head[27:30], 'little') + 1
+                    return width, height
+                if chunk == b'VP8 ':
+                    width, height = struct.unpack('<HH', head[26:30])
+                    return width & 0x3FFF, height & 0x3FFF
+                if chunk == b'VP8L':
+                    bits = int.from_bytes(head[21:25], 'little')
+                    return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    except (OSError, struct.error, IndexError):
+        pass
+    return None
+
+
+def looks_like_icon(path, file_size=None):
+    """True si l'image est carrée et de taille d'icône (16 à 512 px)
+
+    file_size : taille du fichier si déjà connue (index du dossier), les
+    fichiers trop gros pour une icône ne sont pas ouverts.
+    """
+    if file_size is None:
+        try:
+            file_size = os.path.getsize(path)
+        except OSError:
+            return False
+    if file_size > MAX_ICON_FILE_SIZE:
+        return False
+    size = image_size(path)
+    if size is None:
+        return False
+    width, height = size
+    return (abs(width - height) <= SQUARE_TOLERANCE
+            and MIN_ICON_SIZE <= width <= MAX_ICON_SIZE)
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] in ('-h', '--help'):
+        print(f"Usage: {sys.argv[0]} <image...>")
+        return 1
+    status = 0
+    for path in args:
+        size = image_size(path)
+        if size is None:
+            print(f"{path} : format non reconnu", file=sys.stderr)
+            status = 1
+            continue
+        icon = " (icône)" if looks_like_icon(path) else ""
+        print(f"{path} : {size[0]}x{size[1]}{icon}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -192,9 +192,13 @@ init_lgp_variables() {
     LGPACK_FILE="$(realpath "$fullpath")"
     GAME_INTERNAL_NAME=""
 
-    # Lire le fichier .gamename depuis le lgp pour avoir le nom du jeu pour le montage
+    # Lire le nom du jeu pour le montage : manifeste en fin de fichier (une lecture),
+    # sinon .gamename lu directement dans le lgp (anciens paquets)
     local GAMENAME_CONTENT
-    GAMENAME_CONTENT=$(unsquashfs -cat "$LGPACK_FILE" ".gamename" 2>/dev/null)
+    if ! GAMENAME_CONTENT=$(/usr/share/ublue-os/gablue/scripts/packmanifest.py "$LGPACK_FILE" gamename 2>/dev/null) && \
+       ! GAMENAME_CONTENT=$(/usr/share/ublue-os/gablue/scripts/squashfsreader.py "$LGPACK_FILE" cat ".gamename" 2>/dev/null); then
+        GAMENAME_CONTENT=$(unsquashfs -cat "$LGPACK_FILE" ".gamename" 2>/dev/null)
+    fi
     if [ -n "$GAMENAME_CONTENT" ]; then
         GAME_INTERNAL_NAME="$GAMENAME_CONTENT"
         # Nettoyer les points et espaces terminaux
@@ -275,10 +279,27 @@ mount_lgp() {
         error_exit "squashfuse n'est pas installé"
     fi
 
+    # Paquet découpé en volumes (packvolumes.py) : wgpconcat expose leur concaténation
+    local PACK_IMAGE="$LGPACK_FILE"
+    if [ "$(head -c 8 "$LGPACK_FILE" 2>/dev/null)" = "GBPKVOL1" ]; then
+        local volumes=()
+        mapfile -t volumes < <(/usr/share/ublue-os/gablue/scripts/packvolumes.py "$LGPACK_FILE")
+        if [ ${#volumes[@]} -eq 0 ]; then
+            error_exit "Volumes du paquet manquants ou incomplets: $LGPACK_FILE"
+        fi
+        fusermount -uz "$MOUNT_DIR.volumes" 2>/dev/null || true
+        mkdir -p "$MOUNT_DIR.volumes"
+        echo "Assemblage de ${#volumes[@]} volumes..."
+        if ! wgpconcat "$MOUNT_DIR.volumes" "${volumes[@]}"; then
+            error_exit "Erreur lors de l'assemblage des volumes"
+        fi
+        PACK_IMAGE="$MOUNT_DIR.volumes/image"
+    fi
+
     # Créer et monter le squashfs via FUSE (pas besoin de sudo)
     mkdir -p "$MOUNT_DIR"
     echo "Montage de $LGPACK_FILE sur $MOUNT_DIR (squashfuse)..."
-    squashfuse -r "$LGPACK_FILE" "$MOUNT_DIR"
+    squashfuse -r "$PACK_IMAGE" "$MOUNT_DIR"
 
     if [ $? -ne 0 ]; then
         rmdir "$MOUNT_DIR"
@@ -327,6 +348,12 @@ cleanup_lgp() {
     if [ -d "$MOUNT_DIR" ]; then
         rmdir "$MOUNT_DIR" 2>/dev/null || true
     fi
+
+    # Concaténation des volumes (paquet multi-volumes)
+    if [ -d "$MOUNT_DIR.volumes" ]; then
+        fusermount -uz "$MOUNT_DIR.volumes" 2>/dev/null || umount -l "$MOUNT_DIR.volumes" 2>/dev/null || true
+        rmdir "$MOUNT_DIR.volumes" 2>/dev/null || true
+    fi
 }
 
 # Lit les fichiers de configuration du LGP
@@ -0,0 +1,227 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Launch Profile - Ordre d'accès aux fichiers au lancement d'un jeu (sans Qt)
+
+Les paquets WGP/LGP sont montés avec squashfuse : au premier lancement, le
+temps de chargement est dominé par des lectures dispersées dans l'image. On
+enregistre (strace) l'ordre dans lequel le jeu ouvre ses fichiers pendant ses
+N premières secondes, dans .launchorder. À la création du paquet, cet ordre est
+donné à mksquashfs (-sort) : les fichiers chauds sont placés d'un bloc au début
+de l'image, ce qui accélère nettement les chargements sur HDD et carte SD.
+
+Usage: launchprofile.py record <dossier_du_jeu> [-duration 60] -- <commande...>
+       launchprofile.py sort <dossier_du_jeu>   (affiche le fichier -sort généré)
+"""
+
+import sys
+import os
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+
+
+LAUNCH_ORDER_FILE = '.launchorder'
+DEFAULT_DURATION = 60
+
+# Priorités -sort de mksquashfs : la plus haute est placée en premier
+MAX_PRIORITY = 32767
+MIN_PRIORITY = -32768
+
+# Ligne strace -f -xx : 1234  openat(AT_FDCWD, "\x2f\x68...", O_RDONLY) = 3
+_OPEN_RE = re.compile(r'^(?:\[pid\s+)?\d+\]?\s+(?:open|openat)\((?:AT_FDCWD|\d+), "((?:\\x[0-9a-f]{2})*)"')
+
+
+def launch_command(game_dir, exe, args='', pack_type='wgp'):
+    """Commande de lancement du jeu depuis son dossier décompressé"""
+    exe_path = os.path.join(game_dir, exe)
+    extra = shlex.split(args) if args else []
+    if pack_type == 'wgp':
+        return ['gwine', exe_path] + extra
+    return [exe_path] + extra
+
+
+class LaunchRecorder:
+    """Lance le jeu sous strace et relève l'ordre de première ouverture de ses fichiers
+
+    Args:
+        game_dir: dossier du jeu (seuls les fichiers de ce dossier sont retenus)
+        cmd: commande de lancement
+        duration: durée d'enregistrement en secondes
+        callback: fonction (secondes écoulées, nombre de fichiers) appelée chaque seconde
+    """
+
+    def __init__(self, game_dir, cmd, duration=DEFAULT_DURATION, callback=None):
+        self.game_dir = os.path.realpath(game_dir)
+        self.cmd = cmd
+        self.duration = duration
+        self.callback = callback
+        self.cancelled = False
+        self._proc = None
+        self._order = []
+        self._seen = set()
+        self._offset = 0  # Position de lecture dans la trace (lecture incrémentale)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        """Enregistre le lancement, retourne la liste ordonnée des chemins relatifs"""
+        if not shutil.which('strace'):
+            raise RuntimeError("strace est introuvable")
+
+        fd, trace_file = tempfile.mkstemp(prefix='launchprofile-', suffix='.strace')
+        os.close(fd)
+        strace = ['strace', '-f', '-qq', '-xx', '-s', '4096',
+                  '-e', 'trace=open,openat', '-e', 'status=successful', '-o', trace_file, '--']
+        cwd = os.path.dirname(self._exe_path())
+        try:
+            self._proc = subprocess.Popen(strace + self.cmd, cwd=cwd if os.path.isdir(cwd) else None,
+                                          stdin=subprocess.DEVNULL, start_new_session=True)
+            start = time.monotonic()
+            while self._proc.poll() is None:
+                elapsed = time.monotonic() - start
+                if self.cancelled or elapsed >= self.duration:
+                    break
+                if self.callback:
+                    self._parse(trace_file, cwd)
+                    self.callback(int(elapsed), len(self._order))
+                time.sleep(1)
+            self._terminate()
+            self._parse(trace_file, cwd)
+            return list(self._order)
+        finally:
+            os.remove(trace_file)
+
+    def _exe_path(self):
+        """Exécutable du jeu dans la commande (premier argument dans le dossier du jeu)"""
+        for arg in self.cmd:
+            if os.path.realpath(arg).startswith(self.game_dir + os.sep):
+                return arg
+        return self.cmd[0]
+
+    def _terminate(self):
+        if self._proc and self._proc.poll() is None:
+            try:
+                os.killpg(os.getpgid(self._proc.pid), signal.SIGTERM)
+                self._proc.wait(timeout=10)
+            except (ProcessLookupError, subprocess.TimeoutExpired):
+                try:
+                    os.killpg(os.getpgid(self._proc.pid), signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                self._proc.wait()
+
+    def _parse(self, trace_file, cwd):
+        """Ajoute les fichiers du jeu nouvellement ouverts depuis la dernière lecture"""
+        try:
+            with open(trace_file, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return
+        # Ne traiter que les lignes complètes (strace écrit encore)
+        end = data.rfind(b'\n') + 1
+        self._offset += end
+        for line in data[:end].decode('ascii', errors='replace').splitlines():
+            m = _OPEN_RE.match(line)
+            if not m:
+                continue
+            path = bytes.fromhex(m.group(1).replace('\\x', '')).decode('utf-8', errors='surrogateescape')
+            if not os.path.isabs(path):
+                path = os.path.join(cwd, path)
+            # Wine passe par dosdevices/z: : résoudre les symlinks
+            real = os.path.realpath(path)
+            if not real.startswith(self.game_dir + os.sep) or real in self._seen:
+                continue
+            self._seen.add(real)
+            if os.path.isfile(real):
+                self._order.append(os.path.relpath(real, self.game_dir))
+
+
+def write_launch_order(game_dir, paths):
+    """Écrit .launchorder (un chemin relatif par ligne, ordre d'accès)"""
+    with open(os.path.join(game_dir, LAUNCH_ORDER_FILE), 'w') as f:
+        for rel_path in paths:
+            f.write(f"{rel_path}\n")
+
+
+def read_launch_order(game_dir):
+    """Lit .launchorder (liste vide si absent)"""
+    path = os.path.join(game_dir, LAUNCH_ORDER_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def sort_quote(rel_path):
+    """Échappe un chemin pour le fichier -sort (espaces et backslashes)"""
+    return re.sub(r'([\\\s])', r'\\\1', rel_path)
+
+
+def write_sort_file(game_dir, path):
+    """Écrit le fichier -sort de mksquashfs depuis .launchorder
+
+    Returns:
+        nombre de fichiers triés (0 si pas d'ordre enregistré)
+    """
+    count = 0
+    with open(path, 'w') as f:
+        priority = MAX_PRIORITY
+        for rel_path in read_launch_order(game_dir):
+            if '\n' in rel_path or priority <= MIN_PRIORITY:
+                continue
+            # Fichiers disparus ou remplacés depuis l'enregistrement : ignorés
+            if not os.path.isfile(os.path.join(game_dir, rel_path)):
+                continue
+            f.write(f"{sort_quote(rel_path)} {priority}\n")
+            priority -= 1
+            count += 1
+    return count
+
+
+def main():
+    if len(sys.argv) >= 3 and sys.argv[1] == 'sort':
+        with tempfile.NamedTemporaryFile('r', suffix='.sort') as tmp:
+            count = write_sort_file(sys.argv[2], tmp.name)
+            sys.stdout.write(tmp.read())
+        print(f"{count} fichiers triés", file=sys.stderr)
+        return 0
+
+    if len(sys.argv) < 5 or sys.argv[1] != 'record' or '--' not in sys.argv:
+        print(f"Usage: {sys.argv[0]} record <dossier_du_jeu> [-duration 60] -- <commande...>")
+        print(f"       {sys.argv[0]} sort <dossier_du_jeu>")
+        return 1
+
+    sep = sys.argv.index('--')
+    options = sys.argv[3:sep]
+    cmd = sys.argv[sep + 1:]
+    duration = DEFAULT_DURATION
+    if len(options) == 2 and options[0] == '-duration':
+        duration = int(options[1])
+    elif options:
+        print(f"Option inconnue: {' '.join(options)}", file=sys.stderr)
+        return 1
+
+    game_dir = sys.argv[2]
+    recorder = LaunchRecorder(game_dir, cmd, duration,
+                              lambda sec, n: print(f"\r{sec} s : {n} fichiers", end='', file=sys.stderr))
+    signal.signal(signal.SIGINT, lambda *_: recorder.cancel())
+    try:
+        order = recorder.run()
+    except RuntimeError as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    write_launch_order(game_dir, order)
+    print(f"{len(order)} fichiers enregistrés dans {os.path.join(game_dir, LAUNCH_ORDER_FILE)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,782 +14,154 @@ import tempfile
 import shutil
 import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import exeiconextract
+import gameindex
+import icodecode
+import iconcache
+import imageprobe
+import launchprofile
+import packbuilder
+import packjournal
+import packpredict
+import packtune
+
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
     QLabel, QPushButton, QLineEdit, QListWidget, QListWidgetItem,
     QComboBox, QCheckBox, QProgressDialog, QMessageBox, QFileDialog,
     QGroupBox, QFrame, QScrollArea, QSizePolicy, QStyle
 )
-from PySide6.QtCore import Qt, QThread, Signal, QTimer
-from PySide6.QtGui import QPixmap, QIcon, QFont
+from PySide6.QtCore import Qt, QThread, Signal, QTimer, QBuffer, QIODevice
+from PySide6.QtGui import QPixmap, QIcon, QFont, QImage
 
 
 class CreateWGPThread(QThread):
-    """Thread pour créer le WGP sans bloquer l'interface"""
+    """Thread pour créer le WGP sans bloquer l'interface (construction : packbuilder)"""
     progress = Signal(int, str)
     finished = Signal(bool, str)
     
-    def __init__(self, game_dir, output_dir, output_filename, internal_game_name, config, parent=None):
+    def __init__(self, game_dir, output_dir, output_filename, internal_game_name, config, parent=None, index=None):
         super().__init__(parent)
-        self.game_dir = game_dir
-        self.output_dir = output_dir  # Dossier de destination
-        self.output_filename = output_filename  # Nom du fichier de sortie
-        self.internal_game_name = internal_game_name  # Nom interne pour .gamename et chemins
-        self.config = config
-        self.cancelled = False
+        self.wgp_file = os.path.join(output_dir, f"{output_filename}.wgp")
+        # Fichiers de configuration, staging, image, vérification et remplacement du paquet
+        self.builder = packbuilder.PackBuilder(
+            game_dir, self.wgp_file, internal_game_name, config, 'wgp',
+            index=index, callback=self.progress.emit
+        )
         
     def run(self):
         try:
-            # Créer les fichiers de configuration
-            self.progress.emit(10, "Création des fichiers de configuration...")
-            self.create_config_files()
-            
-            if self.cancelled:
-                self.cleanup()
-                self.finished.emit(False, "Création annulée par l'utilisateur")
-                return
-            
-            # Créer le squashfs avec progression temps réel
-            self.progress.emit(30, "Préparation de l'archive WGP...")
-            wgp_file = os.path.join(self.output_dir, f"{self.output_filename}.wgp")
-            
-            result = self.create_squashfs(wgp_file)
-            
-            if self.cancelled:
-                self.cleanup()
-                if os.path.exists(wgp_file):
-                    os.remove(wgp_file)
-                self.finished.emit(False, "Création annulée par l'utilisateur")
-                return
-            
-            if result.returncode == 0:
-                self.progress.emit(100, "Terminé !")
-                # Restaurer les fichiers originaux et supprimer les dossiers .save/.extra
-                self.cleanup()
-                self.finished.emit(True, wgp_file)
-            else:
-                # Restaurer les fichiers en cas d'échec de mksquashfs
-                self.cleanup()
-                self.finished.emit(False, f"Erreur lors de la création: {result.stderr}")
-                
+            # Le dossier du jeu est restauré par le builder dans tous les cas
+            result = self.builder.build()
         except Exception as e:
-            # Restaurer les fichiers et nettoyer en cas d'erreur
-            self.cleanup()
-            self.finished.emit(False, f"Erreur: {str(e)}")
-    
-    def create_config_files(self):
-        """Crée les fichiers de configuration (.gamename, .launch, .args, .fix, etc.)"""
-        # .gamename - utilise le nom interne pour les chemins
-        with open(os.path.join(self.game_dir, '.gamename'), 'w') as f:
-            f.write(self.internal_game_name)
-        
-        # .launch (contient le chemin relatif de l'exécutable)
-        with open(os.path.join(self.game_dir, '.launch'), 'w') as f:
-            f.write(self.config['exe'])
-        
-        # .args
-        with open(os.path.join(self.game_dir, '.args'), 'w') as f:
-            f.write(self.config['args'])
-        
-        # .fix (fichier vide si fix activé)
-        if self.config['fix_controller']:
-            open(os.path.join(self.game_dir, '.fix'), 'w').close()
-        elif os.path.exists(os.path.join(self.game_dir, '.fix')):
-            os.remove(os.path.join(self.game_dir, '.fix'))
-
-        # .xbox (contient le filtre xbox: all, ds4, dualsense)
-        if self.config.get('xbox_filter'):
-            with open(os.path.join(self.game_dir, '.xbox'), 'w') as f:
-                f.write(self.config['xbox_filter'])
-        elif os.path.exists(os.path.join(self.game_dir, '.xbox')):
-            os.remove(os.path.join(self.game_dir, '.xbox'))
-
-        # .pds (chemin vers le fichier de données personnalisées)
-        if self.config.get('pds'):
-            with open(os.path.join(self.game_dir, '.pds'), 'w') as f:
-                f.write(self.config['pds'])
-        elif os.path.exists(os.path.join(self.game_dir, '.pds')):
-            os.remove(os.path.join(self.game_dir, '.pds'))
-
-        # .icon - Copier AVANT de traiter les saves/extras car l'icône
-        # peut être dans un dossier qui sera déplacé
-        if self.config['icon']:
-            icon_dest = os.path.join(self.game_dir, '.icon.png')
-            # Ne copier que si l'icône source est différente de la destination
-            if os.path.abspath(self.config['icon']) != os.path.abspath(icon_dest):
-                # Convertir en vrai PNG si le format n'est pas déjà PNG
-                if self.config['icon'].lower().endswith(('.ico', '.jpg', '.jpeg', '.bmp', '.svg', '.webp')):
-                    if self.config['icon'].lower().endswith('.ico'):
-                        # ICO multi-résolution : sélectionner la plus grande frame
-                        self._ico_to_png(self.config['icon'], icon_dest)
-                    elif self.config['icon'].lower().endswith('.svg'):
-                        subprocess.run(
-                            ['magick', '-background', 'none', '-density', '300',
-                             '-resize', '1024x1024>', self.config['icon'], icon_dest],
-                            capture_output=True
-                        )
-                    else:
-                        # JPG, BMP, WebP : convertir sans upscaler
-                        subprocess.run(
-                            ['magick', self.config['icon'], '-background', 'none',
-                             '-resize', '1024x1024>', icon_dest],
-                            capture_output=True
-                        )
-                else:
-                    shutil.copy2(self.config['icon'], icon_dest)
-        
-        # Créer les symlinks et copier vers .save/.extra
-        self._process_saves_and_extras()
-    
-    def _ico_to_png(self, ico_path, png_dest):
-        """Convertit un .ico multi-résolution en PNG en sélectionnant la plus grande frame"""
-        import re
-        
-        # Identifier les frames et leurs tailles
-        result = subprocess.run(
-            ['magick', 'identify', ico_path],
-            capture_output=True, text=True
-        )
-        if result.returncode != 0:
-            return False
-        
-        best_index = 0
-        best_area = 0
-        for line in result.stdout.strip().split('\n'):
-            # Format: "path[0] ICO 32x32 ..." ou "path[5] PNG 256x256 ..."
-            match = re.search(r'\[(\d+)\]\s+\w+\s+(\d+)x(\d+)', line)
-            if match:
-                idx = int(match.group(1))
-                w = int(match.group(2))
-                h = int(match.group(3))
-                area = w * h
-                # Préférer les frames PNG (meilleure qualité) si surface égale
-                is_png = ' PNG ' in line
-                if area > best_area or (area == best_area and is_png):
-                    best_area = area
-                    best_index = idx
-        
-        # Convertir la meilleure frame en PNG sans upscaler
-        subprocess.run(
-            ['magick', f'{ico_path}[{best_index}]', '-background', 'none',
-             '-resize', '1024x1024>', png_dest],
-            capture_output=True
-        )
-        return os.path.exists(png_dest)
-
-    def _copy_dir_contents(self, source, target, preserve_symlinks=True):
-        """Copie le contenu d'un répertoire source vers target (sans copier le répertoire lui-même)
-        
-        Args:
-            source: répertoire source
-            target: répertoire cible
-            preserve_symlinks: si True, garde les symlinks relatifs internes au jeu
-        """
-        os.makedirs(target, exist_ok=True)
-        for item in os.listdir(source):
-            s = os.path.join(source, item)
-            d = os.path.join(target, item)
-            if os.path.islink(s):
-                # Lire la cible du symlink
-                link_target = os.readlink(s)
-                if os.path.islink(d):
-                    os.remove(d)
-                elif os.path.exists(d):
-                    if os.path.isdir(d):
-                        shutil.rmtree(d)
-                    else:
-                        os.remove(d)
-                
-                # Copier le symlink tel quel sans transformation
-                os.symlink(link_target, d)
-            elif os.path.isdir(s):
-                if os.path.exists(d):
-                    shutil.rmtree(d)
-                # Copier récursivement en préservant les symlinks
-                self._copy_dir_recursive(s, d, preserve_symlinks)
-            else:
-                shutil.copy2(s, d)
-
-    def _copy_dir_recursive(self, source, target, preserve_symlinks=True):
-        """Copie récursivement un répertoire en préservant les symlinks
-        
-        Args:
-            source: répertoire source
-            target: répertoire cible
-            preserve_symlinks: paramètre conservé pour compatibilité mais ignoré
-        """
-        os.makedirs(target, exist_ok=True)
-        for item in os.listdir(source):
-            s = os.path.join(source, item)
-            d = os.path.join(target, item)
-            if os.path.islink(s):
-                # Lire la cible du symlink
-                link_target = os.readlink(s)
-                if os.path.islink(d):
-                    os.remove(d)
-                elif os.path.exists(d):
-                    if os.path.isdir(d):
-                        shutil.rmtree(d)
-                    else:
-                        os.remove(d)
-                
-                # Copier le symlink tel quel sans transformation
-                os.symlink(link_target, d)
-            elif os.path.isdir(s):
-                self._copy_dir_recursive(s, d, preserve_symlinks)
+            if isinstance(e, packbuilder.BuildCancelled) or self.builder.cancelled:
+                self.finished.emit(False, "Création annulée par l'utilisateur")
             else:
-                shutil.copy2(s, d)
-
-    def _process_saves_and_extras(self):
-        """Crée les dossiers .save/.extra, copie les fichiers et crée les symlinks"""
-        print(f"DEBUG: _process_saves_and_extras called")
-        print(f"DEBUG: game_dir = {self.game_dir}")
-        print(f"DEBUG: saves = {self.config.get('saves', [])}")
-        print(f"DEBUG: extras = {self.config.get('extras', [])}")
-        
-        # Dictionnaire pour sauvegarder les symlinks originaux
-        symlinks_backup = {}
-        
-        # Traiter les sauvegardes
-        if self.config['saves']:
-            saves_dir = os.path.join(self.game_dir, '.save')
-            os.makedirs(saves_dir, exist_ok=True)
-            print(f"DEBUG: Created saves_dir = {saves_dir}")
-
-            with open(os.path.join(self.game_dir, '.savepath'), 'w') as f:
-                for item_type, rel_path in self.config['saves']:
-                    # Format compatible avec makewgp.sh (sans préfixe)
-                    f.write(f"{rel_path}\n")
-
-                    # Créer le symlink
-                    source = os.path.join(self.game_dir, rel_path)
-                    target = os.path.join(saves_dir, rel_path)
-                    
-                    print(f"DEBUG: Processing save: {rel_path} (type={item_type})")
-                    print(f"DEBUG: source = {source}, exists={os.path.exists(source)}")
-                    print(f"DEBUG: target = {target}")
-
-                    if os.path.exists(source):
-                        # Vérifier si c'est un symlink et sauvegarder sa cible
-                        if os.path.islink(source):
-                            original_target = os.readlink(source)
-                            # Garder la cible originale sans conversion
-                            symlinks_backup[rel_path] = original_target
-                            print(f"DEBUG: Backing up symlink {rel_path} -> {original_target}")
-                        
-                        # Copier vers .save (contenu uniquement pour les dossiers)
-                        os.makedirs(os.path.dirname(target), exist_ok=True)
-                        if item_type == 'dir':
-                            print(f"DEBUG: Copying dir contents from {source} to {target}")
-                            self._copy_dir_contents(source, target)
-                        else:
-                            print(f"DEBUG: Copying file from {source} to {target}")
-                            shutil.copy2(source, target)
-                        
-                        # Vérifier que la copie a fonctionné
-                        if os.path.exists(target):
-                            print(f"DEBUG: Copy successful, target exists")
-                        else:
-                            print(f"DEBUG: ERROR - Copy failed, target does not exist!")
-
-                        # Créer le symlink
-                        # Si le source est déjà un symlink vers l'extérieur, on le garde tel quel
-                        if os.path.islink(source):
-                            link_target = os.readlink(source)
-                            if os.path.isabs(link_target) and not link_target.startswith(self.game_dir):
-                                # C'est un symlink externe, on le garde
-                                print(f"DEBUG: Preserving external symlink {source} -> {link_target}")
-                            else:
-                                # C'est un symlink interne, on le remplace
-                                os.remove(source)
-                                os.makedirs(os.path.dirname(source), exist_ok=True)
-                                saves_base = f"/tmp/wgp-saves/{self.internal_game_name}"
-                                os.symlink(os.path.join(saves_base, rel_path), source)
-                                print(f"DEBUG: Created symlink {source} -> {os.path.join(saves_base, rel_path)}")
-                        else:
-                            # C'est un vrai fichier/dossier, on le remplace
-                            if os.path.isdir(source):
-                                shutil.rmtree(source)
-                            else:
-                                os.remove(source)
-                            os.makedirs(os.path.dirname(source), exist_ok=True)
-                            saves_base = f"/tmp/wgp-saves/{self.internal_game_name}"
-                            os.symlink(os.path.join(saves_base, rel_path), source)
-                            print(f"DEBUG: Created symlink {source} -> {os.path.join(saves_base, rel_path)}")
-        else:
-            # Aucune sauvegarde : nettoyer les fichiers existants
-            savepath_file = os.path.join(self.game_dir, '.savepath')
-            if os.path.exists(savepath_file):
-                os.remove(savepath_file)
-            saves_dir = os.path.join(self.game_dir, '.save')
-            if os.path.exists(saves_dir):
-                shutil.rmtree(saves_dir)
-            print(f"DEBUG: No saves to process - cleaned existing")
-
-        # Traiter les extras
-        if self.config['extras']:
-            extras_dir = os.path.join(self.game_dir, '.extra')
-            os.makedirs(extras_dir, exist_ok=True)
-            print(f"DEBUG: Created extras_dir = {extras_dir}")
-
-            with open(os.path.join(self.game_dir, '.extrapath'), 'w') as f:
-                for item_type, rel_path in self.config['extras']:
-                    # Format compatible avec makewgp.sh (sans préfixe)
-                    f.write(f"{rel_path}\n")
-
-                    # Créer le symlink
-                    source = os.path.join(self.game_dir, rel_path)
-                    target = os.path.join(extras_dir, rel_path)
-                    
-                    print(f"DEBUG: Processing extra: {rel_path} (type={item_type})")
-                    print(f"DEBUG: source = {source}, exists={os.path.exists(source)}")
-                    print(f"DEBUG: target = {target}")
-
-                    if os.path.exists(source):
-                        # Vérifier si c'est un symlink et sauvegarder sa cible
-                        if os.path.islink(source):
-                            original_target = os.readlink(source)
-                            # Garder la cible originale sans conversion
-                            symlinks_backup[rel_path] = original_target
-                            print(f"DEBUG: Backing up symlink {rel_path} -> {original_target}")
-                        
-                        # Copier vers .extra (contenu uniquement pour les dossiers)
-                        os.makedirs(os.path.dirname(target), exist_ok=True)
-                        if item_type == 'dir':
-                            print(f"DEBUG: Copying dir contents from {source} to {target}")
-                            self._copy_dir_contents(source, target)
-                        else:
-                            print(f"DEBUG: Copying file from {source} to {target}")
-                            shutil.copy2(source, target)
-                        
-                        # Vérifier que la copie a fonctionné
-                        if os.path.exists(target):
-                            print(f"DEBUG: Copy successful, target exists")
-                        else:
-                            print(f"DEBUG: ERROR - Copy failed, target does not exist!")
-
-                        # Créer le symlink vers /tmp/wgp-extra
-                        # Si le source est déjà un symlink vers l'extérieur, on le garde tel quel
-                        if os.path.islink(source):
-                            link_target = os.readlink(source)
-                            if os.path.isabs(link_target) and not link_target.startswith(self.game_dir):
-                                # C'est un symlink externe, on le garde
-                                print(f"DEBUG: Preserving external symlink {source} -> {link_target}")
-                            else:
-                                # C'est un symlink interne, on le remplace
-                                os.remove(source)
-                                os.makedirs(os.path.dirname(source), exist_ok=True)
-                                extras_base = f"/tmp/wgp-extra/{self.internal_game_name}"
-                                os.symlink(os.path.join(extras_base, rel_path), source)
-                                print(f"DEBUG: Created symlink {source} -> {os.path.join(extras_base, rel_path)}")
-                        else:
-                            # C'est un vrai fichier/dossier, on le remplace
-                            if os.path.isdir(source):
-                                shutil.rmtree(source)
-                            else:
-                                os.remove(source)
-                            os.makedirs(os.path.dirname(source), exist_ok=True)
-                            extras_base = f"/tmp/wgp-extra/{self.internal_game_name}"
-                            os.symlink(os.path.join(extras_base, rel_path), source)
-                            print(f"DEBUG: Created symlink {source} -> {os.path.join(extras_base, rel_path)}")
+                self.finished.emit(False, f"Erreur: {str(e)}")
+            return
+        if result.returncode == 0:
+            self.finished.emit(True, self.wgp_file)
         else:
-            # Aucun extra : nettoyer les fichiers existants
-            extrapath_file = os.path.join(self.game_dir, '.extrapath')
-            if os.path.exists(extrapath_file):
-                os.remove(extrapath_file)
-            extras_dir = os.path.join(self.game_dir, '.extra')
-            if os.path.exists(extras_dir):
-                shutil.rmtree(extras_dir)
-            print(f"DEBUG: No extras to process - cleaned existing")
-
-        # Traiter les fichiers temporaires
-        if self.config.get('temps'):
-            # Vérifier si c'est le mode "full overlay" (marqueur *)
-            is_full_overlay = (len(self.config['temps']) == 1 and 
-                              self.config['temps'][0] == ('*', 'full_overlay'))
-            
-            if is_full_overlay:
-                # Mode "tout le dossier en overlay" - ne rien copier, juste écrire le marqueur
-                print(f"DEBUG: Mode full overlay détecté - aucun fichier à copier dans .temp")
-                with open(os.path.join(self.game_dir, '.temppath'), 'w') as f:
-                    f.write("*\n")
-            else:
-                # Mode normal : traiter les fichiers temporaires individuels
-                temps_dir = os.path.join(self.game_dir, '.temp')
-                os.makedirs(temps_dir, exist_ok=True)
-                print(f"DEBUG: Created temps_dir = {temps_dir}")
-
-                with open(os.path.join(self.game_dir, '.temppath'), 'w') as f:
-                    for item_type, rel_path in self.config['temps']:
-                        # Format compatible (sans préfixe)
-                        f.write(f"{rel_path}\n")
+            self.finished.emit(False, f"Erreur lors de la création: {result.stderr}")
+    
+    def cancel(self):
+        self.builder.cancel()
 
-                        # Créer le symlink
-                        source = os.path.join(self.game_dir, rel_path)
-                        target = os.path.join(temps_dir, rel_path)
-                        
-                        print(f"DEBUG: Processing temp: {rel_path} (type={item_type})")
-                        print(f"DEBUG: source = {source}, exists={os.path.exists(source)}")
-                        print(f"DEBUG: target = {target}")
 
-                        if os.path.exists(source):
-                            # Vérifier si c'est un symlink et sauvegarder sa cible
-                            if os.path.islink(source):
-                                original_target = os.readlink(source)
-                                # Garder la cible originale sans conversion
-                                symlinks_backup[rel_path] = original_target
-                                print(f"DEBUG: Backing up symlink {rel_path} -> {original_target}")
-                            
-                            # Copier vers .temp (contenu uniquement pour les dossiers)
-                            os.makedirs(os.path.dirname(target), exist_ok=True)
-                            if item_type == 'dir':
-                                print(f"DEBUG: Copying dir contents from {source} to {target}")
-                                self._copy_dir_contents(source, target)
-                            else:
-                                print(f"DEBUG: Copying file from {source} to {target}")
-                                shutil.copy2(source, target)
-                            
-                            # Vérifier que la copie a fonctionné
-                            if os.path.exists(target):
-                                print(f"DEBUG: Copy successful, target exists")
-                            else:
-                                print(f"DEBUG: ERROR - Copy failed, target does not exist!")
+class ExeIconThread(QThread):
+    """Extrait les icônes des .exe en arrière-plan (exeiconextract dans un pool de threads)
 
-                            # Créer le symlink vers /tmp/wgp-temp
-                            # Si le source est déjà un symlink vers l'extérieur, on le garde tel quel
-                            if os.path.islink(source):
-                                link_target = os.readlink(source)
-                                if os.path.isabs(link_target) and not link_target.startswith(self.game_dir):
-                                    # C'est un symlink externe, on le garde
-                                    print(f"DEBUG: Preserving external symlink {source} -> {link_target}")
-                                else:
-                                    # C'est un symlink interne, on le remplace
-                                    os.remove(source)
-                                    os.makedirs(os.path.dirname(source), exist_ok=True)
-                                    temps_base = f"/tmp/wgp-temp/{self.internal_game_name}"
-                                    os.symlink(os.path.join(temps_base, rel_path), source)
-                                    print(f"DEBUG: Created symlink {source} -> {os.path.join(temps_base, rel_path)}")
-                            else:
-                                # C'est un vrai fichier/dossier, on le remplace
-                                if os.path.isdir(source):
-                                    shutil.rmtree(source)
-                                else:
-                                    os.remove(source)
-                                os.makedirs(os.path.dirname(source), exist_ok=True)
-                                temps_base = f"/tmp/wgp-temp/{self.internal_game_name}"
-                                os.symlink(os.path.join(temps_base, rel_path), source)
-                                print(f"DEBUG: Created symlink {source} -> {os.path.join(temps_base, rel_path)}")
-        else:
-            # Aucun fichier temporaire : nettoyer les fichiers existants
-            temppath_file = os.path.join(self.game_dir, '.temppath')
-            if os.path.exists(temppath_file):
-                os.remove(temppath_file)
-            temps_dir = os.path.join(self.game_dir, '.temp')
-            if os.path.exists(temps_dir):
-                shutil.rmtree(temps_dir)
-            print(f"DEBUG: No temps to process - cleaned existing")
-        
-        # Sauvegarder les symlinks dans un fichier .symlinks_backup
-        if symlinks_backup:
-            symlinks_backup_file = os.path.join(self.game_dir, '.symlinks_backup')
-            with open(symlinks_backup_file, 'w') as f:
-                for rel_path, target in symlinks_backup.items():
-                    f.write(f"{rel_path}|{target}\n")
-            print(f"DEBUG: Saved {len(symlinks_backup)} symlinks to {symlinks_backup_file}")
+    Les icônes décodées sont gardées dans le cache d'icônes (iconcache) : à la
+    réouverture du dossier, elles sont affichées sans relire les exe.
+    """
+    icon_ready = Signal(str, str, bool)  # (chemin relatif de l'exe, PNG, fichier temporaire)
     
-    def create_squashfs(self, wgp_file):
-        """Crée l'archive squashfs avec progression temps réel basée sur la taille des fichiers"""
-        import subprocess
-        import re
-        
-        comp_level = self.config['compression']
-        
-        # Calculer la taille totale du dossier source AVANT de lancer mksquashfs
-        # IMPORTANT: Ne PAS exclure .save et .extra car ils contiennent les données !
-        total_size = 0
-        for root, dirs, files in os.walk(self.game_dir):
-            dirs[:] = [d for d in dirs if d not in ['__pycache__']]
-            for file in files:
-                filepath = os.path.join(root, file)
-                try:
-                    total_size += os.path.getsize(filepath)
-                except OSError:
-                    pass
-        
-        if total_size == 0:
-            total_size = 1  # Éviter division par zéro
-        
-        # Formater la taille totale pour l'affichage
-        def format_size(size_bytes):
-            if size_bytes < 1024:
-                return f"{size_bytes} B"
-            elif size_bytes < 1024 * 1024:
-                return f"{size_bytes / 1024:.1f} KB"
-            elif size_bytes < 1024 * 1024 * 1024:
-                return f"{size_bytes / (1024 * 1024):.1f} MB"
-            else:
-                return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
-        
-        total_size_str = format_size(total_size)
-        
-        cmd = [
-            'mksquashfs',
-            self.game_dir,
-            wgp_file,
-            '-comp', 'zstd',
-            '-Xcompression-level', str(comp_level),
-            '-noappend',
-            '-wildcards',
-            '-percentage',  # Affiche uniquement le pourcentage
-            '-progress'     # Force l'affichage même sans TTY
-        ]
-        
-        # Exclure les fichiers temporaires (mais PAS .save et .extra qui contiennent les données)
-        excludes = ['*.tmp', '*.log']
-        for exclude in excludes:
-            cmd.extend(['-e', exclude])
-        
-        # Lancer mksquashfs sans capture de sortie (on ne peut pas parser la progression sans TTY)
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        
-        # Fonction pour surveiller la taille du fichier WGP en parallèle
-        import threading
-        import time
-        
-        progress_data = {
-            'wgp_size': 0,
-            'finished': False,
-            'lock': threading.Lock()
-        }
-        
-        def watch_wgp_size():
-            """Surveille la taille du fichier WGP et met à jour progress_data"""
-            last_size = 0
-            while not progress_data['finished']:
-                try:
-                    if os.path.exists(wgp_file):
-                        size = os.path.getsize(wgp_file)
-                        if size != last_size:
-                            with progress_data['lock']:
-                                progress_data['wgp_size'] = size
-                            last_size = size
-                except OSError:
-                    pass
-                time.sleep(0.5)
-        
-        # Démarrer le thread de surveillance
-        self.progress.emit(0, "Démarrage de la compression...")
-        watch_thread = threading.Thread(target=watch_wgp_size)
-        watch_thread.daemon = True
-        watch_thread.start()
-        
-        # Boucle principale : afficher juste les tailles
-        last_wgp_size = 0
-        
-        while True:
-            time.sleep(0.5)  # Mettre à jour toutes les 0.5s
-            
-            with progress_data['lock']:
-                wgp_size = progress_data['wgp_size']
-            
-            # Mettre à jour seulement si la taille a changé
-            if wgp_size != last_wgp_size:
-                last_wgp_size = wgp_size
-                wgp_size_str = format_size(wgp_size)
-                self.progress.emit(0, f"{total_size_str} → {wgp_size_str}")
-            
-            # Vérifier si le processus est terminé
-            if process.poll() is not None:
-                with progress_data['lock']:
-                    progress_data['finished'] = True
-                break
-            
-            # Vérifier si annulation demandée
-            if self.cancelled:
-                process.terminate()
-                try:
-                    process.wait(timeout=5)
-                except:
-                    process.kill()
-                return subprocess.CompletedProcess(cmd, -1, '', 'Annulé par l\'utilisateur')
-        
-        # Attendre la fin du processus
-        process.wait()
-        
-        # Créer un objet CompletedProcess similaire à subprocess.run
-        return subprocess.CompletedProcess(cmd, process.returncode, '', '')
+    MAX_EXES = 50  # Comme la limite d'icônes affichées
+    VARIANT = 'icon.png'
     
-    def cleanup(self):
-        """Nettoie les fichiers temporaires et restaure les fichiers originaux"""
-        self.restore_files()
-        self.cleanup_dirs_only()
+    def __init__(self, game_dir, exe_files, parent=None):
+        super().__init__(parent)
+        self.game_dir = game_dir
+        self.exe_files = exe_files[:self.MAX_EXES]
+        self.cache = iconcache.IconCache()
+        self.cancelled = False
     
-    def cleanup_dirs_only(self):
-        """Supprime uniquement les dossiers .save, .extra et .temp sans restaurer les fichiers"""
-        for f in ['.save', '.extra', '.temp']:
-            path = os.path.join(self.game_dir, f)
-            if os.path.exists(path):
-                shutil.rmtree(path)
-
-        # Supprimer aussi le fichier de backup des symlinks
-        symlinks_backup_file = os.path.join(self.game_dir, '.symlinks_backup')
-        if os.path.exists(symlinks_backup_file):
-            os.remove(symlinks_backup_file)
+    def cancel(self):
+        self.cancelled = True
     
-    def restore_files(self):
-        """Restaure les fichiers originaux depuis .save et .extra (compatible makewgp.sh)"""
-        print(f"DEBUG: restore_files called")
-        print(f"DEBUG: game_dir = {self.game_dir}")
-        
-        # Charger le fichier de backup des symlinks s'il existe
-        symlinks_backup = {}
-        symlinks_backup_file = os.path.join(self.game_dir, '.symlinks_backup')
-        if os.path.exists(symlinks_backup_file):
-            with open(symlinks_backup_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if '|' in line:
-                        rel_path, target = line.split('|', 1)
-                        symlinks_backup[rel_path] = target
-            print(f"DEBUG: Loaded {len(symlinks_backup)} symlinks from backup file")
-        
-        # Restaurer depuis .save en utilisant .savepath
-        savepath_file = os.path.join(self.game_dir, '.savepath')
-        saves_backup_dir = os.path.join(self.game_dir, '.save')
-        print(f"DEBUG: savepath_file = {savepath_file}, exists={os.path.exists(savepath_file)}")
-        print(f"DEBUG: saves_backup_dir = {saves_backup_dir}, exists={os.path.exists(saves_backup_dir)}")
-        
-        if os.path.exists(savepath_file) and os.path.exists(saves_backup_dir):
-            print(f"DEBUG: Restoring saves...")
-            with open(savepath_file, 'r') as f:
-                for line in f:
-                    rel_path = line.strip()
-                    if not rel_path:
-                        continue
-
-                    backup_path = os.path.join(saves_backup_dir, rel_path)
-                    original_path = os.path.join(self.game_dir, rel_path)
-                    
-                    print(f"DEBUG: Restoring save: {rel_path}")
-                    print(f"DEBUG: backup_path = {backup_path}, exists={os.path.exists(backup_path)}")
-                    print(f"DEBUG: original_path = {original_path}")
-
-                    if not os.path.exists(backup_path):
-                        print(f"DEBUG: WARNING - backup_path does not exist, skipping")
-                        continue
-
-                    # Supprimer le symlink existant
-                    if os.path.islink(original_path):
-                        print(f"DEBUG: Removing symlink {original_path}")
-                        os.remove(original_path)
-                    elif os.path.exists(original_path):
-                        print(f"DEBUG: Removing existing {original_path}")
-                        if os.path.isdir(original_path):
-                            shutil.rmtree(original_path)
-                        else:
-                            os.remove(original_path)
-
-                    # Restaurer depuis backup (contenu uniquement pour les dossiers)
-                    os.makedirs(os.path.dirname(original_path), exist_ok=True)
-                    
-                    # Vérifier si c'était un symlink original
-                    if rel_path in symlinks_backup:
-                        original_target = symlinks_backup[rel_path]
-                        print(f"DEBUG: Restoring original symlink {rel_path} -> {original_target}")
-                        os.symlink(original_target, original_path)
-                    elif os.path.isdir(backup_path):
-                        print(f"DEBUG: Copying dir contents from {backup_path} to {original_path}")
-                        self._copy_dir_contents(backup_path, original_path)
-                    else:
-                        print(f"DEBUG: Copying file from {backup_path} to {original_path}")
-                        shutil.copy2(backup_path, original_path)
-                    
-                    print(f"DEBUG: Restore complete for {rel_path}")
-
-        # Restaurer depuis .extra en utilisant .extrapath
-        extrapath_file = os.path.join(self.game_dir, '.extrapath')
-        extras_backup_dir = os.path.join(self.game_dir, '.extra')
-        if os.path.exists(extrapath_file) and os.path.exists(extras_backup_dir):
-            with open(extrapath_file, 'r') as f:
-                for line in f:
-                    rel_path = line.strip()
-                    if not rel_path:
-                        continue
-
-                    backup_path = os.path.join(extras_backup_dir, rel_path)
-                    original_path = os.path.join(self.game_dir, rel_path)
-
-                    if not os.path.exists(backup_path):
-                        continue
-
-                    # Supprimer le symlink existant
-                    if os.path.islink(original_path):
-                        os.remove(original_path)
-                    elif os.path.exists(original_path):
-                        if os.path.isdir(original_path):
-                            shutil.rmtree(original_path)
-                        else:
-                            os.remove(original_path)
-
-                    # Restaurer depuis backup (contenu uniquement pour les dossiers)
-                    os.makedirs(os.path.dirname(original_path), exist_ok=True)
-                    
-                    # Vérifier si c'était un symlink original
-                    if rel_path in symlinks_backup:
-                        original_target = symlinks_backup[rel_path]
-                        print(f"DEBUG: Restoring original symlink {rel_path} -> {original_target}")
-                        os.symlink(original_target, original_path)
-                    elif os.path.isdir(backup_path):
-                        self._copy_dir_contents(backup_path, original_path)
-                    else:
-                        shutil.copy2(backup_path, original_path)
-
-        # Restaurer depuis .temp en utilisant .temppath
-        temppath_file = os.path.join(self.game_dir, '.temppath')
-        temps_backup_dir = os.path.join(self.game_dir, '.temp')
-        if os.path.exists(temppath_file) and os.path.exists(temps_backup_dir):
-            with open(temppath_file, 'r') as f:
-                for line in f:
-                    rel_path = line.strip()
-                    if not rel_path:
-                        continue
-
-                    backup_path = os.path.join(temps_backup_dir, rel_path)
-                    original_path = os.path.join(self.game_dir, rel_path)
-
-                    if not os.path.exists(backup_path):
+    def run(self):
+        seen = set()  # Icône partagée par plusieurs exe (lanceur, désinstalleur...) : une seule fois
+        handled = set()
+        workers = min(8, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self._icon_png, rel_path): rel_path for rel_path in self.exe_files}
+            for future in as_completed(futures):
+                if self.cancelled:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                rel_path = futures[future]
+                handled.add(future)
+                try:
+                    png_file, temporary = future.result()
+                    if png_file is None:
                         continue
-
-                    # Supprimer le symlink existant
-                    if os.path.islink(original_path):
-                        os.remove(original_path)
-                    elif os.path.exists(original_path):
-                        if os.path.isdir(original_path):
-                            shutil.rmtree(original_path)
-                        else:
-                            os.remove(original_path)
-
-                    # Restaurer depuis backup (contenu uniquement pour les dossiers)
-                    os.makedirs(os.path.dirname(original_path), exist_ok=True)
-                    
-                    # Vérifier si c'était un symlink original
-                    if rel_path in symlinks_backup:
-                        original_target = symlinks_backup[rel_path]
-                        print(f"DEBUG: Restoring original symlink {rel_path} -> {original_target}")
-                        os.symlink(original_target, original_path)
-                    elif os.path.isdir(backup_path):
-                        self._copy_dir_contents(backup_path, original_path)
-                    else:
-                        shutil.copy2(backup_path, original_path)
+                    with open(png_file, 'rb') as f:
+                        data = f.read()
+                except Exception as e:
+                    print(f"Erreur extraction icône de {rel_path}: {e}")
+                    continue
+                if data in seen:
+                    if temporary:
+                        os.remove(png_file)
+                    continue
+                seen.add(data)
+                self.icon_ready.emit(rel_path, png_file, temporary)
+        if self.cancelled:
+            # PNG temporaires des extractions terminées mais non transmises (pool arrêté)
+            for future in futures.keys() - handled:
+                if not future.cancelled() and future.exception() is None:
+                    png_file, temporary = future.result()
+                    if temporary and png_file and os.path.exists(png_file):
+                        os.remove(png_file)
+            return
+        self.cache.trim()
     
-    def cancel(self):
-        self.cancelled = True
+    def _icon_png(self, rel_path):
+        """PNG de l'icône d'un exe : (chemin, temporaire), depuis le cache si possible"""
+        exe_path = os.path.join(self.game_dir, rel_path)
+        try:
+            entry = self.cache.entry(exe_path)
+            cached = entry.get(self.VARIANT)
+        except OSError:
+            entry = cached = None
+        if cached is not None or self.cancelled:
+            return cached, False
+        
+        icon = exeiconextract.best_icon(exe_path)
+        if icon is None:
+            return None, False
+        # Décodage ICO dans le processus (icodecode), sinon par Qt (QImage utilisable hors du thread graphique)
+        png = icodecode.ico_png(icon.data)
+        if png is None:
+            image = QImage.fromData(icon.data, 'ICO')
+            buffer = QBuffer()
+            buffer.open(QIODevice.WriteOnly)
+            if image.isNull() or not image.save(buffer, 'PNG'):
+                return None, False
+            png = bytes(buffer.data())
+        if entry is not None:
+            try:
+                return entry.put(self.VARIANT, png), False
+            except OSError:
+                pass  # Cache non inscriptible : fichier temporaire
+        png_file = os.path.join(tempfile.gettempdir(), f'wgp_icon_{uuid.uuid4().hex}.png')
+        with open(png_file, 'wb') as f:
+            f.write(png)
+        return png_file, True
 
 
 class WGPWindow(QMainWindow):
@@ -1276,9 +648,12 @@ class WGPWindow(QMainWindow):
         options_layout.addWidget(comp_label)
         
         self.comp_combo = QComboBox()
-        self.comp_combo.addItems(["Non (0)", "Faible (5)", "Moyenne (10)", "Élevée (15)", "Max (19)"])
+        self.comp_combo.addItems(["Non (0)", "Faible (5)", "Moyenne (10)", "Élevée (15)", "Max (19)",
+                                  "Auto (chargement)", "Auto (taille)"])
         self.comp_combo.setCurrentIndex(3)  # 15 par défaut
         self.comp_combo.setMinimumWidth(130)
+        self.comp_combo.setToolTip("Auto : essais sur un échantillon du jeu pour choisir le profil\n"
+                                   "le plus rapide à charger ou le plus compact")
         options_layout.addWidget(self.comp_combo)
         
         options_layout.addSpacing(20)
@@ -1288,6 +663,21 @@ class WGPWindow(QMainWindow):
         self.full_temp_checkbox.stateChanged.connect(self.toggle_full_temp)
         options_layout.addWidget(self.full_temp_checkbox)
         
+        self.zero_copy_checkbox = QCheckBox("Sans copie")
+        self.zero_copy_checkbox.setChecked(True)
+        self.zero_copy_checkbox.setToolTip("Saves/extras/temps injectés via pseudo-fichiers mksquashfs : le dossier du jeu n'est pas modifié")
+        options_layout.addWidget(self.zero_copy_checkbox)
+        
+        self.verify_checkbox = QCheckBox("Vérifier")
+        self.verify_checkbox.setToolTip("Relit le paquet après création et le compare aux fichiers du jeu\n"
+                                        "(empreintes enregistrées pour wgpcheck --verify)")
+        options_layout.addWidget(self.verify_checkbox)
+        
+        self.digest_checkbox = QCheckBox("Empreinte de l'image")
+        self.digest_checkbox.setToolTip("Ajoute au manifeste l'empreinte du paquet entier (une relecture complète)\n"
+                                        "Sans elle ni vérification, wgpcheck --verify indique « non vérifiable »")
+        options_layout.addWidget(self.digest_checkbox)
+        
         options_layout.addStretch()
         
         left_layout.addWidget(options_group)
@@ -1416,6 +806,13 @@ class WGPWindow(QMainWindow):
         
         button_layout.addStretch()
         
+        self.profile_btn = QPushButton("Profiler le lancement")
+        self.profile_btn.setMinimumHeight(40)
+        self.profile_btn.setToolTip("Enregistre l'ordre de chargement des fichiers au lancement du jeu\n"
+                                    "pour les placer en tête du paquet")
+        self.profile_btn.clicked.connect(self.profile_launch)
+        button_layout.addWidget(self.profile_btn)
+        
         self.create_btn = QPushButton("Créer le WGP")
         self.create_btn.setObjectName("create_btn")
         self.create_btn.setMinimumWidth(140)
@@ -1436,13 +833,43 @@ class WGPWindow(QMainWindow):
         self.internal_game_name = ""  # Nom interne pour .gamename et chemins
         self.pds_path = ""  # Chemin vers le fichier .pds
         self.temp_icons = []  # Liste des icônes temporaires à nettoyer
+        self.exe_icon_thread = None  # Extraction des icônes des .exe en cours
+        self.index = None  # Index du dossier du jeu (gameindex), construit au chargement
+        self.tune_result = None  # Dernier résultat de la compression automatique (packtune)
         self._current_icon_size = 64
     
+    def _recover_staging(self):
+        """Annule le staging d'une création interrompue (journal packjournal)"""
+        try:
+            result = packjournal.recover(self.game_dir)
+        except OSError as e:
+            result = (False, 0)
+            print(f"DEBUG: Échec de la restauration: {e}")
+        if result is None:
+            return
+        ok, count = result
+        if ok:
+            print(f"DEBUG: Création interrompue annulée ({count} opérations)")
+        else:
+            QMessageBox.warning(
+                self, "Restauration incomplète",
+                "Une création précédente a été interrompue et certains fichiers n'ont pas pu "
+                "être remis en place automatiquement.\n\n"
+                f"Vérifiez les dossiers .save, .extra et .temp de :\n{self.game_dir}\n\n"
+                f"Journal : {packjournal.journal_path(self.game_dir)}"
+            )
+
     def load_game_directory(self, game_dir):
         """Charge le dossier du jeu et les fichiers de configuration existants"""
         self.game_dir = os.path.abspath(game_dir)
         dir_name = os.path.basename(self.game_dir)
         
+        # Création précédente interrompue (crash, kill) : remettre le dossier en état
+        self._recover_staging()
+        
+        # Index unique du dossier : toutes les recherches ci-dessous l'interrogent
+        self.index = gameindex.GameIndex(self.game_dir)
+        
         # Charger le nom interne du jeu depuis .gamename si existe
         gamename_file = os.path.join(self.game_dir, '.gamename')
         if os.path.exists(gamename_file):
@@ -1565,14 +992,8 @@ class WGPWindow(QMainWindow):
         
         # Rechercher les .exe et .bat
         self.exe_files = []
-        for root, dirs, files in os.walk(self.game_dir):
-            # Ignorer les dossiers spéciaux
-            dirs[:] = [d for d in dirs if d not in ['.save', '.extra', '__pycache__']]
-            
-            for file in files:
-                if file.lower().endswith(('.exe', '.bat')):
-                    rel_path = os.path.relpath(os.path.join(root, file), self.game_dir)
-                    self.exe_files.append(rel_path)
+        for entry in self.index.files(('.exe', '.bat'), exclude_dirs=['.save', '.extra', '__pycache__']):
+            self.exe_files.append(entry.rel_path)
         
         self.exe_files.sort()
         self.exe_list.clear()
@@ -1700,53 +1121,35 @@ class WGPWindow(QMainWindow):
                 'source': 'existing'
             })
         
-        # 2. Extraire les icônes des .exe (prioritaire - avant les autres)
+        # 2. Icônes des .exe : extraites en arrière-plan, insérées avant les autres à l'arrivée
         self.extract_icons_from_all_exes()
         
         # 3. Chercher les fichiers .ico
-        for root, dirs, files in os.walk(self.game_dir):
-            # Ignorer certains dossiers
-            dirs[:] = [d for d in dirs if d not in ['.save', '.extra', '__pycache__', 
-                                                     'screenshots', 'textures', 'images', 
-                                                     'data', 'assets', 'sounds', 'music']]
-            for file in files:
-                if file.lower().endswith('.ico'):
-                    full_path = os.path.join(root, file)
-                    self.available_icons.append({
-                        'path': full_path,
-                        'name': os.path.splitext(file)[0][:20],
-                        'source': 'ico'
-                    })
+        ico_entries = self.index.files(('.ico',), exclude_dirs=[
+            '.save', '.extra', '__pycache__', 'screenshots', 'textures', 'images',
+            'data', 'assets', 'sounds', 'music'])
+        for entry in ico_entries:
+            self.available_icons.append({
+                'path': os.path.join(self.game_dir, entry.rel_path),
+                'name': os.path.splitext(entry.name)[0][:20],
+                'source': 'ico'
+            })
         
         # 4. Chercher les images qui semblent être des icônes (carrées et petite taille)
-        for root, dirs, files in os.walk(self.game_dir):
-            # Ignorer certains dossiers de données
-            dirs[:] = [d for d in dirs if d not in ['.save', '.extra', '__pycache__', 
-                                                     'screenshots', 'textures', 'images', 
-                                                     'data', 'assets', 'sounds', 'music',
-                                                     'saves', 'save', 'userdata']]
-            for file in files:
-                file_lower = file.lower()
-                if file_lower.endswith(('.png', '.jpg', '.jpeg', '.bmp')):
-                    full_path = os.path.join(root, file)
-                    # Vérifier si c'est une icône (carrée et taille typique)
-                    try:
-                        pixmap = QPixmap(full_path)
-                        if not pixmap.isNull():
-                            width = pixmap.width()
-                            height = pixmap.height()
-                            # Doit être carré (ratio 1:1) et taille typique d'icône
-                            is_square = abs(width - height) <= 2  # Tolérance de 2 pixels
-                            is_icon_size = 16 <= width <= 512  # Entre 16 et 512 px
-                            
-                            if is_square and is_icon_size:
-                                self.available_icons.append({
-                                    'path': full_path,
-                                    'name': os.path.splitext(file)[0][:20],
-                                    'source': 'image'
-                                })
-                    except:
-                        pass
+        image_entries = self.index.files(('.png', '.jpg', '.jpeg', '.bmp'), exclude_dirs=[
+            '.save', '.extra', '__pycache__', 'screenshots', 'textures', 'images',
+            'data', 'assets', 'sounds', 'music', 'saves', 'save', 'userdata'])
+        for entry in image_entries:
+            if len(self.available_icons) >= 50:
+                break  # Liste pleine : inutile de sonder les autres images
+            full_path = os.path.join(self.game_dir, entry.rel_path)
+            # Carrée et de taille d'icône, d'après l'en-tête seul (pas de décodage des textures)
+            if imageprobe.looks_like_icon(full_path, entry.size):
+                self.available_icons.append({
+                    'path': full_path,
+                    'name': os.path.splitext(entry.name)[0][:20],
+                    'source': 'image'
+                })
         
         # Limiter à 50 icônes max pour ne pas surcharger l'interface
         if len(self.available_icons) > 50:
@@ -1756,42 +1159,55 @@ class WGPWindow(QMainWindow):
         self.update_icons_display()
     
     def extract_icons_from_all_exes(self):
-        """Extrait les icônes de tous les .exe du dossier en utilisant exeiconextract.py"""
-        import tempfile
-        
-        # Chemin relatif vers exeiconextract.py (même dossier que makewgp.py)
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        exeiconextract_path = os.path.join(script_dir, 'exeiconextract.py')
-        
-        exe_files = []
-        for root, dirs, files in os.walk(self.game_dir):
-            dirs[:] = [d for d in dirs if d not in ['.save', '.extra', '__pycache__']]
-            for file in files:
-                if file.lower().endswith('.exe'):
-                    exe_files.append(os.path.join(root, file))
+        """Lance l'extraction des icônes des .exe du dossier (ExeIconThread)"""
+        self.stop_exe_icon_thread()
+        exe_files = [entry.rel_path for entry in
+                     self.index.files(('.exe',), exclude_dirs=['.save', '.extra', '__pycache__'])]
+        if not exe_files:
+            return
+        self.exe_icon_thread = ExeIconThread(self.game_dir, exe_files, self)
+        self.exe_icon_thread.icon_ready.connect(self.on_exe_icon_ready)
+        self.exe_icon_thread.start()
+    
+    def stop_exe_icon_thread(self):
+        """Arrête l'extraction en cours (changement de dossier, fermeture)"""
+        if self.exe_icon_thread is None:
+            return
+        self.exe_icon_thread.icon_ready.disconnect(self.on_exe_icon_ready)
+        self.exe_icon_thread.cancel()
+        self.exe_icon_thread.wait()
+        self.exe_icon_thread = None
+    
+    def on_exe_icon_ready(self, rel_path, png_file, temporary):
+        """Ajoute l'icône d'un .exe à la grille dès son extraction"""
+        if temporary:
+            self.temp_icons.append(png_file)  # Marquer pour nettoyage
+        if self.sender() is not self.exe_icon_thread:
+            return  # Signal d'une extraction précédente encore en file d'attente
+        exe_name = os.path.splitext(os.path.basename(rel_path))[0]
+        # Après l'icône existante et les icônes d'exe déjà arrivées
+        position = 0
+        while (position < len(self.available_icons)
+               and self.available_icons[position]['source'] in ('existing', 'exe')):
+            position += 1
+        self.available_icons.insert(position, {
+            'path': png_file,
+            'name': f"Exe: {exe_name[:12]}",
+            'source': 'exe'
+        })
+        # Limiter à 50 icônes max pour ne pas surcharger l'interface
+        del self.available_icons[50:]
         
-        # Limiter à 10 exe max pour éviter d'être trop long
-        for exe_path in exe_files[:10]:
-            try:
-                # Utiliser exeiconextract.py pour extraire l'icône
-                png_file = os.path.join(tempfile.gettempdir(), f'wgp_icon_{uuid.uuid4().hex}.png')
-                
-                result = subprocess.run(
-                    ['/usr/bin/python3', exeiconextract_path, exe_path, png_file],
-                    capture_output=True, timeout=30
-                )
-                
-                if result.returncode == 0 and os.path.exists(png_file):
-                    exe_name = os.path.splitext(os.path.basename(exe_path))[0]
-                    self.available_icons.append({
-                        'path': png_file,
-                        'name': f"Exe: {exe_name[:12]}",
-                        'source': 'exe'
-                    })
-                    self.temp_icons.append(png_file)  # Marquer pour nettoyage
-                    
-            except Exception as e:
-                print(f"Erreur extraction icône de {exe_path}: {e}")
+        # Conserver la sélection, ou suivre l'exe sélectionné si c'est son icône
+        selected = self.icon_path
+        self.update_icons_display()
+        row = self.exe_list.currentRow()
+        if 0 <= row < len(self.exe_files) and self.exe_files[row] == rel_path:
+            self.select_icon_for_exe(rel_path)
+        else:
+            paths = [icon['path'] for icon in self.available_icons]
+            if selected in paths:
+                self.select_icon(paths.index(selected))
     
     def update_icons_display(self):
         """Met à jour l'affichage des icônes disponibles"""
@@ -1998,6 +1414,7 @@ class WGPWindow(QMainWindow):
 
     def closeEvent(self, event):
         """Appelé à la fermeture de la fenêtre"""
+        self.stop_exe_icon_thread()
         self.cleanup_temp_icons()
         event.accept()
     
@@ -2166,6 +1583,7 @@ class WGPWindow(QMainWindow):
                         try:
                             shutil.copy2(file_path, dest_path)
                             file_path = dest_path
+                            self.index.invalidate(os.path.relpath(dest_path, self.game_dir))
                             QMessageBox.information(self, "Fichier copié", 
                                 f"Fichier copié dans:\n{dest_path}")
                         except Exception as e:
@@ -2223,6 +1641,7 @@ class WGPWindow(QMainWindow):
                         try:
                             shutil.copytree(dir_path, dest_path)
                             dir_path = dest_path
+                            self.index.invalidate(os.path.relpath(dest_path, self.game_dir))
                             QMessageBox.information(self, "Dossier copié", 
                                 f"Dossier copié dans:\n{dest_path}")
                         except Exception as e:
@@ -2369,6 +1788,180 @@ class WGPWindow(QMainWindow):
             if os.path.exists(temppath_file):
                 os.remove(temppath_file)
     
+    def _run_autotune(self, target):
+        """Essaie les profils de compression sur un échantillon et demande confirmation
+
+        Returns:
+            profil retenu (dict packtune) ou None si annulé
+        """
+        dialog = QProgressDialog("Échantillonnage du jeu...", "Annuler", 0, 100, self)
+        dialog.setWindowTitle("Compression automatique")
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(0)
+        dialog.setValue(0)
+
+        state = {'percent': 0, 'message': "", 'result': None}
+        tuner = packtune.Autotuner(
+            self.game_dir, target, index=self.index,
+            callback=lambda pct, msg: state.update(percent=pct, message=msg)
+        )
+        worker = threading.Thread(target=lambda: state.update(result=tuner.run()), daemon=True)
+        worker.start()
+        while worker.is_alive():
+            if dialog.wasCanceled():
+                tuner.cancel()
+            dialog.setValue(state['percent'])
+            dialog.setLabelText(state['message'])
+            QApplication.processEvents()
+            worker.join(0.05)
+        dialog.close()
+
+        result = state['result']
+        if tuner.cancelled:
+            return None
+        if result is None:
+            QMessageBox.warning(self, "Compression automatique",
+                                "Les essais de compression ont échoué.")
+            return None
+        reply = QMessageBox.question(
+            self, "Compression automatique",
+            f"{result.describe()}\n\nLancer la création avec ce profil ?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.Yes
+        )
+        if reply != QMessageBox.Yes:
+            return None
+        self.tune_result = result
+        return result.best.profile
+
+    def _check_destination(self, output_dir, filename, profile):
+        """Estime taille et durée du paquet, vérifie l'espace libre et propose un disque plus rapide
+
+        Returns:
+            dossier de destination retenu, ou None si annulé
+        """
+        dialog = QProgressDialog("Estimation de la taille du paquet...", "Annuler", 0, 100, self)
+        dialog.setWindowTitle("Estimation")
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(0)
+        dialog.setValue(0)
+
+        # Compression automatique : l'échantillon déjà mesuré suffit
+        state = {'percent': 0, 'message': "", 'result': None}
+        predictor = packpredict.Predictor(
+            self.game_dir, profile, output_dir, index=self.index, tune_result=self.tune_result,
+            callback=lambda pct, msg: state.update(percent=pct, message=msg)
+        )
+        worker = threading.Thread(target=lambda: state.update(result=predictor.run()), daemon=True)
+        worker.start()
+        while worker.is_alive():
+            if dialog.wasCanceled():
+                predictor.cancel()
+            dialog.setValue(state['percent'])
+            dialog.setLabelText(state['message'])
+            QApplication.processEvents()
+            worker.join(0.05)
+        dialog.close()
+
+        admission = state['result']
+        if predictor.cancelled:
+            return None
+        if admission is None:
+            return output_dir  # Estimation impossible : création sans contrôle
+        if admission.suggestion is not None:
+            reply = QMessageBox.question(
+                self, "Destination",
+                f"{admission.describe()}\n\nCréer le paquet dans {admission.suggestion.path} ?",
+                QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
+                QMessageBox.Yes
+            )
+            if reply == QMessageBox.Cancel:
+                return None
+            if reply == QMessageBox.Yes:
+                pack_file = os.path.join(admission.suggestion.path, f"{filename}.wgp")
+                if os.path.exists(pack_file) and QMessageBox.question(
+                        self, "Fichier existant",
+                        f"{os.path.basename(pack_file)} existe déjà. Voulez-vous l'écraser ?",
+                        QMessageBox.Yes | QMessageBox.No) != QMessageBox.Yes:
+                    return None
+                return admission.suggestion.path
+        if admission.level == 'refuse':
+            QMessageBox.critical(self, "Destination",
+                                 f"{admission.describe()}\n\nCréation impossible dans {output_dir}.")
+            return None
+        if admission.level == 'warn':
+            reply = QMessageBox.question(
+                self, "Destination",
+                f"{admission.describe()}\n\nContinuer quand même ?",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return None
+        return output_dir
+
+    def profile_launch(self):
+        """Lance le jeu sous strace et enregistre l'ordre d'accès à ses fichiers (.launchorder)"""
+        if self.is_creating:
+            return
+        exe = self.exe_list.currentItem().text() if self.exe_list.currentItem() else None
+        if not exe:
+            QMessageBox.warning(self, "Attention", "Veuillez sélectionner un exécutable.")
+            return
+
+        duration = launchprofile.DEFAULT_DURATION
+        reply = QMessageBox.question(
+            self, "Profiler le lancement",
+            f"Le jeu va être lancé et ses accès fichiers enregistrés pendant {duration} s.\n"
+            f"Allez jusqu'au menu ou au premier chargement, puis laissez le jeu se fermer.\n\n"
+            f"À la création du paquet, ces fichiers seront placés en tête de l'image "
+            f"(chargements plus rapides sur HDD et carte SD).",
+            QMessageBox.Ok | QMessageBox.Cancel,
+            QMessageBox.Ok
+        )
+        if reply != QMessageBox.Ok:
+            return
+
+        cmd = launchprofile.launch_command(self.game_dir, exe, self.args_input.text(), 'wgp')
+        dialog = QProgressDialog("Lancement du jeu...", "Arrêter", 0, duration, self)
+        dialog.setWindowTitle("Profiler le lancement")
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(0)
+
+        state = {'elapsed': 0, 'count': 0, 'order': None, 'error': None}
+        recorder = launchprofile.LaunchRecorder(
+            self.game_dir, cmd, duration,
+            callback=lambda sec, count: state.update(elapsed=sec, count=count)
+        )
+
+        def record():
+            try:
+                state['order'] = recorder.run()
+            except (RuntimeError, OSError) as e:
+                state['error'] = str(e)
+
+        worker = threading.Thread(target=record, daemon=True)
+        worker.start()
+        while worker.is_alive():
+            if dialog.wasCanceled():
+                recorder.cancel()
+            dialog.setValue(min(state['elapsed'], duration))
+            dialog.setLabelText(f"Enregistrement : {state['count']} fichiers ouverts")
+            QApplication.processEvents()
+            worker.join(0.1)
+        dialog.close()
+
+        if state['error']:
+            QMessageBox.critical(self, "Erreur", f"Profilage impossible : {state['error']}")
+            return
+        launchprofile.write_launch_order(self.game_dir, state['order'])
+        if self.index is not None:
+            self.index.invalidate(launchprofile.LAUNCH_ORDER_FILE)
+        QMessageBox.information(
+            self, "Profiler le lancement",
+            f"{len(state['order'])} fichiers enregistrés dans l'ordre de chargement."
+        )
+
     def start_create_wgp(self):
         """Démarre la création du WGP"""
         if self.is_creating:
@@ -2409,6 +2002,25 @@ class WGPWindow(QMainWindow):
             if reply == QMessageBox.No:
                 return
         
+        # Compression automatique : essais sur un échantillon avant de lancer
+        comp_text = self.comp_combo.currentText()
+        profile = None
+        self.tune_result = None
+        if comp_text.startswith("Auto"):
+            profile = self._run_autotune('size' if 'taille' in comp_text else 'load')
+            if profile is None:
+                return
+            comp_level = profile['level'] or 15
+        else:
+            comp_level = int(comp_text.split('(')[1].rstrip(')'))
+        
+        # Taille et durée estimées : refus si la place manque, disque plus rapide proposé
+        output_dir = self._check_destination(
+            output_dir, output_filename, profile or packtune.config_profile({'compression': comp_level})
+        )
+        if not output_dir:
+            return
+        
         # Récupérer le nom interne du jeu depuis le champ
         internal_game_name = self.internal_name_input.text().strip()
         if not internal_game_name:
@@ -2431,11 +2043,15 @@ class WGPWindow(QMainWindow):
             'icon': self.icon_path,
             'fix_controller': self.fix_checkbox.isChecked(),
             'xbox_filter': xbox_filter,
-            'compression': int(self.comp_combo.currentText().split('(')[1].rstrip(')')),
+            'compression': comp_level,
+            'profile': profile,
             'saves': self.saves,
             'extras': self.extras,
             'temps': self.temps,
-            'pds': pds_path if pds_path else None
+            'pds': pds_path if pds_path else None,
+            'zero_copy': self.zero_copy_checkbox.isChecked(),
+            'verify': self.verify_checkbox.isChecked(),
+            'image_digest': self.digest_checkbox.isChecked()
         }
         
         # Désactiver le bouton créer
@@ -2443,8 +2059,8 @@ class WGPWindow(QMainWindow):
         self.create_btn.setEnabled(False)
         self.create_btn.setText("Création en cours...")
         
-        # Créer une fenêtre de progression sans barre (juste texte + bouton annuler)
-        from PySide6.QtWidgets import QDialog, QVBoxLayout, QPushButton, QHBoxLayout
+        # Créer une fenêtre de progression (barre + texte + bouton annuler)
+        from PySide6.QtWidgets import QDialog, QVBoxLayout, QPushButton, QHBoxLayout, QProgressBar
         
         self.progress_dialog = QDialog(self)
         self.progress_dialog.setWindowTitle("Compression WGP")
@@ -2461,6 +2077,12 @@ class WGPWindow(QMainWindow):
         self.progress_label.setFont(font)
         layout.addWidget(self.progress_label)
         
+        # Barre de progression (pourcentage réel remonté par mksquashfs)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+        
         # Bouton annuler
         btn_layout = QHBoxLayout()
         btn_layout.addStretch()
@@ -2477,7 +2099,8 @@ class WGPWindow(QMainWindow):
         QApplication.processEvents()
         
         # Créer et démarrer le thread avec le nom de fichier et le nom interne
-        self.create_thread = CreateWGPThread(self.game_dir, output_dir, output_filename, internal_game_name, config, self)
+        self.create_thread = CreateWGPThread(self.game_dir, output_dir, output_filename, internal_game_name, config, self,
+                                             index=self.index)
         self.create_thread.progress.connect(self.on_progress)
         self.create_thread.finished.connect(self.on_finished)
         self.create_thread.start()
@@ -2486,6 +2109,8 @@ class WGPWindow(QMainWindow):
         """Met à jour la progression"""
         if hasattr(self, 'progress_label'):
             self.progress_label.setText(message)
+        if hasattr(self, 'progress_bar'):
+            self.progress_bar.setValue(value)
     
     def cancel_compression(self):
         """Annule la compression"""
@@ -2503,8 +2128,7 @@ class WGPWindow(QMainWindow):
             self.progress_dialog.close()
         
         if success:
-            # Les fichiers ont déjà été restaurés par le thread via cleanup()
-            # Pas besoin d'appeler restore_files() ici
+            # Les fichiers ont déjà été restaurés par le builder (packbuilder)
             
             # Calculer les tailles et le ratio de compression
             wgp_file = message
@@ -2518,12 +2142,28 @@ class WGPWindow(QMainWindow):
             else:
                 ratio_text = ""
             
+            # Fichiers déjà compressés stockés tels quels (packpolicy)
+            policy = self.create_thread.builder.policy if self.create_thread else None
+            policy_text = f"\n\n{policy.describe()}" if policy and policy.files else ""
+            # Octets déplacés/clonés/copiés par le mode classique (packtransfer)
+            transfer = self.create_thread.builder.transfer if self.create_thread else None
+            if transfer and transfer.total_bytes:
+                policy_text += f"\n{transfer.describe()}"
+            # Données reprises de l'ancien paquet (packincremental)
+            incremental = self.create_thread.builder.incremental if self.create_thread else None
+            if incremental and incremental.reason is None:
+                policy_text += f"\n{incremental.describe()}"
+            # Relecture de l'image (packverify)
+            verifier = self.create_thread.builder.verifier if self.create_thread else None
+            if verifier:
+                policy_text += f"\n{verifier.describe()}"
+            
             QMessageBox.information(
                 self, "Succès",
                 f"WGP créé avec succès !\n\n"
                 f"Fichier: {os.path.basename(wgp_file)}\n"
                 f"Taille originale: {self.format_bytes(size_before)}\n"
-                f"Taille compressée: {size_after_formatted}{ratio_text}"
+                f"Taille compressée: {size_after_formatted}{ratio_text}{policy_text}"
             )
             self.cleanup_temp_icons()  # Nettoyer avant de fermer
             self.close()
@@ -2533,15 +2173,14 @@ class WGPWindow(QMainWindow):
     
     def get_directory_size(self, path):
         """Calcule la taille totale d'un répertoire en octets"""
-        total = 0
-        for dirpath, dirnames, filenames in os.walk(path):
-            # Ignorer les dossiers spéciaux
-            dirnames[:] = [d for d in dirnames if d not in ['.save', '.extra', '__pycache__']]
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                if not os.path.islink(fp):
-                    total += os.path.getsize(fp)
-        return total
+        # Réutiliser l'index partagé (rafraîchi par mtime) plutôt qu'un nouveau parcours
+        index = getattr(self, 'index', None)
+        if index is None or index.game_dir != os.path.abspath(path):
+            index = gameindex.GameIndex(path)
+        else:
+            index.refresh()
+        return index.total_size(exclude_dirs=['.save', '.extra', '__pycache__'],
+                                follow_symlinks=False)
     
     def format_bytes(self, size):
         """Formate une taille en octets vers une chaîne lisible"""
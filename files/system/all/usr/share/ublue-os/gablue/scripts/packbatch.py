@@ -0,0 +1,423 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Batch - Création de paquets WGP/LGP en lot, sans interface (sans Qt)
+
+Construit plusieurs paquets à partir d'un manifeste JSON. Les mksquashfs sont
+répartis sur les cœurs avec un budget global -processors / -mem : chaque build
+réserve sa part du budget au démarrage et la rend à la fin, les builds les plus
+gros partent en premier. Le dossier du jeu n'est pas modifié au-delà des
+fichiers de configuration (.gamename, .launch...) : saves/extras/temps passent
+par des pseudo-fichiers (packstaging). Chaque paquet est construit par
+packbuilder, comme dans makewgp/makelgp.
+
+Manifeste :
+    {
+      "defaults": {"type": "wgp", "output": "/chemin/sortie", "compression": 15},
+      "jobs": [
+        {"dir": "/jeux/MonJeu", "exe": "bin/game.exe", "args": "",
+         "name": "MonJeu", "internal_name": "MonJeu", "icon": "icon.png",
+         "saves": ["Saves"], "extras": ["Config/user.ini"], "temps": ["*"]}
+      ]
+    }
+
+"compression" accepte un niveau zstd ou "auto-load" / "auto-size" (profil choisi
+par essais sur un échantillon du jeu, voir packtune). Un paquet déjà présent en
+sortie est reconstruit de façon incrémentale (voir packincremental), sauf avec
+"incremental": false. Avec "store": true (WGP uniquement), les gros fichiers du
+jeu rejoignent le magasin de contenu partagé du dossier de sortie et le paquet
+n'en contient que des liens (voir packdedupe). "format": "erofs" (WGP uniquement)
+construit une image EROFS au lieu de squashfs (voir packimage). "volume_size"
+(ex: "4000M", "fat32") découpe le paquet terminé en volumes (voir packvolumes).
+Avec "verify": true (squashfs uniquement), le paquet est relu et comparé aux
+sources, et les empreintes par fichier rejoignent le manifeste (voir packverify).
+"image_digest": true ajoute au manifeste l'empreinte de l'image entière (une
+relecture complète du paquet, seule vérification possible d'une image EROFS).
+"precompile_python": true (LGP uniquement) ajoute au paquet les .pyc du jeu,
+compilés pour son interpréteur Python (voir packbytecode).
+
+Usage: packbatch.py <manifeste.json> [-processors N] [-mem 8G] [-jobs N] [-report rapport.json]
+"""
+
+import sys
+import os
+import json
+import re
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import gameindex
+import packbuild
+import packbuilder
+import packimage
+import packtune
+import packvolumes
+
+# Paramètres reconnus dans un job (et dans "defaults")
+JOB_KEYS = ('type', 'dir', 'output', 'name', 'internal_name', 'exe', 'args', 'icon',
+            'saves', 'extras', 'temps', 'compression', 'fix_controller', 'xbox_filter', 'pds',
+            'entropy_policy', 'incremental', 'store', 'format', 'volume_size', 'verify',
+            'image_digest', 'precompile_python')
+
+MIN_JOB_MEM_MB = 64  # mksquashfs refuse un -mem trop petit
+
+
+def parse_mem(value):
+    """Convertit une taille mémoire (ex: 512M, 8G) en Mo"""
+    m = re.fullmatch(r'\s*(\d+)\s*([KMG]?)B?\s*', str(value), re.IGNORECASE)
+    if not m:
+        raise ValueError(f"Taille mémoire invalide: {value}")
+    number, unit = int(m.group(1)), m.group(2).upper()
+    if unit == 'K':
+        return max(1, number // 1024)
+    if unit == 'G':
+        return number * 1024
+    return number
+
+
+def default_mem_mb():
+    """Budget mémoire par défaut : 25% de la RAM (comme mksquashfs pour un seul build)"""
+    try:
+        pages = os.sysconf('SC_PHYS_PAGES')
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        return max(MIN_JOB_MEM_MB, pages * page_size // (4 * 1024 * 1024))
+    except (ValueError, OSError):
+        return 2048
+
+
+class ResourceBudget:
+    """Budget global de cœurs et de mémoire partagé par les mksquashfs en cours"""
+
+    def __init__(self, processors, mem_mb):
+        self.processors = max(1, processors)
+        self.mem_mb = max(MIN_JOB_MEM_MB, mem_mb)
+        self.free_processors = self.processors
+        self.free_mem_mb = self.mem_mb
+        self._cond = threading.Condition()
+
+    def acquire(self, waiting):
+        """Réserve une part du budget pour un build
+
+        Args:
+            waiting: nombre de builds qui vont se partager les cœurs libres
+                     (celui-ci compris)
+        Returns:
+            (processors, mem_mb) réservés
+        """
+        with self._cond:
+            while self.free_processors < 1 or self.free_mem_mb < MIN_JOB_MEM_MB:
+                self._cond.wait()
+            share = max(1, self.free_processors // max(1, waiting))
+            mem = max(MIN_JOB_MEM_MB, self.mem_mb * share // self.processors)
+            mem = min(mem, self.free_mem_mb)
+            self.free_processors -= share
+            self.free_mem_mb -= mem
+            return share, mem
+
+    def release(self, processors, mem_mb):
+        with self._cond:
+            self.free_processors += processors
+            self.free_mem_mb += mem_mb
+            self._cond.notify_all()
+
+
+class PackJob:
+    """Un paquet à construire, décrit par une entrée du manifeste"""
+
+    def __init__(self, entry, defaults=None, base_dir='.'):
+        data = dict(defaults or {})
+        data.update(entry)
+        unknown = set(data) - set(JOB_KEYS)
+        if unknown:
+            raise ValueError(f"Clés inconnues: {', '.join(sorted(unknown))}")
+        if not data.get('dir') or not data.get('exe'):
+            raise ValueError("'dir' et 'exe' sont obligatoires")
+
+        self.pack_type = data.get('type', 'wgp').lower()
+        if self.pack_type not in ('wgp', 'lgp'):
+            raise ValueError(f"Type de paquet invalide: {self.pack_type}")
+        if data.get('store') and self.pack_type != 'wgp':
+            raise ValueError("Le magasin partagé n'est disponible que pour les paquets WGP")
+        image_format = packimage.get_backend(data.get('format', 'squashfs')).name
+        if image_format != 'squashfs' and self.pack_type != 'wgp':
+            raise ValueError(f"Le format {image_format} n'est disponible que pour les paquets WGP")
+        if data.get('precompile_python') and self.pack_type != 'lgp':
+            raise ValueError("La précompilation Python n'est disponible que pour les paquets LGP")
+        if data.get('verify') and image_format != 'squashfs':
+            raise ValueError("La vérification n'est disponible que pour les images squashfs")
+        volume_size = data.get('volume_size')
+        if volume_size:
+            volume_size = packvolumes.parse_size(volume_size)
+        self.game_dir = os.path.abspath(os.path.join(base_dir, os.path.expanduser(data['dir'])))
+        if not os.path.isdir(self.game_dir):
+            raise ValueError(f"Dossier introuvable: {self.game_dir}")
+
+        dir_name = os.path.basename(self.game_dir.rstrip('/'))
+        self.output_dir = os.path.abspath(os.path.join(
+            base_dir, os.path.expanduser(data.get('output') or os.path.dirname(self.game_dir))))
+        self.output_filename = data.get('name') or dir_name
+        self.internal_game_name = data.get('internal_name') or self.output_filename
+
+        icon = data.get('icon')
+        if icon and not os.path.isabs(icon):
+            icon = os.path.join(self.game_dir, icon)
+        compression = data.get('compression', 15)
+        self.tune_target = None
+        if isinstance(compression, str) and compression.startswith('auto'):
+            self.tune_target = compression.partition('-')[2] or 'load'
+            if self.tune_target not in packtune.TARGETS:
+                raise ValueError(f"Compression invalide: {compression}")
+            compression = 15
+        self.config = {
+            'exe': data['exe'],
+            'args': data.get('args', ''),
+            'icon': icon,
+            'fix_controller': bool(data.get('fix_controller', False)),
+            'xbox_filter': data.get('xbox_filter'),
+            'pds': data.get('pds'),
+            'compression': int(compression),
+            'profile': None,
+            'saves': self._items(data.get('saves')),
+            'extras': self._items(data.get('extras')),
+            'temps': self._items(data.get('temps'), allow_full_overlay=True),
+            'entropy_policy': bool(data.get('entropy_policy', True)),
+            'incremental': bool(data.get('incremental', True)),
+            'store': bool(data.get('store', False)),
+            'format': image_format,
+            'volume_size': volume_size or None,
+            'verify': bool(data.get('verify', False)),
+            'image_digest': bool(data.get('image_digest', False)),
+            'precompile_python': bool(data.get('precompile_python', False)),
+            'zero_copy': True,
+        }
+        self.source_size = 0
+
+    def _items(self, paths, allow_full_overlay=False):
+        """Convertit une liste de chemins relatifs en tuples (item_type, rel_path)"""
+        if not paths:
+            return []
+        if allow_full_overlay and paths in ('*', ['*']):
+            return [('*', 'full_overlay')]
+        items = []
+        for rel_path in paths:
+            rel_path = rel_path.strip('/')
+            item_type = 'dir' if os.path.isdir(os.path.join(self.game_dir, rel_path)) else 'file'
+            items.append((item_type, rel_path))
+        return items
+
+    @property
+    def output_file(self):
+        return os.path.join(self.output_dir, f"{self.output_filename}.{self.pack_type}")
+
+
+class BatchScheduler:
+    """Répartit les builds sur un budget global de cœurs et de mémoire"""
+
+    def __init__(self, jobs, processors=None, mem_mb=None, max_jobs=None, verbose=True):
+        self.jobs = jobs
+        self.budget = ResourceBudget(processors or os.cpu_count() or 1,
+                                     mem_mb or default_mem_mb())
+        # Au moins 2 cœurs par build par défaut : mksquashfs parallélise bien
+        self.max_jobs = max_jobs or max(1, self.budget.processors // 2)
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._waiting = len(jobs)
+        self._running = 0
+        self._builders = []
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        with self._lock:
+            for builder in self._builders:
+                builder.cancel()
+
+    def run(self):
+        """Lance tous les builds, retourne la liste des résultats (ordre du manifeste)"""
+        # Les plus gros d'abord : meilleure occupation des cœurs en fin de lot
+        # Tailles seules pour l'ordre : chaque index est construit par son build
+        sizes = [gameindex.tree_size(job.game_dir) for job in self.jobs]
+        order = sorted(range(len(self.jobs)), key=lambda i: -sizes[i])
+        results = [None] * len(self.jobs)
+        with ThreadPoolExecutor(max_workers=self.max_jobs) as pool:
+            futures = {i: pool.submit(self._run_job, self.jobs[i]) for i in order}
+            for i, future in futures.items():
+                results[i] = future.result()
+        return results
+
+    def _run_job(self, job):
+        result = {
+            'name': job.output_filename,
+            'type': job.pack_type,
+            'format': job.config['format'],
+            'dir': job.game_dir,
+            'output': job.output_file,
+        }
+        if self.cancelled:
+            result.update(status='cancelled')
+            return result
+
+        with self._lock:
+            # Partager les cœurs libres entre les builds qui peuvent encore démarrer
+            sharers = min(self._waiting, self.max_jobs - self._running)
+            self._waiting -= 1
+            self._running += 1
+        processors, mem_mb = self.budget.acquire(sharers)
+        builder = packbuilder.PackBuilder(job.game_dir, job.output_file, job.internal_game_name,
+                                          job.config, job.pack_type,
+                                          processors=processors, mem_mb=mem_mb,
+                                          tune_target=job.tune_target)
+        with self._lock:
+            self._builders.append(builder)
+        self._log(f"[{job.output_filename}] démarrage ({processors} cœurs, {mem_mb} Mo)")
+
+        start = time.monotonic()
+        try:
+            completed = builder.build()
+            ok = completed.returncode == 0
+            error = None if ok else (completed.stderr or f"code {completed.returncode}")
+        except Exception as e:
+            ok, error = False, str(e)
+        finally:
+            self.budget.release(processors, mem_mb)
+            job.source_size = builder.source_size
+            builder.index = None  # Index du jeu libéré dès la fin de son build
+            with self._lock:
+                self._builders.remove(builder)
+                self._running -= 1
+        wall_time = time.monotonic() - start
+
+        pack_size = packvolumes.pack_size(job.output_file) if ok else 0
+        result.update(
+            status='ok' if ok else ('cancelled' if self.cancelled else 'error'),
+            source_size=job.source_size,
+            pack_size=pack_size,
+            ratio=round(pack_size / job.source_size, 4) if ok and job.source_size else None,
+            wall_time=round(wall_time, 2),
+            processors=processors,
+            mem_mb=mem_mb,
+        )
+        if builder.policy is not None:
+            result.update(uncompressed_files=len(builder.policy.files),
+                          uncompressed_bytes=builder.policy.skipped_bytes,
+                          cpu_time_saved=round(builder.policy.cpu_time_saved, 1))
+        if builder.incremental is not None:
+            result['incremental'] = builder.incremental.describe()
+            if builder.incremental.reason is None:
+                result['reused_bytes'] = builder.incremental.reused_bytes
+        if builder.thin is not None:
+            result.update(store=builder.thin.describe(), store_bytes=builder.thin.linked_bytes,
+                          store_added_bytes=builder.thin.added_bytes)
+        if builder.bytecode is not None:
+            result.update(bytecode=builder.bytecode.describe(),
+                          bytecode_files=len(builder.bytecode.compiled))
+        if builder.verifier is not None:
+            result.update(verify=builder.verifier.describe(), verified_files=builder.verifier.files,
+                          verify_mismatches=len(builder.verifier.mismatches))
+        if builder.tune_result is not None:
+            tuned = builder.tune_result
+            result.update(profile=packtune.profile_label(tuned.best.profile),
+                          predicted_size=tuned.predicted_size,
+                          predicted_time=round(tuned.predicted_time, 2))
+        if error:
+            result['error'] = error
+        if ok:
+            self._log(f"[{job.output_filename}] terminé en {packbuild.format_duration(wall_time)} : "
+                      f"{packbuild.format_size(job.source_size)} → {packbuild.format_size(pack_size)}")
+        else:
+            self._log(f"[{job.output_filename}] échec : {error}")
+        return result
+
+    def _log(self, message):
+        if self.verbose:
+            print(message, flush=True)
+
+
+def load_manifest(path):
+    """Lit un manifeste JSON (liste de jobs ou {"defaults": ..., "jobs": [...]})"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {'jobs': data}
+    base_dir = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    errors = []
+    for i, entry in enumerate(data.get('jobs', [])):
+        try:
+            jobs.append(PackJob(entry, data.get('defaults'), base_dir))
+        except (ValueError, TypeError) as e:
+            errors.append(f"job {i + 1}: {e}")
+    return jobs, errors
+
+
+def main():
+    usage = (f"Usage: {sys.argv[0]} <manifeste.json> [-processors N] [-mem 8G] "
+             f"[-jobs N] [-report rapport.json]")
+    args = sys.argv[1:]
+    if not args or args[0] in ('-h', '--help'):
+        print(usage)
+        return 1
+
+    manifest = None
+    options = {'-processors': None, '-mem': None, '-jobs': None, '-report': None}
+    while args:
+        arg = args.pop(0)
+        if arg in options:
+            if not args:
+                print(f"Option {arg} sans valeur\n{usage}", file=sys.stderr)
+                return 1
+            options[arg] = args.pop(0)
+        elif manifest is None:
+            manifest = arg
+        else:
+            print(usage, file=sys.stderr)
+            return 1
+
+    try:
+        processors = int(options['-processors']) if options['-processors'] else None
+        mem_mb = parse_mem(options['-mem']) if options['-mem'] else None
+        max_jobs = int(options['-jobs']) if options['-jobs'] else None
+        jobs, errors = load_manifest(manifest)
+    except (OSError, ValueError) as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 1
+    for error in errors:
+        print(f"Erreur: {error}", file=sys.stderr)
+    if errors or not jobs:
+        return 1
+
+    scheduler = BatchScheduler(jobs, processors, mem_mb, max_jobs)
+    signal.signal(signal.SIGINT, lambda *_: scheduler.cancel())
+    start = time.monotonic()
+    results = scheduler.run()
+
+    ok = [r for r in results if r['status'] == 'ok']
+    source_total = sum(r['source_size'] for r in ok)
+    pack_total = sum(r['pack_size'] for r in ok)
+    report = {
+        'processors': scheduler.budget.processors,
+        'mem_mb': scheduler.budget.mem_mb,
+        'max_jobs': scheduler.max_jobs,
+        'wall_time': round(time.monotonic() - start, 2),
+        'built': len(ok),
+        'failed': len(results) - len(ok),
+        'source_size': source_total,
+        'pack_size': pack_total,
+        'ratio': round(pack_total / source_total, 4) if source_total else None,
+        'uncompressed_bytes': sum(r.get('uncompressed_bytes', 0) for r in ok),
+        'cpu_time_saved': round(sum(r.get('cpu_time_saved', 0) for r in ok), 1),
+        'jobs': results,
+    }
+    if options['-report']:
+        with open(options['-report'], 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"{len(ok)}/{len(results)} paquets créés en "
+          f"{packbuild.format_duration(report['wall_time'])} : "
+          f"{packbuild.format_size(source_total)} → {packbuild.format_size(pack_total)}")
+    return 0 if len(ok) == len(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,281 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Build - Exécution de mksquashfs pour les paquets WGP/LGP (sans Qt)
+
+mksquashfs est lancé dans un PTY (comme PtyWorker de gablue-update) pour que
+sa sortie -percentage soit lisible en temps réel. On en déduit le pourcentage
+réel, les débits lecture/écriture et le temps restant. L'annulation réveille
+immédiatement la boucle de lecture (pas d'attente de sondage).
+
+Le paquet est construit dans un fichier temporaire voisin (.Jeu.wgp.partial-PID)
+puis renommé à la place de l'ancien une fois écrit sur disque : l'ancien paquet
+reste jouable pendant la reconstruction (un paquet monté garde son inode) et
+un échec ou une annulation le laisse intact.
+
+Usage: packbuild.py <source> <sortie.wgp> [options mksquashfs...]
+"""
+
+import sys
+import os
+import re
+import shutil
+import pty
+import select
+import signal
+import subprocess
+import time
+
+
+ANSI_RE = re.compile(rb'\x1b\[[0-9;]*[a-zA-Z]')
+# Sortie -percentage : un entier par ligne
+PERCENT_RE = re.compile(rb'^\s*(\d{1,3})\s*$')
+# Barre de progression classique : "[====   ] 1234/5678  21%"
+BAR_RE = re.compile(rb'(\d+)/(\d+)\s+(\d{1,3})%')
+
+
+def format_size(size_bytes):
+    """Formate une taille en octets vers une chaîne lisible"""
+    if size_bytes < 1024:
+        return f"{size_bytes:.0f} B"
+    elif size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.1f} KB"
+    elif size_bytes < 1024 * 1024 * 1024:
+        return f"{size_bytes / (1024 * 1024):.1f} MB"
+    else:
+        return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
+
+
+def format_duration(seconds):
+    """Formate une durée en secondes (ex: 2 min 05 s)"""
+    seconds = int(max(0, seconds))
+    if seconds < 60:
+        return f"{seconds} s"
+    if seconds < 3600:
+        return f"{seconds // 60} min {seconds % 60:02d} s"
+    return f"{seconds // 3600} h {(seconds % 3600) // 60:02d} min"
+
+
+PARTIAL_RE = re.compile(r'\.(.+)\.partial-(\d+)')
+
+
+def partial_path(pack_file):
+    """Fichier temporaire de construction, voisin du paquet (même système de fichiers)
+
+    Les restes d'une construction interrompue (processus disparu) sont supprimés.
+    """
+    directory, name = os.path.split(os.path.abspath(pack_file))
+    for entry in os.listdir(directory):
+        m = PARTIAL_RE.fullmatch(entry)
+        if m and m.group(1) == name and not os.path.exists(f"/proc/{m.group(2)}"):
+            os.remove(os.path.join(directory, entry))
+    return os.path.join(directory, f".{name}.partial-{os.getpid()}")
+
+
+def commit_pack(build_file, pack_file):
+    """Remplace atomiquement le paquet par le fichier construit (fsync du fichier et du dossier)"""
+    fd = os.open(build_file, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    if os.path.exists(pack_file):
+        shutil.copymode(pack_file, build_file)
+    os.replace(build_file, pack_file)
+    fd = os.open(os.path.dirname(os.path.abspath(pack_file)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class ProgressStats:
+    """État de la compression déduit de la sortie de mksquashfs"""
+
+    def __init__(self, total_size):
+        self.total_size = max(1, total_size)
+        self.percent = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.input_rate = 0.0   # octets/s lus (estimés depuis le pourcentage)
+        self.output_rate = 0.0  # octets/s écrits (taille réelle du fichier)
+        self.eta = None         # secondes restantes
+        self.elapsed = 0.0
+
+    def describe(self):
+        """Message affichable pour le signal progress"""
+        parts = [f"{self.percent}% — {format_size(self.total_size)} → {format_size(self.output_bytes)}"]
+        if self.input_rate > 0:
+            parts.append(f"lecture {format_size(self.input_rate)}/s, "
+                         f"écriture {format_size(self.output_rate)}/s")
+        if self.eta is not None:
+            parts.append(f"reste {format_duration(self.eta)}")
+        return "\n".join(parts)
+
+
+class MksquashfsRunner:
+    """Lance mksquashfs dans un PTY et remonte la progression réelle
+
+    Args:
+        cmd: commande mksquashfs complète (doit contenir -percentage)
+        total_size: taille source en octets (pour les débits et l'ETA)
+        output_file: fichier image écrit (pour le débit d'écriture)
+        callback: fonction (percent, ProgressStats) appelée à chaque changement
+        stdin: descripteur lu par mksquashfs (ex: flux -tar), fermé par run()
+            une fois le processus lancé ; None = aucune entrée
+    """
+
+    RATE_WINDOW = 5.0  # secondes de lissage pour les débits
+
+    def __init__(self, cmd, total_size, output_file, callback=None, stdin=None):
+        self.cmd = cmd
+        self.stdin = stdin
+        self.output_file = output_file
+        self.callback = callback
+        self.stats = ProgressStats(total_size)
+        self._proc = None
+        self._cancelled = False
+        self._wake_r, self._wake_w = os.pipe()
+        self._samples = []  # (temps, octets lus, octets écrits)
+        self._log = []      # lignes hors progression (erreurs mksquashfs)
+
+    def cancel(self):
+        """Annule immédiatement (réveille la boucle de lecture)"""
+        self._cancelled = True
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b'x')
+            except OSError:
+                pass
+
+    def run(self):
+        """Exécute mksquashfs, retourne un subprocess.CompletedProcess"""
+        start = time.monotonic()
+        master_fd, slave_fd = pty.openpty()
+        try:
+            self._proc = subprocess.Popen(
+                self.cmd, stdin=subprocess.DEVNULL if self.stdin is None else self.stdin,
+                stdout=slave_fd, stderr=slave_fd, close_fds=True, start_new_session=True,
+            )
+        finally:
+            os.close(slave_fd)
+            # L'écrivain du flux doit recevoir EPIPE si mksquashfs s'arrête
+            if self.stdin is not None:
+                os.close(self.stdin)
+
+        buf = b""
+        try:
+            while True:
+                r, _, _ = select.select([master_fd, self._wake_r], [], [])
+                if self._wake_r in r or self._cancelled:
+                    self._terminate()
+                    return subprocess.CompletedProcess(self.cmd, -1, '', 'Annulé par l\'utilisateur')
+                try:
+                    data = os.read(master_fd, 8192)
+                except OSError:
+                    data = b""  # EIO : le processus a fermé le PTY
+                if not data:
+                    break
+                buf += data
+                # mksquashfs sépare les mises à jour par \n (-percentage) ou \r (barre)
+                parts = re.split(rb'[\r\n]', buf)
+                buf = parts.pop()
+                for part in parts:
+                    self._handle_line(ANSI_RE.sub(b'', part), start)
+            if buf:
+                self._handle_line(ANSI_RE.sub(b'', buf), start)
+        finally:
+            os.close(master_fd)
+            wake_r, wake_w = self._wake_r, self._wake_w
+            self._wake_r = self._wake_w = None
+            os.close(wake_r)
+            os.close(wake_w)
+
+        returncode = self._proc.wait()
+        return subprocess.CompletedProcess(self.cmd, returncode, '', "\n".join(self._log[-20:]))
+
+    def _terminate(self):
+        if self._proc and self._proc.poll() is None:
+            try:
+                os.killpg(os.getpgid(self._proc.pid), signal.SIGTERM)
+                self._proc.wait(timeout=5)
+            except (ProcessLookupError, subprocess.TimeoutExpired):
+                try:
+                    os.killpg(os.getpgid(self._proc.pid), signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                self._proc.wait()
+
+    def _handle_line(self, line, start):
+        m = PERCENT_RE.match(line)
+        if m:
+            percent = int(m.group(1))
+        else:
+            m = BAR_RE.search(line)
+            if not m:
+                text = line.decode('utf-8', errors='replace').strip()
+                if text:
+                    self._log.append(text)
+                return
+            percent = int(m.group(3))
+        self._update(min(percent, 100), time.monotonic() - start)
+
+    def _update(self, percent, elapsed):
+        stats = self.stats
+        stats.percent = percent
+        stats.elapsed = elapsed
+        stats.input_bytes = stats.total_size * percent // 100
+        try:
+            stats.output_bytes = os.path.getsize(self.output_file)
+        except OSError:
+            pass
+
+        # Débits lissés sur une fenêtre glissante
+        self._samples.append((elapsed, stats.input_bytes, stats.output_bytes))
+        while len(self._samples) > 2 and elapsed - self._samples[0][0] > self.RATE_WINDOW:
+            self._samples.pop(0)
+        t0, in0, out0 = self._samples[0]
+        if elapsed - t0 > 0.2:
+            stats.input_rate = (stats.input_bytes - in0) / (elapsed - t0)
+            stats.output_rate = max(0, stats.output_bytes - out0) / (elapsed - t0)
+        if stats.input_rate > 0:
+            stats.eta = (stats.total_size - stats.input_bytes) / stats.input_rate
+        elif percent > 0:
+            stats.eta = elapsed * (100 - percent) / percent
+
+        if self.callback:
+            self.callback(percent, stats)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(f"Usage: {sys.argv[0]} <source> <sortie.wgp> [options mksquashfs...]")
+        return 1
+
+    source, output = sys.argv[1], sys.argv[2]
+    total = 0
+    for root, _dirs, files in os.walk(source):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    build_file = partial_path(output)
+    cmd = ['mksquashfs', source, build_file, '-noappend', '-percentage'] + sys.argv[3:]
+    runner = MksquashfsRunner(cmd, total, build_file,
+                              lambda pct, stats: print(stats.describe().replace("\n", " | ")))
+    signal.signal(signal.SIGINT, lambda *_: runner.cancel())
+    try:
+        result = runner.run()
+        if result.returncode == 0:
+            commit_pack(build_file, output)
+    finally:
+        if os.path.exists(build_file):
+            os.remove(build_file)
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+    return 0 if result.returncode == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,580 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Builder - Construction d'un paquet WGP/LGP, commune à makewgp, makelgp et packbatch (sans Qt)
+
+Les threads de création de makewgp/makelgp et les builds de packbatch
+enchaînent les mêmes étapes :
+- fichiers de configuration (.gamename, .launch, .args, .fix/.xbox/.pds en WGP)
+  et icône convertie en .icon.png
+- saves/extras/temps : pseudo-fichiers (packstaging) ou copie classique
+  journalisée (packjournal), restaurée à la fin
+- magasin partagé (packdedupe), bytecode Python (packbytecode), manifeste
+- image squashfs (tri de lancement, politique de compression, reconstruction
+  incrémentale) ou EROFS (packimage)
+- relecture (packverify), manifeste final, remplacement du paquet, découpage
+  en volumes (packvolumes)
+
+La progression est remontée par callback(pourcentage, message) : le thread Qt
+la relaie par un signal, packbatch n'en passe pas.
+
+Usage: packbuilder.py <dossier_du_jeu> <sortie.wgp|lgp> <exécutable> [nom_interne]
+"""
+
+import sys
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+import gameindex
+import icodecode
+import launchprofile
+import packbuild
+import packbytecode
+import packdedupe
+import packimage
+import packincremental
+import packjournal
+import packmanifest
+import packpolicy
+import packstaging
+import packtransfer
+import packtune
+import packverify
+import packvolumes
+
+
+ROOT_EXCLUDES = ('*.tmp', '*.log')  # Exclus à la racine du jeu
+ICON_FORMATS = ('.ico', '.jpg', '.jpeg', '.bmp', '.svg', '.webp')  # Convertis en PNG
+SYMLINKS_BACKUP = '.symlinks_backup'
+
+
+class BuildCancelled(Exception):
+    """Création annulée par l'utilisateur"""
+
+    def __init__(self, message="Création annulée par l'utilisateur"):
+        super().__init__(message)
+
+
+def copy_icon(source, dest):
+    """Copie l'icône en PNG (.ico/.bmp décodés sans magick si possible, jamais agrandie)"""
+    if os.path.abspath(source) == os.path.abspath(dest):
+        return
+    lower = source.lower()
+    if not lower.endswith(ICON_FORMATS):
+        shutil.copy2(source, dest)
+        return
+    if lower.endswith(('.ico', '.bmp')):
+        # Frame PNG recopiée ou BMP décodée dans le processus
+        try:
+            if icodecode.convert(source, dest):
+                return
+        except OSError:
+            pass
+    frame = source
+    if lower.endswith('.ico'):
+        # ICO multi-résolution : plus grande frame, PNG de préférence à surface égale
+        result = subprocess.run(['magick', 'identify', source], capture_output=True, text=True)
+        if result.returncode != 0:
+            return
+        best_index, best_area = 0, 0
+        for line in result.stdout.splitlines():
+            # Format: "path[0] ICO 32x32 ..." ou "path[5] PNG 256x256 ..."
+            m = re.search(r'\[(\d+)\]\s+\w+\s+(\d+)x(\d+)', line)
+            if m:
+                area = int(m.group(2)) * int(m.group(3))
+                if area > best_area or (area == best_area and ' PNG ' in line):
+                    best_index, best_area = int(m.group(1)), area
+        frame = f'{source}[{best_index}]'
+    density = ['-density', '300'] if lower.endswith('.svg') else []
+    subprocess.run(['magick', '-background', 'none'] + density +
+                   [frame, '-resize', '1024x1024>', dest], capture_output=True)
+
+
+class ClassicStaging:
+    """Copie classique des saves/extras/temps (mode sans pseudo-fichiers)
+
+    Les originaux sont déplacés dans .save/.extra/.temp et remplacés par des
+    symlinks vers /tmp/<wgp|lgp>-<saves|extra|temp>/<nom interne>, puis remis
+    en place par restore(). Chaque opération est journalisée avant d'être
+    faite (packjournal) : un crash est annulé au lancement suivant.
+    """
+
+    def __init__(self, game_dir, internal_game_name, config, pack_type='wgp', transfer=None):
+        self.game_dir = game_dir
+        self.internal_game_name = internal_game_name
+        self.config = config
+        self.pack_type = pack_type
+        self.transfer = transfer or packtransfer.Transfer()
+        self.journal = None
+
+    def stage(self):
+        self.journal = packjournal.StagingJournal(self.game_dir).begin()
+        symlinks_backup = {}
+        for key, backup_dir, list_file, kind in packstaging.CATEGORIES:
+            items = self.config.get(key) or []
+            list_path = os.path.join(self.game_dir, list_file)
+            backup_root = os.path.join(self.game_dir, backup_dir)
+            if not items:
+                # Rien à disposer : restes d'une création précédente supprimés
+                if os.path.exists(list_path):
+                    os.remove(list_path)
+                if os.path.exists(backup_root):
+                    shutil.rmtree(backup_root)
+                continue
+            if key == 'temps' and packstaging.is_full_overlay(items):
+                # Tout le dossier en overlay : seulement le marqueur
+                with open(list_path, 'w') as f:
+                    f.write("*\n")
+                continue
+            os.makedirs(backup_root, exist_ok=True)
+            base = packstaging.runtime_base(self.pack_type, kind, self.internal_game_name)
+            with open(list_path, 'w') as f:
+                for item_type, rel_path in items:
+                    # Format sans préfixe, compatible avec les lanceurs
+                    f.write(f"{rel_path}\n")
+                    self._stage_item(item_type, rel_path, backup_root, base, symlinks_backup)
+        if symlinks_backup:
+            with open(os.path.join(self.game_dir, SYMLINKS_BACKUP), 'w') as f:
+                for rel_path, target in symlinks_backup.items():
+                    f.write(f"{rel_path}|{target}\n")
+        return self
+
+    def _stage_item(self, item_type, rel_path, backup_root, base, symlinks_backup):
+        source = os.path.join(self.game_dir, rel_path)
+        target = os.path.join(backup_root, rel_path)
+        if not os.path.exists(source):
+            return
+        is_link = os.path.islink(source)
+        if is_link:
+            symlinks_backup[rel_path] = os.readlink(source)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Vrai fichier/dossier : déplacé (rename) ; symlink : contenu copié (reflink si possible)
+        if not is_link:
+            self.journal.record('move', rel_path, dst=os.path.relpath(target, self.game_dir))
+        if item_type == 'dir':
+            if is_link:
+                self.transfer.contents(source, target)
+            else:
+                self.transfer.tree(source, target, move=True)
+        else:
+            self.transfer.file(source, target, move=not is_link)
+
+        if is_link:
+            link_target = os.readlink(source)
+            if os.path.isabs(link_target) and not link_target.startswith(self.game_dir):
+                return  # Symlink vers l'extérieur du jeu : gardé tel quel
+            self.journal.record('unlink', rel_path, target=link_target)
+            os.remove(source)
+        elif os.path.isdir(source):
+            shutil.rmtree(source)
+        elif os.path.lexists(source):
+            os.remove(source)
+        os.makedirs(os.path.dirname(source), exist_ok=True)
+        link = os.path.join(base, rel_path)
+        self.journal.record('symlink', rel_path, target=link)
+        os.symlink(link, source)
+
+    def restore(self):
+        """Remet les originaux en place et supprime .save/.extra/.temp"""
+        symlinks_backup = {}
+        backup_file = os.path.join(self.game_dir, SYMLINKS_BACKUP)
+        if os.path.exists(backup_file):
+            with open(backup_file, 'r') as f:
+                for line in f:
+                    rel_path, sep, target = line.rstrip('\n').partition('|')
+                    if sep:
+                        symlinks_backup[rel_path] = target
+
+        for _key, backup_dir, list_file, _kind in packstaging.CATEGORIES:
+            list_path = os.path.join(self.game_dir, list_file)
+            backup_root = os.path.join(self.game_dir, backup_dir)
+            if not os.path.exists(list_path) or not os.path.exists(backup_root):
+                continue
+            with open(list_path, 'r') as f:
+                rel_paths = [line.strip() for line in f if line.strip()]
+            for rel_path in rel_paths:
+                backup_path = os.path.join(backup_root, rel_path)
+                original_path = os.path.join(self.game_dir, rel_path)
+                if not os.path.exists(backup_path):
+                    continue
+                # Symlink de staging (ou reste) remplacé par l'original
+                if os.path.islink(original_path):
+                    os.remove(original_path)
+                elif os.path.isdir(original_path):
+                    shutil.rmtree(original_path)
+                elif os.path.exists(original_path):
+                    os.remove(original_path)
+                os.makedirs(os.path.dirname(original_path), exist_ok=True)
+                if rel_path in symlinks_backup:
+                    os.symlink(symlinks_backup[rel_path], original_path)
+                elif os.path.isdir(backup_path):
+                    self.transfer.tree(backup_path, original_path, move=True)
+                else:
+                    self.transfer.file(backup_path, original_path, move=True)
+
+        for name in packjournal.STAGING_DIRS:
+            path = os.path.join(self.game_dir, name)
+            if os.path.exists(path):
+                shutil.rmtree(path)
+        for name in packjournal.STAGING_FILES:
+            path = os.path.join(self.game_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+        if self.journal is not None:
+            self.journal.discard()
+
+
+class PackBuilder:
+    """Construit un paquet WGP/LGP à partir du dossier du jeu
+
+    Args:
+        game_dir: dossier du jeu
+        output_file: paquet à créer ou remplacer (Jeu.wgp, Jeu.lgp)
+        internal_game_name: nom interne (.gamename, chemins runtime)
+        config: paramètres du paquet (exe, args, icon, saves, extras, temps,
+                compression, profile, zero_copy, entropy_policy, incremental,
+                verify, image_digest, precompile_python, store, format,
+                volume_size...)
+        pack_type: 'wgp' ou 'lgp'
+        index: GameIndex partagé du dossier (construit si absent)
+        processors, mem_mb: limites passées à mksquashfs
+        tune_target: essais de compression automatique avant la construction (packtune)
+        callback: fonction(pourcentage, message) de progression
+    """
+
+    def __init__(self, game_dir, output_file, internal_game_name, config, pack_type='wgp',
+                 index=None, processors=None, mem_mb=None, tune_target=None, callback=None):
+        self.game_dir = game_dir
+        self.output_file = output_file
+        self.internal_game_name = internal_game_name
+        self.config = config
+        self.pack_type = pack_type
+        self.index = index
+        self.processors = processors
+        self.mem_mb = mem_mb
+        self.tune_target = tune_target
+        self.callback = callback
+        self.cancelled = False
+        self.source_size = 0
+        self.transfer = packtransfer.Transfer()  # Transferts du mode classique (rename/reflink)
+        self.classic = None  # Copie classique des saves/extras/temps (ClassicStaging)
+        self.staging = None  # Pseudo-fichiers mksquashfs (packstaging)
+        self.pseudo_file = None
+        self.runner = None  # mksquashfs ou mkfs.erofs en cours
+        self.tuner = None
+        self.tune_result = None
+        self.policy = None  # Fichiers stockés sans recompression (packpolicy)
+        self.actions_file = None
+        self.sort_file = None  # Ordre de lancement (-sort)
+        self.manifest = None
+        self.incremental = None  # Réutilisation des données du paquet existant (packincremental)
+        self.thin = None  # Gros fichiers liés au magasin partagé (packdedupe)
+        self.bytecode = None  # .pyc précompilés injectés sous __pycache__ (packbytecode)
+        self.verifier = None  # Relecture de l'image après création (packverify)
+        self.build_file = None  # Image en construction, renommée à la place du paquet à la fin
+
+    def build(self):
+        """Construit le paquet, retourne un subprocess.CompletedProcess
+
+        BuildCancelled si la création est annulée. Le dossier du jeu est
+        restauré et les fichiers temporaires supprimés dans tous les cas.
+        """
+        try:
+            if self.tune_target:
+                self.autotune()
+            self._emit(10, "Création des fichiers de configuration...")
+            self.create_config_files()
+            self._check_cancelled()
+            self._emit(30, f"Préparation de l'archive {self.pack_type.upper()}...")
+            result = self.create_image()
+            self._check_cancelled()
+            if result.returncode == 0 and self.config.get('verify'):
+                # Relecture avant la restauration des fichiers du jeu
+                result = self.verify(result)
+                self._check_cancelled()
+            if result.returncode == 0:
+                # Manifeste en fin de fichier (taille de l'image, sans la relire)
+                self._emit(100, "Écriture du manifeste...")
+                packmanifest.append_trailer(self.build_file, self.manifest,
+                                            digest=self.config.get('image_digest', False))
+                packvolumes.commit(self.build_file, self.output_file,
+                                   self.config.get('volume_size'))
+                self._emit(100, "Terminé !")
+            return result
+        finally:
+            self.cleanup()
+
+    def cancel(self):
+        self.cancelled = True
+        for step in (self.tuner, self.runner, self.incremental, self.verifier, self.bytecode):
+            if step is not None:
+                step.cancel()
+
+    def cleanup(self):
+        """Supprime les fichiers temporaires et restaure le dossier du jeu (mode classique)"""
+        # build_file n'existe plus après le renommage : reste d'un échec ou d'une annulation
+        for path in (self.build_file, self.pseudo_file, self.actions_file, self.sort_file):
+            if path and os.path.exists(path):
+                os.remove(path)
+        if self.thin is not None:
+            self.thin.cleanup()
+        if self.bytecode is not None:
+            self.bytecode.cleanup()
+        if self.classic is not None:
+            self.classic.restore()
+
+    def _emit(self, percent, message):
+        if self.callback is not None:
+            self.callback(percent, message)
+
+    def _check_cancelled(self):
+        if self.cancelled:
+            raise BuildCancelled()
+
+    def autotune(self):
+        """Choisit le profil de compression par essais (compression "auto-...")"""
+        self._refresh_index()  # Index partagé avec les essais
+        self.tuner = packtune.Autotuner(self.game_dir, self.tune_target, index=self.index,
+                                        processors=self.processors)
+        self.tune_result = self.tuner.run()
+        if self.tune_result is None:
+            if self.tuner.cancelled:
+                raise BuildCancelled()
+            raise RuntimeError("Essais de compression automatique en échec")
+        self.config['profile'] = self.tune_result.best.profile
+
+    def verify(self, result):
+        """Relit l'image et la compare aux sources ; empreintes ajoutées au manifeste"""
+        self.verifier = packverify.PackVerifier(self.build_file, self.game_dir,
+                                                workers=self.processors, callback=self.callback)
+        if not self.verifier.run():
+            self._check_cancelled()
+            return subprocess.CompletedProcess(result.args, 1, result.stdout,
+                                               f"Vérification échouée:\n{self.verifier.describe()}")
+        self.manifest.update(self.verifier.manifest_fields())
+        return result
+
+    def create_config_files(self):
+        """Écrit la configuration et l'icône, dispose les saves/extras/temps, écrit le manifeste"""
+        config = self.config
+        self._write('.gamename', self.internal_game_name)
+        self._write('.launch', config['exe'])
+        self._write('.args', config.get('args', ''))
+        if self.pack_type == 'wgp':
+            self._write('.fix', '' if config.get('fix_controller') else None)
+            self._write('.xbox', config.get('xbox_filter') or None)
+            self._write('.pds', config.get('pds') or None)
+        # Icône copiée AVANT le staging classique : elle peut être dans un dossier déplacé
+        if config.get('icon'):
+            copy_icon(config['icon'], os.path.join(self.game_dir, '.icon.png'))
+
+        if config.get('zero_copy', True):
+            packstaging.write_path_lists(self.game_dir, config)
+            self.staging = packstaging.build_staging(
+                self.game_dir, self.internal_game_name, config, self.pack_type
+            )
+        else:
+            self.classic = ClassicStaging(self.game_dir, self.internal_game_name, config,
+                                          self.pack_type, self.transfer)
+            self.classic.stage()
+
+        # Index rafraîchi : fichiers de configuration et staging classique pris en compte
+        self._refresh_index()
+        if config.get('store'):
+            # Mode bibliothèque : les gros fichiers rejoignent le magasin partagé
+            self.thin = packdedupe.ThinPack(
+                packdedupe.ContentStore(os.path.dirname(self.output_file)), self.game_dir,
+                blocked=packincremental.staged_paths(config), root_excludes=ROOT_EXCLUDES
+            ).apply(self._pseudo_staging(), packtune.config_profile(config))
+        if config.get('precompile_python'):
+            # Paquet en lecture seule : .pyc compilés d'avance sous __pycache__
+            self._emit(20, "Précompilation Python...")
+            self.bytecode = packbytecode.Precompiler(
+                self.game_dir, self.index, blocked=packincremental.staged_paths(config),
+                workers=self.processors
+            )
+            if self.bytecode.run(lambda percent, message: self._emit(20, message)):
+                self.bytecode.apply(self._pseudo_staging())
+            else:
+                self._check_cancelled()
+        if self.staging is not None:
+            fd, self.pseudo_file = tempfile.mkstemp(prefix=f'{self.pack_type}-pseudo-',
+                                                    suffix='.txt')
+            os.close(fd)
+            self.staging.write(self.pseudo_file)
+
+        # Manifeste compact, lisible sans extraire ni monter le paquet
+        self.manifest = packmanifest.build_manifest(
+            self.game_dir, self.internal_game_name, config, self.pack_type, self.index
+        )
+        if self.thin is not None:
+            self.manifest.update(self.thin.manifest_fields(self.output_file))
+        if self.bytecode is not None:
+            self.manifest.update(self.bytecode.manifest_fields())
+        packmanifest.write_manifest(self.game_dir, self.manifest)
+
+    def _write(self, name, content):
+        """Écrit un fichier de configuration, ou le supprime si content est None"""
+        path = os.path.join(self.game_dir, name)
+        if content is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def _pseudo_staging(self):
+        """Pseudo-fichiers du paquet (vides en copie classique : bytecode, magasin, EROFS)"""
+        if self.staging is None:
+            self.staging = packstaging.PseudoStaging(
+                self.game_dir, self.internal_game_name, self.pack_type
+            )
+        return self.staging
+
+    def _refresh_index(self):
+        if self.index is None:
+            self.index = gameindex.GameIndex(self.game_dir)
+        else:
+            self.index.refresh()
+
+    def _blocked_paths(self):
+        """Chemins jamais repris de l'ancien paquet ni de l'image scannée tels quels"""
+        blocked = packincremental.staged_paths(self.config)
+        if self.thin is not None:
+            blocked += list(self.thin.linked)
+        if self.bytecode is not None:
+            blocked += self.bytecode.replaced_paths()
+        return blocked
+
+    def create_image(self):
+        """Construit l'image du paquet au format demandé (squashfs par défaut)"""
+        self._refresh_index()
+        # Les originaux exclus sont réinjectés par pseudo-fichiers : comptés une fois
+        self.source_size = self.index.total_size(exclude_dirs=['__pycache__'])
+        if self.thin is not None:
+            self.source_size -= self.thin.linked_bytes
+        os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
+        # L'ancien paquet reste en place (et jouable) jusqu'au renommage final
+        self.build_file = packbuild.partial_path(self.output_file)
+        if self.config.get('format', 'squashfs') == 'erofs':
+            return self.create_erofs()
+        return self.create_squashfs()
+
+    def create_erofs(self):
+        """Image EROFS : jeu et staging envoyés en flux tar à mkfs.erofs"""
+        skip = [packincremental.INDEX_FILE]  # Pas de reconstruction incrémentale en EROFS
+        if self.thin is not None:
+            skip += list(self.thin.linked)
+        self.runner = packimage.ErofsBuild(
+            self.game_dir, self.build_file, self._pseudo_staging(),
+            packtune.config_profile(self.config), skip=skip, root_excludes=ROOT_EXCLUDES,
+            processors=self.processors
+        )
+        return self.runner.run()
+
+    def create_squashfs(self):
+        """Image squashfs avec progression temps réel lue depuis mksquashfs"""
+        cmd = [
+            'mksquashfs', self.game_dir, self.build_file,
+            '-noappend', '-wildcards', '-percentage', '-progress',
+        ]
+        # Niveau zstd choisi ou profil déterminé par la compression automatique
+        cmd.extend(packtune.compression_args(self.config))
+        if self.processors:
+            cmd.extend(['-processors', str(self.processors)])
+        if self.mem_mb:
+            cmd.extend(['-mem', f'{self.mem_mb}M'])
+        for exclude in ROOT_EXCLUDES:
+            cmd.extend(['-e', exclude])
+        if self.staging is not None:
+            cmd.extend(self.staging.mksquashfs_args(self.pseudo_file))
+        if self.thin is not None:
+            cmd.extend(self.thin.mksquashfs_args())
+
+        # Ordre de lancement enregistré (.launchorder) : fichiers chauds en tête d'image
+        if os.path.exists(os.path.join(self.game_dir, launchprofile.LAUNCH_ORDER_FILE)):
+            fd, self.sort_file = tempfile.mkstemp(prefix=f'{self.pack_type}-sort-', suffix='.txt')
+            os.close(fd)
+            if launchprofile.write_sort_file(self.game_dir, self.sort_file):
+                cmd.extend(['-sort', self.sort_file])
+
+        # Vidéos, audio et archives déjà compressés : stockés sans recompression
+        if self.config.get('entropy_policy', True):
+            self.policy = packpolicy.CompressionPolicy(
+                self.game_dir, self.index, self.config['compression']
+            ).scan()
+            if self.policy.files:
+                fd, self.actions_file = tempfile.mkstemp(prefix=f'{self.pack_type}-actions-',
+                                                         suffix='.txt')
+                os.close(fd)
+                self.policy.write_actions(self.actions_file)
+                cmd.extend(['-action-file', self.actions_file])
+
+        # Paquet existant au même profil : seuls les fichiers modifiés sont compressés,
+        # les blocs inchangés sont recopiés tels quels depuis l'ancien paquet
+        self.incremental = packincremental.IncrementalBuild(
+            self.game_dir, self.output_file, packtune.config_profile(self.config),
+            self.build_file, blocked=self._blocked_paths(), root_excludes=ROOT_EXCLUDES
+        )
+        if self.incremental.prepare(self.config.get('incremental', True)):
+            try:
+                result = self._run_mksquashfs(self.incremental.delta_cmd(cmd),
+                                              self.incremental.changed_bytes,
+                                              self.incremental.delta_file)
+                if result.returncode != 0 or self.cancelled:
+                    return result
+                self._emit(99, "Assemblage avec l'ancien paquet...")
+                self.incremental.merge(lambda copied, total: self._emit(
+                    99, f"Assemblage : {packbuild.format_size(copied)} / "
+                        f"{packbuild.format_size(total)} recopiés"))
+                return result
+            except packincremental.IncrementalError as e:
+                if self.cancelled:
+                    raise BuildCancelled() from e
+                self.incremental.reason = f"assemblage impossible : {e}"
+            finally:
+                self.incremental.cleanup()
+        return self._run_mksquashfs(self.incremental.full_cmd(cmd), self.source_size,
+                                    self.build_file)
+
+    def _run_mksquashfs(self, cmd, total_size, output_file):
+        """Lance mksquashfs dans un PTY : progression réelle (-percentage), débits et ETA"""
+        self._emit(0, "Démarrage de la compression...")
+        callback = None
+        if self.callback is not None:
+            callback = lambda percent, stats: self.callback(percent, stats.describe())
+        self.runner = packbuild.MksquashfsRunner(cmd, max(1, total_size), output_file, callback)
+        if self.cancelled:
+            self.runner.cancel()
+        return self.runner.run()
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) not in (3, 4) or args[0] in ('-h', '--help'):
+        print(f"Usage: {sys.argv[0]} <dossier_du_jeu> <sortie.wgp|lgp> <exécutable> [nom_interne]")
+        return 1
+    game_dir = os.path.abspath(args[0])
+    output_file = os.path.abspath(args[1])
+    pack_type = 'lgp' if output_file.endswith('.lgp') else 'wgp'
+    name = args[3] if len(args) == 4 else os.path.splitext(os.path.basename(output_file))[0]
+    config = {'exe': args[2], 'args': '', 'icon': None, 'compression': 15, 'profile': None,
+              'saves': [], 'extras': [], 'temps': []}
+    builder = PackBuilder(game_dir, output_file, name, config, pack_type,
+                          callback=lambda percent, message: print(f"{percent:3d}% {message}"))
+    try:
+        result = builder.build()
+    except (OSError, RuntimeError, BuildCancelled) as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 2
+    if result.returncode != 0:
+        print(f"Erreur: {result.stderr}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
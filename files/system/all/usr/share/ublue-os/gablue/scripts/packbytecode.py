@@ -0,0 +1,328 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Bytecode - Précompilation Python des paquets LGP (sans Qt)
+
+Un paquet est monté en lecture seule : un jeu Python (Ren'Py, pygame, lanceur
+.py) recompile tous ses modules à chaque lancement sans pouvoir écrire
+__pycache__. Avant la compression, les .py du jeu sont compilés pour
+l'interpréteur qui les exécutera :
+- runtime embarqué détecté par ses traces (lib/python3.9, libpython3.9.so,
+  binaire python3.9, Ren'Py lib/py3-linux-x86_64/python)
+- sinon python3 du système (lanceurs .py)
+
+La compilation passe par un interpréteur de même version (celui du système,
+pythonX.Y installé, ou le binaire embarqué lancé avec son PYTHONHOME). Les
+.pyc sont vérifiés par empreinte du source (PEP 552, checked-hash) : les dates
+du paquet monté n'entrent pas en jeu, et un source modifié est simplement
+recompilé en mémoire. Ils sont écrits dans un dossier temporaire puis injectés
+sous __pycache__ par pseudo-fichiers : le dossier du jeu n'est pas modifié.
+
+Usage: packbytecode.py <dossier_du_jeu>   (détection et compilation d'essai)
+"""
+
+import sys
+import os
+import re
+import shlex
+import shutil
+import stat
+import subprocess
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import gameindex
+import packbuild
+import packstaging
+
+
+SKIP_DIRS = ['.save', '.extra', '.temp', '__pycache__']
+MIN_VERSION = (3, 7)  # .pyc vérifiés par empreinte (PEP 552)
+PROBE_TIMEOUT = 10
+CHUNK_FILES = 200  # Fichiers par lot confié à un interpréteur
+
+STDLIB_DIR_RE = re.compile(r'python(\d)\.(\d+)')
+LIBPYTHON_RE = re.compile(r'libpython(\d)\.(\d+)[a-z]*\.so(\.[\d.]+)?')
+INTERPRETER_RE = re.compile(r'python(?:(\d)(?:\.(\d+))?)?')
+
+# Exécuté par l'interpréteur cible (compatible 3.7) : chemins relatifs sur stdin
+_DRIVER = r'''
+import os, py_compile, sys
+src, out = sys.argv[1], sys.argv[2]
+tag = sys.implementation.cache_tag
+mode = py_compile.PycInvalidationMode.CHECKED_HASH
+for rel in sys.stdin.read().splitlines():
+    head, name = os.path.split(rel)
+    cfile = os.path.join(out, head, '__pycache__', name[:-3] + '.' + tag + '.pyc')
+    try:
+        py_compile.compile(os.path.join(src, rel), cfile=cfile, dfile=rel,
+                           doraise=True, invalidation_mode=mode)
+        print('ok ' + tag + ' ' + rel, flush=True)
+    except Exception as e:
+        print('err ' + tag + ' ' + rel + ' : ' + str(e).strip().splitlines()[-1].strip(), flush=True)
+'''
+
+_PROBE = "import sys; print('%d.%d' % sys.version_info[:2])"
+
+
+class Runtime:
+    """Interpréteur retenu pour compiler les .py d'un jeu"""
+
+    def __init__(self, version, interpreter, origin, env=None):
+        self.version = version          # (majeur, mineur)
+        self.interpreter = interpreter  # Chemin de l'exécutable
+        self.origin = origin            # Description affichable
+        self.env = env                  # Variables d'environnement (PYTHONHOME)
+
+    @property
+    def label(self):
+        return f"Python {self.version[0]}.{self.version[1]}"
+
+
+def _probe(interpreter, env=None):
+    """Version (majeur, mineur) d'un interpréteur, None s'il ne démarre pas"""
+    try:
+        result = subprocess.run([interpreter, '-c', _PROBE], capture_output=True, text=True,
+                                env=env, timeout=PROBE_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    m = re.fullmatch(r'(\d+)\.(\d+)', result.stdout.strip())
+    if result.returncode != 0 or not m:
+        return None
+    return int(m.group(1)), int(m.group(2))
+
+
+class Precompiler:
+    """Compile les .py d'un jeu en .pyc vérifiés par empreinte, injectés dans le staging
+
+    Args:
+        game_dir: dossier du jeu
+        index: GameIndex du dossier (construit si absent)
+        blocked: chemins jamais compilés (saves/extras/temps disposés hors du paquet)
+        workers: interpréteurs lancés en parallèle
+    """
+
+    def __init__(self, game_dir, index=None, blocked=(), workers=None):
+        self.game_dir = os.path.abspath(game_dir)
+        self.index = index
+        self.blocked = tuple(blocked)
+        self.workers = workers or os.cpu_count() or 1
+        self.runtime = None
+        self.reason = None  # Raison de l'absence de précompilation
+        self.sources = []   # Fichiers .py retenus (chemins relatifs)
+        self.compiled = {}  # chemin du .pyc dans le paquet -> fichier compilé
+        self.compiled_sources = []
+        self.errors = []    # (chemin relatif, message)
+        self.bytes = 0
+        self.cache_tag = None
+        self.out_dir = None
+        self.cancelled = False
+        self._procs = []
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self.cancelled = True
+        with self._lock:
+            for proc in self._procs:
+                if proc.poll() is None:
+                    proc.terminate()
+
+    def detect(self):
+        """Choisit l'interpréteur des .py du jeu, retourne un Runtime ou None (voir reason)"""
+        if self.index is None:
+            self.index = gameindex.GameIndex(self.game_dir)
+        versions = Counter()
+        interpreters = []  # (chemin relatif, version annoncée ou None)
+        prefixes = set()   # Préfixes PYTHONHOME des bibliothèques standard embarquées
+        sources = []
+        for entry in self.index.walk(exclude_dirs=SKIP_DIRS):
+            rel_path = entry.rel_path
+            if any(rel_path == b or rel_path.startswith(b + '/') for b in self.blocked):
+                continue
+            parts = rel_path.split('/')
+            for depth, part in enumerate(parts[:-1]):
+                m = STDLIB_DIR_RE.fullmatch(part)
+                if m:
+                    versions[int(m.group(1)), int(m.group(2))] += 1
+                    if depth and parts[depth - 1] == 'lib':
+                        prefixes.add('/'.join(parts[:depth - 1]))
+                    break
+            m = LIBPYTHON_RE.fullmatch(entry.name)
+            if m:
+                versions[int(m.group(1)), int(m.group(2))] += 1000
+            m = INTERPRETER_RE.fullmatch(entry.name)
+            if m and not entry.is_symlink and stat.S_ISREG(entry.mode) and entry.mode & 0o111:
+                version = (int(m.group(1)), int(m.group(2))) if m.group(2) else None
+                if version:
+                    versions[version] += 1000
+                interpreters.append((rel_path, version))
+            if entry.name.endswith('.py') and not entry.is_symlink:
+                sources.append(rel_path)
+
+        if not sources:
+            self.reason = "aucun fichier .py"
+            return None
+        if not versions:
+            version = sys.version_info[:2]
+            self.runtime = Runtime(version, sys.executable, "python3 du système")
+        else:
+            version = versions.most_common(1)[0][0]
+            self.runtime = self._find_interpreter(version, interpreters, prefixes)
+        if version < MIN_VERSION:
+            self.reason = (f"Python {version[0]}.{version[1]} embarqué : pas de .pyc "
+                           f"vérifiés par empreinte avant Python 3.7")
+            self.runtime = None
+            return None
+        if self.runtime is None:
+            self.reason = (f"aucun interpréteur Python {version[0]}.{version[1]} utilisable "
+                           f"(installer python{version[0]}.{version[1]})")
+            return None
+
+        # Bibliothèque standard d'une autre version (runtime secondaire) : pas compilable ici
+        own = f"python{version[0]}.{version[1]}"
+        self.sources = [rel for rel in sources
+                        if all(not STDLIB_DIR_RE.fullmatch(part) or part == own
+                               for part in rel.split('/')[:-1])]
+        return self.runtime
+
+    def _find_interpreter(self, version, interpreters, prefixes):
+        """Interpréteur de la version voulue : système, pythonX.Y installé, puis embarqué"""
+        if sys.version_info[:2] == version:
+            return Runtime(version, sys.executable, "python3 du système")
+        installed = shutil.which(f"python{version[0]}.{version[1]}")
+        if installed and _probe(installed) == version:
+            return Runtime(version, installed, installed)
+        if version < MIN_VERSION:
+            return None
+        # Binaire embarqué : essayé seul, puis avec chaque bibliothèque standard du jeu
+        candidates = sorted(interpreters, key=lambda item: item[1] != version)
+        for rel_path, _announced in candidates:
+            path = os.path.join(self.game_dir, rel_path)
+            for prefix in [None] + sorted(prefixes):
+                env = None
+                if prefix is not None:
+                    env = dict(os.environ, PYTHONHOME=os.path.join(self.game_dir, prefix),
+                               PYTHONNOUSERSITE='1')
+                if _probe(path, env) == version:
+                    return Runtime(version, path, f"{rel_path} (embarqué)", env)
+        return None
+
+    def run(self, callback=None):
+        """Détecte le runtime et compile les .py, retourne True si des .pyc sont prêts
+
+        callback : fonction (pourcentage, message) pour la progression
+        """
+        if self.runtime is None and self.detect() is None:
+            return False
+        self.out_dir = tempfile.mkdtemp(prefix='lgp-bytecode-')
+        chunks = [self.sources[i:i + CHUNK_FILES]
+                  for i in range(0, len(self.sources), CHUNK_FILES)]
+        done = [0]
+
+        def compile_chunk(chunk):
+            if self.cancelled:
+                return
+            proc = subprocess.Popen(
+                [self.runtime.interpreter, '-c', _DRIVER, self.game_dir, self.out_dir],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, env=self.runtime.env
+            )
+            with self._lock:
+                self._procs.append(proc)
+            proc.stdin.write('\n'.join(chunk))
+            proc.stdin.close()
+            for line in proc.stdout:
+                status, tag, rest = line.rstrip('\n').split(' ', 2)
+                with self._lock:
+                    self.cache_tag = tag
+                    if status == 'ok':
+                        head, name = os.path.split(rest)
+                        pyc = os.path.join(head, '__pycache__', f"{name[:-3]}.{tag}.pyc")
+                        self.compiled[pyc] = os.path.join(self.out_dir, pyc)
+                        self.compiled_sources.append(rest)
+                    else:
+                        self.errors.append(tuple(rest.split(' : ', 1)))
+                    done[0] += 1
+                    count = done[0]
+                if callback and count % 50 == 0:
+                    callback(count * 100 // len(self.sources),
+                             f"Précompilation Python... {count}/{len(self.sources)}")
+            proc.wait()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(compile_chunk, chunks))
+        if self.cancelled:
+            self.cleanup()
+            return False
+        self.bytes = sum(os.path.getsize(path) for path in self.compiled.values())
+        if not self.compiled:
+            self.reason = "aucun fichier compilé"
+            return False
+        return True
+
+    def apply(self, staging):
+        """Ajoute les __pycache__ compilés au staging (anciens __pycache__ du jeu exclus)"""
+        for pycache in sorted({os.path.dirname(pyc) for pyc in self.compiled}):
+            if os.path.isdir(os.path.join(self.game_dir, pycache)):
+                staging.excludes.append(packstaging.exclude_pattern(pycache))
+            st = os.stat(os.path.join(self.game_dir, os.path.dirname(pycache)))
+            staging.lines.append(f"{packstaging.pseudo_quote(pycache)} d "
+                                 f"{stat.S_IMODE(st.st_mode):o} {st.st_uid} {st.st_gid}")
+        for pyc, path in sorted(self.compiled.items()):
+            st = os.stat(os.path.join(self.game_dir, os.path.dirname(os.path.dirname(pyc))))
+            staging.lines.append(f"{packstaging.pseudo_quote(pyc)} f 644 {st.st_uid} {st.st_gid} "
+                                 f"cat -- {shlex.quote(path)}")
+        return staging
+
+    def replaced_paths(self):
+        """Chemins jamais réutilisés par une reconstruction incrémentale (packincremental)
+
+        Sources compilés et anciens __pycache__ : leurs dossiers reçoivent les
+        .pyc par pseudo-fichiers et ne peuvent pas être recopiés de l'ancien paquet.
+        """
+        pycaches = {os.path.dirname(pyc) for pyc in self.compiled}
+        return sorted(self.compiled_sources) + sorted(
+            p for p in pycaches if os.path.isdir(os.path.join(self.game_dir, p)))
+
+    def manifest_fields(self):
+        """Champs du manifeste : version du bytecode embarqué"""
+        if not self.compiled:
+            return {}
+        return {'python_bytecode': {'tag': self.cache_tag, 'files': len(self.compiled)}}
+
+    def describe(self):
+        """Résumé affichable de la précompilation"""
+        if self.reason is not None:
+            return f"Précompilation Python : non ({self.reason})"
+        summary = (f"Précompilation Python : {len(self.compiled)} modules "
+                   f"({packbuild.format_size(self.bytes)}) pour {self.runtime.label}, "
+                   f"{self.runtime.origin}")
+        if self.errors:
+            summary += f", {len(self.errors)} non compilables (laissés tels quels)"
+        return summary
+
+    def cleanup(self):
+        if self.out_dir:
+            shutil.rmtree(self.out_dir, ignore_errors=True)
+        self.out_dir = None
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] in ('-h', '--help'):
+        print(f"Usage: {sys.argv[0]} <dossier_du_jeu>")
+        return 1
+    precompiler = Precompiler(sys.argv[1])
+    try:
+        precompiler.run(lambda pct, msg: print(msg, file=sys.stderr))
+        print(precompiler.describe())
+        for rel_path, message in precompiler.errors[:20]:
+            print(f"  {rel_path} : {message}")
+    finally:
+        precompiler.cleanup()
+    return 0 if precompiler.compiled else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,506 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Dedupe - Magasin de contenu partagé entre les paquets d'une bibliothèque (sans Qt)
+
+Les jeux d'une même bibliothèque embarquent souvent les mêmes gros fichiers
+(moteurs, runtimes, vidéos, DLC partagés). En mode bibliothèque, chaque fichier
+d'au moins MIN_SIZE est adressé par son contenu (blake2b) et stocké une seule
+fois dans <bibliothèque>/.wgp-store/store.sqfs ; le paquet « mince » ne
+contient à sa place qu'un lien symbolique vers /tmp/wgp-store/<id>/<empreinte>.
+Le lanceur monte le magasin à cet endroit avant de lancer le jeu.
+
+Commandes :
+    report   : volume dupliqué entre des paquets existants (gain estimé)
+    materialize : remplace les liens vers le magasin d'un paquet extrait par les fichiers
+    gc       : reconstruit le magasin sans les objets que plus aucun paquet n'utilise
+
+Usage: packdedupe.py report <paquet|dossier>... [-min 64K] [-top 10] [-json]
+       packdedupe.py materialize <dossier_extrait> <paquet.wgp>
+       packdedupe.py gc <bibliothèque>
+"""
+
+import sys
+import os
+import fcntl
+import fnmatch
+import hashlib
+import json
+import shlex
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import packbuild
+import packmanifest
+import packrecompress
+import packstaging
+import packtransfer
+import packtune
+import packvolumes
+import squashfsreader
+
+
+STORE_DIR = '.wgp-store'
+STORE_IMAGE = 'store.sqfs'
+STORE_ID_FILE = 'store.id'
+LOCK_FILE = 'lock'
+RUNTIME_BASE = '/tmp/wgp-store'  # Point de montage vu par le jeu (/tmp partagé du bac à sable)
+
+MIN_SIZE = 64 * 1024  # Les petits fichiers restent dans le paquet
+DIGEST_SIZE = 20
+HASH_WORKERS = 8
+OBJECT_MODE = 0o555  # Lecture et exécution : un même objet peut servir à plusieurs jeux
+DEFAULT_PROFILE = {'comp': 'zstd', 'level': 15, 'block_size': 128 * 1024}
+
+
+def content_digest(path, chunk_size=1024 * 1024):
+    """Empreinte de contenu d'un fichier (nom de l'objet dans le magasin)"""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def image_digest(image, node):
+    """Empreinte de contenu d'un fichier d'une image squashfs"""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for block in image.iter_blocks(node):
+        h.update(block)
+    return h.hexdigest()
+
+
+def stored_size(image, node):
+    """Octets occupés par un fichier dans l'image (blocs compressés + fin en fragment)"""
+    size = sum(s & ~squashfsreader.DATA_UNCOMPRESSED for s in node.block_sizes)
+    if node.fragment != squashfsreader.NO_FRAGMENT:
+        size += node.size % image.block_size
+    return size
+
+
+def image_profile(image):
+    """Profil de compression d'une image existante (pour la reconstruire à l'identique)"""
+    return {'comp': image.compression_name, 'level': image.compression_level,
+            'block_size': image.block_size}
+
+
+class ContentStore:
+    """Magasin d'objets d'une bibliothèque (<bibliothèque>/.wgp-store)
+
+    Args:
+        library_dir: dossier contenant les paquets
+    """
+
+    def __init__(self, library_dir):
+        self.library_dir = os.path.abspath(library_dir)
+        self.directory = os.path.join(self.library_dir, STORE_DIR)
+        self.image = os.path.join(self.directory, STORE_IMAGE)
+
+    @property
+    def id(self):
+        """Identifiant du magasin (créé au premier accès)"""
+        path = os.path.join(self.directory, STORE_ID_FILE)
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(uuid.uuid4().hex[:16])
+            return self.id
+
+    def link(self, digest):
+        """Cible du lien symbolique d'un objet dans un paquet mince"""
+        return f"{RUNTIME_BASE}/{self.id}/{digest}"
+
+    def objects(self):
+        """Empreintes déjà présentes dans le magasin"""
+        if not os.path.exists(self.image):
+            return set()
+        with squashfsreader.SquashfsImage(self.image) as image:
+            return set(image.listdir())
+
+    def lock(self):
+        """Verrou exclusif du magasin (fichier ouvert à fermer pour le relâcher)"""
+        os.makedirs(self.directory, exist_ok=True)
+        f = open(os.path.join(self.directory, LOCK_FILE), 'w')
+        fcntl.flock(f, fcntl.LOCK_EX)
+        return f
+
+    def add(self, sources, profile=None, callback=None):
+        """Ajoute des objets au magasin : sources = {empreinte: chemin du fichier}
+
+        L'image est clonée (reflink si possible), complétée par mksquashfs en
+        mode ajout puis remplacée atomiquement : un jeu lancé garde l'ancienne.
+        Retourne (objets ajoutés, octets ajoutés).
+        """
+        with self.lock():
+            existing = self.objects()
+            sources = {d: p for d, p in sources.items() if d not in existing}
+            if not sources:
+                return 0, 0
+            total = sum(os.path.getsize(p) for p in sources.values())
+            if shutil.disk_usage(self.directory).free < total:
+                raise OSError(f"Espace libre insuffisant dans {self.directory} "
+                              f"({packbuild.format_size(total)} nécessaires)")
+
+            temp_file = f"{self.image}.tmp-{os.getpid()}"
+            empty_dir = tempfile.mkdtemp(prefix='wgp-store-')
+            fd, pseudo_file = tempfile.mkstemp(prefix='wgp-store-pseudo-', suffix='.txt')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8', errors='surrogateescape') as f:
+                    for digest, path in sorted(sources.items()):
+                        f.write(f"{digest} f {OBJECT_MODE:o} 0 0 cat -- {shlex.quote(path)}\n")
+                cmd = ['mksquashfs', empty_dir, temp_file, '-no-xattrs', '-percentage', '-progress',
+                       '-pf', pseudo_file]
+                if existing:
+                    # Mode ajout : les objets existants ne sont ni relus ni recompressés
+                    packtransfer.Transfer().file(self.image, temp_file)
+                else:
+                    cmd += ['-noappend'] + packtune.profile_args(profile or DEFAULT_PROFILE)
+                completed = packbuild.MksquashfsRunner(cmd, total, temp_file, callback).run()
+                if completed.returncode != 0:
+                    raise RuntimeError(f"mksquashfs a échoué: {completed.stderr}")
+                packbuild.commit_pack(temp_file, self.image)
+                return len(sources), total
+            finally:
+                shutil.rmtree(empty_dir, ignore_errors=True)
+                os.remove(pseudo_file)
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+
+
+class ThinPack:
+    """Remplace les gros fichiers d'un jeu par des liens vers le magasin partagé
+
+    Les fichiers liés sont exclus de mksquashfs (-ef) et remplacés par des
+    pseudo-liens dans le staging du paquet.
+
+    Args:
+        store: ContentStore de la bibliothèque
+        game_dir: dossier du jeu
+        blocked: chemins jamais liés (saves/extras/temps disposés)
+        root_excludes: motifs exclus à la racine par mksquashfs (*.tmp, *.log)
+        min_size: taille minimale d'un fichier partagé
+    """
+
+    def __init__(self, store, game_dir, blocked=(), root_excludes=(), min_size=MIN_SIZE):
+        self.store = store
+        self.game_dir = os.path.abspath(game_dir)
+        self.blocked = set(blocked)
+        self.root_excludes = root_excludes
+        self.min_size = min_size
+        self.linked = {}  # chemin relatif -> empreinte
+        self.modes = {}  # chemin relatif -> permissions d'origine
+        self.linked_bytes = 0
+        self.added_objects = 0
+        self.added_bytes = 0
+        self.exclude_file = None
+
+    def candidates(self):
+        """Fichiers réguliers du jeu assez gros pour le magasin : {chemin relatif: taille}"""
+        files = {}
+        stack = ['']
+        while stack:
+            rel_dir = stack.pop()
+            with os.scandir(os.path.join(self.game_dir, rel_dir)) as it:
+                entries = list(it)
+            for de in entries:
+                if not rel_dir and (de.name.startswith('.') or
+                                    any(fnmatch.fnmatch(de.name, p)
+                                        for p in self.root_excludes)):
+                    continue
+                rel_path = f"{rel_dir}/{de.name}" if rel_dir else de.name
+                if rel_path in self.blocked:
+                    continue
+                if de.is_dir(follow_symlinks=False):
+                    stack.append(rel_path)
+                elif de.is_file(follow_symlinks=False):
+                    size = de.stat(follow_symlinks=False).st_size
+                    if size >= self.min_size:
+                        files[rel_path] = size
+        return files
+
+    def apply(self, staging, profile=None, callback=None):
+        """Envoie les fichiers au magasin et les remplace par des liens dans le staging"""
+        files = self.candidates()
+        paths = sorted(files)
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+            digests = pool.map(lambda rel: content_digest(os.path.join(self.game_dir, rel)), paths)
+            self.linked = dict(zip(paths, digests))
+        if not self.linked:
+            return self
+
+        sources = {}
+        for rel_path, digest in self.linked.items():
+            sources.setdefault(digest, os.path.join(self.game_dir, rel_path))
+        self.added_objects, self.added_bytes = self.store.add(sources, profile, callback)
+        self.linked_bytes = sum(files.values())
+
+        for rel_path, digest in sorted(self.linked.items()):
+            st = os.lstat(os.path.join(self.game_dir, rel_path))
+            self.modes[rel_path] = st.st_mode & 0o7777
+            staging.lines.append(
+                f"{packstaging.pseudo_quote(rel_path)} s 777 {st.st_uid} {st.st_gid} "
+                f"{self.store.link(digest)}"
+            )
+        fd, self.exclude_file = tempfile.mkstemp(prefix='pack-store-', suffix='.txt')
+        os.close(fd)
+        packstaging.write_exclude_file(self.exclude_file, self.linked)
+        return self
+
+    def mksquashfs_args(self):
+        """Arguments à ajouter à la commande mksquashfs"""
+        return ['-ef', self.exclude_file] if self.exclude_file else []
+
+    def manifest_fields(self, pack_file):
+        """Champs du manifeste pour le lanceur (magasin à monter)"""
+        if not self.linked:
+            return {}
+        return {
+            'store_id': self.store.id,
+            'store_path': os.path.relpath(self.store.image,
+                                          os.path.dirname(os.path.abspath(pack_file))),
+            'store_files': len(self.linked),
+            'store_bytes': self.linked_bytes,
+            # Le lien est en 777 : materialize restaure les permissions d'origine
+            'store_modes': {rel: f"{mode:o}" for rel, mode in sorted(self.modes.items())},
+        }
+
+    def describe(self):
+        """Résumé affichable après la création"""
+        return (f"Magasin partagé : {len(self.linked)} fichiers "
+                f"({packbuild.format_size(self.linked_bytes)}) liés, "
+                f"{packbuild.format_size(self.added_bytes)} ajoutés au magasin")
+
+    def cleanup(self):
+        if self.exclude_file and os.path.exists(self.exclude_file):
+            os.remove(self.exclude_file)
+        self.exclude_file = None
+
+
+def pack_store(pack_file):
+    """ContentStore et identifiant référencés par un paquet mince, (None, None) sinon"""
+    manifest = packmanifest.read_manifest(pack_file) or {}
+    if not manifest.get('store_id'):
+        return None, None
+    image = os.path.join(os.path.dirname(os.path.abspath(pack_file)), manifest['store_path'])
+    return ContentStore(os.path.dirname(os.path.dirname(image))), manifest['store_id']
+
+
+def materialize(extracted_dir, pack_file):
+    """Remplace les liens vers le magasin d'un paquet extrait par les fichiers eux-mêmes
+
+    Les permissions d'origine viennent du manifeste (0755 pour les paquets
+    antérieurs qui ne les enregistraient pas). Retourne le nombre de fichiers restaurés.
+    """
+    store, store_id = pack_store(pack_file)
+    if store is None:
+        return 0
+    manifest = packmanifest.read_manifest(pack_file) or {}
+    modes = manifest.get('store_modes', {})
+    prefix = f"{RUNTIME_BASE}/{store_id}/"
+    count = 0
+    with squashfsreader.SquashfsImage(store.image) as image:
+        for root, _dirs, files in os.walk(extracted_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if not os.path.islink(path):
+                    continue
+                target = os.readlink(path)
+                if not target.startswith(prefix):
+                    continue
+                temp_path = f"{path}.store-{os.getpid()}"
+                with image.open(target[len(prefix):]) as src, open(temp_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, image.block_size)
+                rel_path = os.path.relpath(path, extracted_dir).replace(os.sep, '/')
+                os.chmod(temp_path, int(modes.get(rel_path, '755'), 8))
+                os.replace(temp_path, path)
+                count += 1
+    return count
+
+
+def referenced_objects(library_dir, store_id):
+    """Empreintes utilisées par les paquets minces d'une bibliothèque"""
+    prefix = f"{RUNTIME_BASE}/{store_id}/"
+    used = set()
+    for pack in packmanifest.iter_packs(library_dir):
+        if (packmanifest.read_manifest(pack) or {}).get('store_id') != store_id:
+            continue
+        with squashfsreader.SquashfsImage(pack) as image:
+            for _rel_path, node in image.walk():
+                if node.is_symlink() and node.target.startswith(prefix):
+                    used.add(node.target[len(prefix):])
+    return used
+
+
+def collect_garbage(library_dir, callback=None):
+    """Reconstruit le magasin sans ses objets orphelins
+
+    Retourne (objets supprimés, ancienne taille, nouvelle taille).
+    """
+    store = ContentStore(library_dir)
+    if not os.path.exists(store.image):
+        return 0, 0, 0
+    with store.lock():
+        used = referenced_objects(library_dir, store.id)
+        with squashfsreader.SquashfsImage(store.image) as image:
+            orphans = set(image.listdir()) - used
+            profile = image_profile(image)
+        old_size = os.path.getsize(store.image)
+        if not orphans:
+            return 0, old_size, old_size
+        job = packrecompress.Recompressor(store.image, profile, callback=callback,
+                                          keep=lambda rel_path: rel_path.split('/')[0] in used)
+        result = job.run(force=True)
+        if result['status'] != 'ok':
+            raise RuntimeError(result['error'] or "reconstruction du magasin annulée")
+        return len(orphans), old_size, result['new_size']
+
+
+def library_report(packs, min_size=MIN_SIZE, top=10):
+    """Volume dupliqué entre paquets : seules les tailles présentes dans plusieurs
+    paquets sont lues et hachées (décompression des blocs)
+
+    Retourne un dict : totaux, octets dupliqués, gain disque estimé, plus gros doublons.
+    """
+    by_size = {}  # taille -> [(paquet, chemin relatif)]
+    total_files = total_bytes = 0
+    for pack in packs:
+        with squashfsreader.SquashfsImage(pack) as image:
+            for rel_path, node in image.walk():
+                if node.is_file() and node.size >= min_size:
+                    by_size.setdefault(node.size, []).append((pack, rel_path))
+                    total_files += 1
+                    total_bytes += node.size
+
+    # Doublons internes à un paquet : déjà partagés par mksquashfs
+    to_hash = {}
+    for size, files in by_size.items():
+        if len({pack for pack, _rel in files}) > 1:
+            for pack, rel_path in files:
+                to_hash.setdefault(pack, []).append(rel_path)
+
+    copies = {}  # empreinte -> {paquet: (chemin relatif, taille, octets stockés)}
+    for pack, rel_paths in to_hash.items():
+        with squashfsreader.SquashfsImage(pack) as image:
+            for rel_path in rel_paths:
+                node = image.stat(rel_path, follow_symlinks=False)
+                digest = image_digest(image, node)
+                copies.setdefault(digest, {}).setdefault(
+                    pack, (rel_path, node.size, stored_size(image, node)))
+
+    duplicates = []
+    duplicate_bytes = saved_bytes = 0
+    for digest, per_pack in copies.items():
+        if len(per_pack) < 2:
+            continue
+        entries = sorted(per_pack.items(), key=lambda item: item[1][2])
+        size = entries[0][1][1]
+        redundant = len(entries) - 1
+        duplicate_bytes += size * redundant
+        saved_bytes += sum(stored for _pack, (_rel, _size, stored) in entries[1:])
+        duplicates.append({'digest': digest, 'size': size, 'copies': len(entries),
+                           'path': entries[0][1][0],
+                           'packs': [os.path.basename(pack) for pack, _info in entries]})
+    duplicates.sort(key=lambda d: d['size'] * (d['copies'] - 1), reverse=True)
+
+    unique_bytes = total_bytes - duplicate_bytes
+    return {
+        'packs': len(packs),
+        'pack_bytes': sum(packvolumes.pack_size(p) for p in packs),
+        'files': total_files,
+        'bytes': total_bytes,
+        'unique_bytes': unique_bytes,
+        'duplicate_files': sum(d['copies'] - 1 for d in duplicates),
+        'duplicate_bytes': duplicate_bytes,
+        'saved_bytes': saved_bytes,
+        'dedupe_ratio': round(total_bytes / unique_bytes, 3) if unique_bytes else 1.0,
+        'top': duplicates[:top],
+    }
+
+
+def _print_report(report, min_size):
+    size = packbuild.format_size
+    print(f"Paquets analysés : {report['packs']} ({size(report['pack_bytes'])})")
+    print(f"Fichiers ≥ {size(min_size)} : {report['files']}, {size(report['bytes'])}")
+    share = report['duplicate_bytes'] / report['bytes'] if report['bytes'] else 0
+    print(f"En double entre paquets : {report['duplicate_files']} copies, "
+          f"{size(report['duplicate_bytes'])} ({share:.1%})")
+    print(f"Ratio de déduplication : {report['dedupe_ratio']:.2f}")
+    print(f"Gain disque estimé avec le magasin partagé : {size(report['saved_bytes'])}")
+    if report['top']:
+        print("Plus gros doublons :")
+        for d in report['top']:
+            print(f"  {size(d['size']):>10} × {d['copies']}  {d['path']}  ({', '.join(d['packs'])})")
+
+
+def main():
+    usage = (f"Usage: {sys.argv[0]} report <paquet|dossier>... [-min 64K] [-top 10] [-json]\n"
+             f"       {sys.argv[0]} materialize <dossier_extrait> <paquet.wgp>\n"
+             f"       {sys.argv[0]} gc <bibliothèque>")
+    args = sys.argv[1:]
+    if not args or args[0] not in ('report', 'materialize', 'gc'):
+        print(usage)
+        return 1
+    command = args.pop(0)
+    progress = lambda pct, msg: print(f"\r{msg}", end='', file=sys.stderr)  # noqa: E731
+
+    try:
+        if command == 'materialize':
+            if len(args) != 2:
+                print(usage, file=sys.stderr)
+                return 1
+            count = materialize(args[0], args[1])
+            if count:
+                print(f"{count} fichiers restaurés depuis le magasin partagé")
+            return 0
+
+        if command == 'gc':
+            if len(args) != 1:
+                print(usage, file=sys.stderr)
+                return 1
+            removed, old_size, new_size = collect_garbage(args[0], progress)
+            print(file=sys.stderr)
+            print(f"{removed} objets orphelins supprimés : "
+                  f"{packbuild.format_size(old_size)} → {packbuild.format_size(new_size)}")
+            return 0
+
+        min_size, top, as_json, targets = MIN_SIZE, 10, False, []
+        while args:
+            arg = args.pop(0)
+            if arg in ('-min', '-top'):
+                if not args:
+                    print(f"Option {arg} sans valeur\n{usage}", file=sys.stderr)
+                    return 1
+                value = args.pop(0)
+                if arg == '-min':
+                    min_size = packrecompress.parse_size(value)
+                else:
+                    top = int(value)
+            elif arg == '-json':
+                as_json = True
+            else:
+                targets.append(arg)
+        packs = []
+        for target in targets:
+            packs.extend(packmanifest.iter_packs(target) if os.path.isdir(target) else [target])
+        if not packs:
+            print(usage, file=sys.stderr)
+            return 1
+        report = library_report(packs, min_size, top)
+    except (OSError, ValueError, RuntimeError, squashfsreader.SquashfsError) as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 1
+
+    if as_json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        _print_report(report, min_size)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,473 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Image - Formats d'image des paquets WGP : squashfs ou EROFS (sans Qt)
+
+squashfs (mksquashfs, monté par squashfuse) reste le format par défaut. EROFS
+(mkfs.erofs, monté par erofsfuse) est proposé en alternative : clusters
+compressés de taille fixe en sortie (lz4hc ou lzma), fragments, déduplication
+et fin de fichier intégrée à l'inode (-Efragments,dedupe,ztailpacking).
+mkfs.erofs ne connaît pas les pseudo-fichiers de packstaging : le jeu et sa
+disposition (saves/extras/temps, liens du magasin partagé) lui sont envoyés en
+flux tar (--tar=f). Le format est enregistré dans le manifeste ('format').
+
+Le banc d'essai construit les deux variantes d'un même jeu, les monte
+localement et mesure la latence des lectures aléatoires (à froid : montage
+neuf et image hors du cache de pages ; à chaud : seconde passe) et le débit
+séquentiel, pour décider s'il vaut la peine de convertir.
+
+Usage: packimage.py <paquet.wgp>                   (format de l'image)
+       packimage.py bench <dossier_du_jeu> [-reads 500] [-comp lz4|xz|zstd] [-level 15]
+"""
+
+import sys
+import os
+import fnmatch
+import random
+import shutil
+import statistics
+import struct
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+
+import packbuild
+import packstaging
+import packtune
+
+
+FORMATS = ('squashfs', 'erofs')
+
+EROFS_MAGIC = 0xE0F5E1E2
+EROFS_SUPER_OFFSET = 1024
+SQUASHFS_MAGIC = b'hsqs'
+
+# Compression EROFS selon le profil packtune : zstd (défaut des paquets) -> lz4hc,
+# le format étant choisi pour la vitesse de lecture
+EROFS_COMPRESSION = {'lz4': 'lz4hc,12', 'xz': 'lzma,6', 'zstd': 'lz4hc,12'}
+EROFS_FEATURES = 'fragments,dedupe,ztailpacking'
+
+TAR_BUFSIZE = 1024 * 1024
+PROGRESS_INTERVAL = 0.5  # secondes entre deux rappels de progression
+
+BENCH_READS = 500            # Lectures aléatoires par passe
+BENCH_READ_SIZE = 4096       # Taille d'une lecture aléatoire
+BENCH_SEQ_BYTES = 512 * 1024 * 1024  # Plafond de la lecture séquentielle
+MOUNT_TIMEOUT = 10.0
+
+
+def detect_format(path):
+    """Format d'une image ('squashfs', 'erofs') d'après son superbloc, None si inconnu"""
+    with open(path, 'rb') as f:
+        head = f.read(EROFS_SUPER_OFFSET + 4)
+    if head[:4] == SQUASHFS_MAGIC:
+        return 'squashfs'
+    if len(head) == EROFS_SUPER_OFFSET + 4 and \
+            struct.unpack_from('<I', head, EROFS_SUPER_OFFSET)[0] == EROFS_MAGIC:
+        return 'erofs'
+    return None
+
+
+def erofs_args(profile, processors=None):
+    """Options mkfs.erofs d'un profil de compression packtune"""
+    args = [f"-z{EROFS_COMPRESSION.get(profile['comp'], 'lz4hc,12')}",
+            '-C', str(profile['block_size']), f"-E{EROFS_FEATURES}"]
+    if processors:
+        args.append(f"--workers={processors}")
+    return args
+
+
+class SquashfsBackend:
+    """Image squashfs : mksquashfs / squashfuse"""
+
+    name = 'squashfs'
+    build_tool = 'mksquashfs'
+    mount_tool = 'squashfuse'
+
+    def build_cmd(self, source, output, profile, processors=None):
+        cmd = ['mksquashfs', source, output, '-noappend', '-no-progress', '-quiet']
+        cmd += packtune.profile_args(profile)
+        if processors:
+            cmd += ['-processors', str(processors)]
+        return cmd
+
+    def mount_cmd(self, image, mountpoint):
+        return ['squashfuse', image, mountpoint]
+
+
+class ErofsBackend:
+    """Image EROFS : mkfs.erofs / erofsfuse"""
+
+    name = 'erofs'
+    build_tool = 'mkfs.erofs'
+    mount_tool = 'erofsfuse'
+
+    def build_cmd(self, source, output, profile, processors=None):
+        return ['mkfs.erofs', '--quiet'] + erofs_args(profile, processors) + [output, source]
+
+    def mount_cmd(self, image, mountpoint):
+        return ['erofsfuse', image, mountpoint]
+
+
+BACKENDS = {backend.name: backend for backend in (SquashfsBackend(), ErofsBackend())}
+
+
+def get_backend(name):
+    """Backend d'un format d'image (ValueError si inconnu)"""
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Format d'image invalide: {name}") from None
+
+
+class ErofsBuild:
+    """Construit une image EROFS à partir du dossier du jeu et de son staging
+
+    Args:
+        game_dir: dossier du jeu
+        output: image à écrire
+        staging: PseudoStaging (disposition saves/extras/temps)
+        profile: profil de compression (dict packtune)
+        skip: chemins relatifs du jeu non repris tels quels (remplacés par le staging)
+        root_excludes: motifs exclus à la racine (*.tmp, *.log)
+        processors: threads de compression mkfs.erofs (None = défaut)
+        callback: fonction (percent, message) pour la progression
+    """
+
+    def __init__(self, game_dir, output, staging, profile, skip=(), root_excludes=(),
+                 processors=None, callback=None):
+        self.game_dir = os.path.abspath(game_dir)
+        self.output = output
+        self.staging = staging
+        self.profile = profile
+        self.skip = set(skip) | {packstaging.exclude_path(p) for p in staging.excludes}
+        self.root_excludes = root_excludes
+        self.processors = processors
+        self.callback = callback
+        self.cancelled = False
+        self.streamed_bytes = 0
+        self._proc = None
+        self._stream_error = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self.cancelled = True
+        self._terminate()
+
+    def _terminate(self):
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                self._proc.terminate()
+
+    def entries(self):
+        """(chemin relatif, chemin source) du jeu repris tel quel, parents d'abord"""
+        stack = ['']
+        while stack:
+            rel_dir = stack.pop()
+            with os.scandir(os.path.join(self.game_dir, rel_dir)) as it:
+                names = sorted(it, key=lambda e: e.name)
+            subdirs = []
+            for de in names:
+                if not rel_dir and any(fnmatch.fnmatch(de.name, p) for p in self.root_excludes):
+                    continue
+                rel_path = f"{rel_dir}/{de.name}" if rel_dir else de.name
+                if rel_path in self.skip:
+                    continue
+                yield rel_path, de.path
+                if de.is_dir(follow_symlinks=False):
+                    subdirs.append(rel_path)
+            stack.extend(reversed(subdirs))
+
+    def run(self):
+        """Lance mkfs.erofs, retourne un subprocess.CompletedProcess"""
+        plan = list(self.entries())
+        total_size = sum(os.lstat(source).st_size for _rel, source in plan
+                         if os.path.isfile(source) and not os.path.islink(source))
+        total_size += self.staging.total_bytes
+        cmd = ['mkfs.erofs', '--quiet', '--tar=f'] + erofs_args(self.profile, self.processors)
+        cmd.append(self.output)
+        with self._lock:
+            if self.cancelled:
+                return subprocess.CompletedProcess(cmd, -1, '', "Annulé")
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                          stderr=subprocess.PIPE)
+        # stderr lu à part : un mkfs.erofs bavard ne doit pas bloquer le flux
+        errors = []
+        reader = threading.Thread(target=lambda: errors.append(self._proc.stderr.read()), daemon=True)
+        reader.start()
+        self._stream(plan, total_size)
+        returncode = self._proc.wait()
+        reader.join()
+        stderr = b''.join(errors).decode('utf-8', 'replace')
+        if self._stream_error is not None:
+            returncode, stderr = 1, str(self._stream_error)
+        return subprocess.CompletedProcess(cmd, -1 if self.cancelled else returncode, '', stderr)
+
+    def _emit(self, total_size):
+        if self.callback:
+            percent = min(99, self.streamed_bytes * 100 // max(1, total_size))
+            self.callback(percent, f"{percent}% — {packbuild.format_size(self.streamed_bytes)} / "
+                                   f"{packbuild.format_size(total_size)}")
+
+    def _stream(self, plan, total_size):
+        """Écrit le jeu puis les pseudo-définitions du staging en tar vers mkfs.erofs"""
+        last = 0.0
+        try:
+            with tarfile.open(fileobj=self._proc.stdin, mode='w|', format=tarfile.PAX_FORMAT,
+                              bufsize=TAR_BUFSIZE) as tar:
+                for rel_path, source in plan:
+                    if self.cancelled:
+                        return
+                    info = tar.gettarinfo(source, rel_path)
+                    if info is None:
+                        continue  # Socket : pas de représentation tar
+                    if info.isreg():
+                        with open(source, 'rb') as data:
+                            tar.addfile(info, data)
+                        self.streamed_bytes += info.size
+                    else:
+                        tar.addfile(info)
+                    if time.monotonic() - last >= PROGRESS_INTERVAL:
+                        last = time.monotonic()
+                        self._emit(total_size)
+
+                for line in self.staging.lines:
+                    if self.cancelled:
+                        return
+                    path, kind, mode, uid, gid, arg = packstaging.parse_pseudo_line(line)
+                    info = tarfile.TarInfo(path)
+                    info.mode, info.uid, info.gid = mode, uid, gid
+                    info.mtime = int(time.time())
+                    if kind == 'd':
+                        info.type = tarfile.DIRTYPE
+                        tar.addfile(info)
+                    elif kind == 's':
+                        info.type = tarfile.SYMTYPE
+                        info.linkname = arg
+                        tar.addfile(info)
+                    else:
+                        with open(arg, 'rb') as data:
+                            info.size = os.fstat(data.fileno()).st_size
+                            info.mtime = int(os.fstat(data.fileno()).st_mtime)
+                            tar.addfile(info, data)
+                        self.streamed_bytes += info.size
+        except BrokenPipeError:
+            pass  # mkfs.erofs arrêté (annulation ou erreur, remontée par le code retour)
+        except (OSError, ValueError) as e:
+            self._stream_error = e
+            self._terminate()
+        finally:
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+
+
+class Mount:
+    """Montage FUSE temporaire d'une image (contexte)"""
+
+    def __init__(self, backend, image, mountpoint):
+        self.backend = backend
+        self.image = image
+        self.mountpoint = mountpoint
+
+    def __enter__(self):
+        os.makedirs(self.mountpoint, exist_ok=True)
+        subprocess.run(self.backend.mount_cmd(self.image, self.mountpoint),
+                       check=True, capture_output=True)
+        deadline = time.monotonic() + MOUNT_TIMEOUT
+        while not os.path.ismount(self.mountpoint):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{self.backend.mount_tool} : montage de {self.image} expiré")
+            time.sleep(0.05)
+        return self.mountpoint
+
+    def __exit__(self, *exc):
+        subprocess.run(['fusermount', '-u', self.mountpoint], capture_output=True)
+        return False
+
+
+def drop_page_cache(path):
+    """Retire une image du cache de pages (lecture à froid)
+
+    DONTNEED ne libère pas les pages sales : l'image tout juste écrite par
+    mkfs.erofs/mksquashfs est d'abord synchronisée sur disque.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def read_plan(game_dir, count, seed=0):
+    """Lectures aléatoires (chemin relatif, offset), pondérées par la taille des fichiers"""
+    files = []
+    for root, _dirs, names in os.walk(game_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.isfile(path) and not os.path.islink(path):
+                size = os.path.getsize(path)
+                if size > 0:
+                    files.append((os.path.relpath(path, game_dir), size))
+    if not files:
+        return []
+    rng = random.Random(seed)
+    picks = rng.choices(files, weights=[size for _rel, size in files], k=count)
+    return [(rel, rng.randrange(0, max(1, size - BENCH_READ_SIZE))) for rel, size in picks]
+
+
+def random_reads(root, plan):
+    """Latences (secondes) des lectures du plan : ouverture + pread, comme un jeu qui charge"""
+    latencies = []
+    for rel_path, offset in plan:
+        start = time.perf_counter()
+        fd = os.open(os.path.join(root, rel_path), os.O_RDONLY)
+        try:
+            os.pread(fd, BENCH_READ_SIZE, offset)
+        finally:
+            os.close(fd)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def sequential_read(root, limit=BENCH_SEQ_BYTES):
+    """Débit (octets/s) d'une lecture complète des fichiers dans l'ordre du parcours"""
+    total = 0
+    start = time.perf_counter()
+    for dirpath, dirs, names in os.walk(root):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(dirpath, name)
+            if os.path.islink(path) or not os.path.isfile(path):
+                continue
+            with open(path, 'rb', buffering=0) as f:
+                while chunk := f.read(TAR_BUFSIZE):
+                    total += len(chunk)
+                    if total >= limit:
+                        return total / max(time.perf_counter() - start, 1e-6)
+    return total / max(time.perf_counter() - start, 1e-6)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def benchmark(game_dir, profile=None, reads=BENCH_READS, formats=FORMATS, callback=None):
+    """Construit, monte et mesure chaque format sur le même jeu
+
+    Retourne une liste de dicts (un par format) : taille, durée de construction,
+    latences aléatoires à froid/à chaud (médiane, p95) et débit séquentiel à froid.
+    """
+    profile = profile or packtune.config_profile({'compression': 15})
+    plan = read_plan(game_dir, reads)
+    work_dir = tempfile.mkdtemp(prefix='packimage-bench-')
+    results = []
+    try:
+        for name in formats:
+            backend = get_backend(name)
+            if shutil.which(backend.build_tool) is None or shutil.which(backend.mount_tool) is None:
+                results.append({'format': name, 'error': f"{backend.build_tool}/{backend.mount_tool} "
+                                                         f"introuvable"})
+                continue
+            image = os.path.join(work_dir, f"bench.{name}")
+            mountpoint = os.path.join(work_dir, f"mnt-{name}")
+            if callback:
+                callback(f"{name} : construction de l'image...")
+            start = time.monotonic()
+            built = subprocess.run(backend.build_cmd(game_dir, image, profile),
+                                   capture_output=True, text=True)
+            build_time = time.monotonic() - start
+            if built.returncode != 0:
+                results.append({'format': name, 'error': built.stderr.strip() or "échec"})
+                continue
+
+            if callback:
+                callback(f"{name} : lectures aléatoires...")
+            drop_page_cache(image)
+            with Mount(backend, image, mountpoint) as root:
+                cold = random_reads(root, plan)
+                warm = random_reads(root, plan)
+            if callback:
+                callback(f"{name} : lecture séquentielle...")
+            drop_page_cache(image)
+            with Mount(backend, image, mountpoint) as root:
+                throughput = sequential_read(root)
+
+            results.append({
+                'format': name,
+                'image_size': os.path.getsize(image),
+                'build_time': round(build_time, 2),
+                'cold_p50_ms': round(statistics.median(cold) * 1000, 3),
+                'cold_p95_ms': round(_percentile(cold, 0.95) * 1000, 3),
+                'warm_p50_ms': round(statistics.median(warm) * 1000, 3),
+                'warm_p95_ms': round(_percentile(warm, 0.95) * 1000, 3),
+                'sequential_rate': int(throughput),
+            })
+            os.remove(image)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    usage = (f"Usage: {sys.argv[0]} <paquet.wgp>\n"
+             f"       {sys.argv[0]} bench <dossier_du_jeu> [-reads 500] [-comp lz4|xz|zstd] [-level 15]")
+    args = sys.argv[1:]
+    if not args or args[0] in ('-h', '--help'):
+        print(usage)
+        return 1
+
+    if args[0] != 'bench':
+        image_format = detect_format(args[0])
+        if image_format is None:
+            print("Erreur: format d'image inconnu", file=sys.stderr)
+            return 1
+        print(image_format)
+        return 0
+
+    options = {'-reads': str(BENCH_READS), '-comp': 'zstd', '-level': '15'}
+    targets = []
+    args = args[1:]
+    while args:
+        arg = args.pop(0)
+        if arg in options:
+            if not args:
+                print(f"Option {arg} sans valeur\n{usage}", file=sys.stderr)
+                return 1
+            options[arg] = args.pop(0)
+        else:
+            targets.append(arg)
+    if len(targets) != 1 or not os.path.isdir(targets[0]):
+        print(usage, file=sys.stderr)
+        return 1
+
+    try:
+        profile = {'comp': options['-comp'], 'block_size': 128 * 1024,
+                   'level': int(options['-level']) if options['-comp'] == 'zstd' else None}
+        results = benchmark(targets[0], profile, int(options['-reads']),
+                            callback=lambda msg: print(msg, file=sys.stderr))
+    except (OSError, ValueError, RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 1
+
+    print(f"{'format':<10}{'image':>11}{'création':>11}{'froid p50':>11}{'froid p95':>11}"
+          f"{'chaud p50':>11}{'chaud p95':>11}{'séquentiel':>13}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['format']:<10}indisponible : {r['error']}")
+            continue
+        print(f"{r['format']:<10}{packbuild.format_size(r['image_size']):>11}"
+              f"{packbuild.format_duration(r['build_time']):>11}"
+              f"{r['cold_p50_ms']:>8.2f} ms{r['cold_p95_ms']:>8.2f} ms"
+              f"{r['warm_p50_ms']:>8.2f} ms{r['warm_p95_ms']:>8.2f} ms"
+              f"{packbuild.format_size(r['sequential_rate']):>11}/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
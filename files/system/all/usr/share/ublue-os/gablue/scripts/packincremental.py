@@ -0,0 +1,731 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Incremental - Reconstruction incrémentale d'un paquet WGP/LGP existant (sans Qt)
+
+À chaque création, un index d'empreintes des fichiers du jeu (taille, mtime,
+mode, empreinte rapide des 64 premiers Ko) est écrit dans le paquet
+(.packindex). Quand on reconstruit par-dessus un paquet existant au même profil
+de compression :
+- l'index courant est comparé à celui de l'ancien paquet, les plus grands
+  sous-arbres inchangés sont exclus du scan de mksquashfs (-ef)
+- mksquashfs ne compresse que ce qui a changé, dans une image delta
+- la nouvelle image est assemblée en recopiant tels quels (copy_file_range,
+  sans décompression) les blocs déjà compressés de l'ancien paquet et de
+  l'image delta ; seules les tables (inodes, répertoires, fragments, ids)
+  sont réécrites
+
+Pour un jeu de 40 Go avec un patch de 200 Mo, seuls les 200 Mo passent par le
+compresseur, le reste est une copie séquentielle côté noyau.
+
+Usage: packincremental.py <paquet.wgp|lgp> <dossier_du_jeu>
+       (affiche ce qui serait réutilisé, sans rien construire)
+"""
+
+import sys
+import os
+import fnmatch
+import hashlib
+import json
+import posixpath
+import shutil
+import stat
+import struct
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import packbuild
+import packrecompress
+import packstaging
+import packvolumes
+import squashfsreader
+from squashfsreader import (DATA_UNCOMPRESSED, METADATA_SIZE, METADATA_UNCOMPRESSED,
+                            NO_FRAGMENT, SQUASHFS_MAGIC)
+
+
+INDEX_FILE = '.packindex'
+INDEX_VERSION = 1
+
+HASH_BYTES = 64 * 1024  # Empreinte rapide : début du fichier seulement
+HASH_WORKERS = 8
+COPY_CHUNK = 64 * 1024 * 1024
+PAD_SIZE = 4096  # mksquashfs complète l'image à un multiple de 4 Ko
+
+# Drapeaux du superbloc
+FLAG_DUPLICATES = 0x0040
+FLAG_NO_XATTR = 0x0200
+
+_SUPERBLOCK = struct.Struct('<IIIIIHHHHHHQQQQQQQQ')
+_INODE_HEADER = struct.Struct('<HHHHII')
+_DIR_HEADER = struct.Struct('<III')
+_DIR_ENTRY = struct.Struct('<HhHH')
+_NO_TABLE = 0xFFFFFFFFFFFFFFFF
+_NO_XATTR = 0xFFFFFFFF
+_DIR_MAX_ENTRIES = 256
+
+OLD, DELTA = 0, 1  # Origine des données d'un inode
+
+
+class IncrementalError(Exception):
+    """Assemblage impossible : le paquet doit être reconstruit entièrement"""
+
+
+# --- Index d'empreintes ---
+
+def fast_hash(path):
+    """Empreinte blake2b des HASH_BYTES premiers octets (None si illisible)"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.blake2b(f.read(HASH_BYTES), digest_size=16).hexdigest()
+    except OSError:
+        return None
+
+
+def staged_paths(config):
+    """Chemins saves/extras/temps d'une configuration (remplacés par des symlinks dans le paquet)"""
+    paths = []
+    for key, _backup_dir, _list_file, _kind in packstaging.CATEGORIES:
+        items = config.get(key) or []
+        if key == 'temps' and packstaging.is_full_overlay(items):
+            continue
+        paths.extend(rel_path.strip('/') for _item_type, rel_path in items)
+    return paths
+
+
+def scan(game_dir, blocked=(), root_excludes=()):
+    """Index d'empreintes du dossier du jeu : {chemin relatif: empreinte}
+
+    Empreintes : ['d', mode], ['l', cible], ['f', taille, mtime_ns, mode, hash],
+    ['x'] pour un chemin disposé (saves/extras/temps), jamais réutilisé. Les
+    fichiers de configuration à la racine (.gamename, .manifest.json, .save...)
+    et les exclusions racine (*.tmp, *.log) ne sont pas indexés.
+    """
+    blocked = set(blocked)
+    index = {}
+    files = []
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(game_dir, rel_dir)) as it:
+                entries = list(it)
+        except OSError:
+            index[rel_dir] = ['x']
+            continue
+        for de in entries:
+            if not rel_dir and (de.name.startswith('.') or
+                                any(fnmatch.fnmatch(de.name, p) for p in root_excludes)):
+                continue
+            rel_path = f"{rel_dir}/{de.name}" if rel_dir else de.name
+            if rel_path in blocked:
+                index[rel_path] = ['x']
+                continue
+            try:
+                st = de.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if stat.S_ISLNK(st.st_mode):
+                index[rel_path] = ['l', os.readlink(de.path)]
+            elif stat.S_ISDIR(st.st_mode):
+                index[rel_path] = ['d', stat.S_IMODE(st.st_mode)]
+                stack.append(rel_path)
+            elif stat.S_ISREG(st.st_mode):
+                index[rel_path] = ['f', st.st_size, st.st_mtime_ns, stat.S_IMODE(st.st_mode), None]
+                files.append(rel_path)
+            else:
+                index[rel_path] = ['x']
+
+    # Lectures en parallèle : limitées par les accès disque, pas par le GIL
+    with ThreadPoolExecutor(HASH_WORKERS) as pool:
+        digests = pool.map(fast_hash, (os.path.join(game_dir, p) for p in files))
+        for rel_path, digest in zip(files, digests):
+            index[rel_path][4] = digest
+    return index
+
+
+def write_index(game_dir, index):
+    """Écrit .packindex dans le dossier du jeu (inclus dans le paquet)"""
+    with open(os.path.join(game_dir, INDEX_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'version': INDEX_VERSION, 'entries': index}, f,
+                  ensure_ascii=False, separators=(',', ':'))
+
+
+def read_index(image):
+    """Index d'empreintes d'un paquet ouvert (None si absent ou d'une autre version)"""
+    try:
+        data = json.loads(image.read(INDEX_FILE).decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != INDEX_VERSION:
+        return None
+    return data.get('entries')
+
+
+def _children(index):
+    children = {}
+    for rel_path in index:
+        children.setdefault(posixpath.dirname(rel_path), set()).add(rel_path)
+    return children
+
+
+def reusable(index, old_index):
+    """Plus grands sous-arbres inchangés depuis l'ancien index (chemins triés)
+
+    Un fichier ou un symlink est inchangé si son empreinte est identique ; un
+    dossier si son mode, la liste de ses entrées et tout son contenu le sont.
+    """
+    children = _children(index)
+    old_children = _children(old_index)
+    clean = {}
+    # Du plus profond au moins profond : le contenu est évalué avant son dossier
+    for rel_path in sorted(index, key=lambda p: p.count('/'), reverse=True):
+        entry = index[rel_path]
+        if entry[0] == 'x' or (entry[0] == 'f' and entry[4] is None) or old_index.get(rel_path) != entry:
+            clean[rel_path] = False
+        elif entry[0] == 'd':
+            subs = children.get(rel_path, set())
+            clean[rel_path] = subs == old_children.get(rel_path, set()) and all(clean[c] for c in subs)
+        else:
+            clean[rel_path] = True
+    return sorted(p for p, ok in clean.items() if ok and not clean.get(posixpath.dirname(p), False))
+
+
+def subtree_size(index, units):
+    """Taille cumulée des fichiers sous une liste de chemins"""
+    prefixes = tuple(u + '/' for u in units)
+    units = set(units)
+    return sum(e[1] for p, e in index.items()
+               if e[0] == 'f' and (p in units or p.startswith(prefixes)))
+
+
+# --- Assemblage de l'image ---
+
+def _make_compressor(compression):
+    """Compresseur des blocs de métadonnées (None : blocs stockés non compressés)"""
+    if compression == squashfsreader.COMP_GZIP:
+        return lambda data: zlib.compress(data, 9)
+    if compression == squashfsreader.COMP_LZ4:
+        try:
+            import lz4.block
+            return lambda data: lz4.block.compress(data, store_size=False)
+        except ImportError:
+            return None
+    if compression == squashfsreader.COMP_ZSTD:
+        try:
+            import zstandard
+            return zstandard.ZstdCompressor(level=15).compress
+        except ImportError:
+            pass
+        try:
+            from compression import zstd
+            return lambda data: zstd.compress(data, level=15)
+        except ImportError:
+            pass
+    # xz/lzma/lzo : le dictionnaire doit respecter les options de l'image, blocs bruts
+    return None
+
+
+class _MetadataWriter:
+    """Flux de métadonnées découpé en blocs de 8 Ko (compressés si c'est utile)"""
+
+    def __init__(self, compress):
+        self.compress = compress
+        self.out = bytearray()
+        self.buffer = bytearray()
+        self.starts = []  # Position de chaque bloc dans out
+
+    def position(self):
+        """(début du bloc courant dans la table, décalage dans le bloc)"""
+        return len(self.out), len(self.buffer)
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= METADATA_SIZE:
+            self._flush(bytes(self.buffer[:METADATA_SIZE]))
+            del self.buffer[:METADATA_SIZE]
+
+    def _flush(self, chunk):
+        self.starts.append(len(self.out))
+        packed = self.compress(chunk) if self.compress else None
+        if packed is not None and len(packed) < len(chunk):
+            self.out += struct.pack('<H', len(packed)) + packed
+        else:
+            self.out += struct.pack('<H', len(chunk) | METADATA_UNCOMPRESSED) + chunk
+
+    def finish(self):
+        if self.buffer:
+            self._flush(bytes(self.buffer))
+            self.buffer.clear()
+        return bytes(self.out)
+
+
+class _Node:
+    """Entrée de la nouvelle image : inode d'origine et image qui le contient"""
+    __slots__ = ('name', 'inode', 'source', 'children', 'number', 'ref', 'start')
+
+    def __init__(self, name, inode, source):
+        self.name = name.encode('utf-8', errors='surrogateescape')
+        self.inode = inode
+        self.source = source
+        self.children = {} if inode.is_dir() else None
+        self.number = 0
+        self.ref = 0     # Référence de l'inode dans la nouvelle image
+        self.start = 0   # Position des blocs de données dans la nouvelle image
+
+
+class ImageMerger:
+    """Écrit une image squashfs à partir de l'image delta et de sous-arbres de l'ancienne
+
+    Les blocs de données et de fragments sont recopiés sans décompression ;
+    les attributs étendus ne sont pas conservés (inutiles pour un jeu monté).
+
+    Args:
+        old: SquashfsImage de l'ancien paquet
+        delta: SquashfsImage de l'image delta (même compression et taille de bloc)
+        index: index d'empreintes courant (vérification des sous-arbres repris)
+        units: chemins à reprendre de l'ancien paquet
+        callback: fonction (octets copiés, total) pour la progression
+        cancelled: fonction retournant True pour interrompre
+    """
+
+    def __init__(self, old, delta, index, units, callback=None, cancelled=None):
+        if (old.compression, old.block_size) != (delta.compression, delta.block_size):
+            raise IncrementalError("Compression ou taille de bloc différente")
+        self.images = (old, delta)
+        self.index = index
+        self.units = units
+        self.callback = callback
+        self.cancelled = cancelled or (lambda: False)
+        self.block_size = delta.block_size
+        self.compress = _make_compressor(delta.compression)
+        self.copied = 0
+        self.total = 0
+        self.reused_bytes = 0
+
+    # --- Arbre ---
+
+    def _build_tree(self):
+        old, delta = self.images
+        root = _Node('', delta.inode(delta.root_inode), DELTA)
+        nodes = {'': root}
+        for rel_path, inode in delta.walk():
+            self._attach(nodes, rel_path, inode, DELTA)
+        for unit in self.units:
+            try:
+                self._attach(nodes, unit, old.stat(unit, follow_symlinks=False), OLD)
+                if nodes[unit].children is not None:
+                    for rel_path, inode in old.walk(unit):
+                        self._attach(nodes, rel_path, inode, OLD)
+            except OSError as e:
+                raise IncrementalError(f"{unit}: {e}") from None
+        return root
+
+    def _attach(self, nodes, rel_path, inode, source):
+        parent = nodes.get(posixpath.dirname(rel_path))
+        name = posixpath.basename(rel_path)
+        if parent is None or parent.children is None:
+            raise IncrementalError(f"Dossier parent absent: {rel_path}")
+        if name in parent.children:
+            raise IncrementalError(f"Présent dans les deux images: {rel_path}")
+        if source == OLD:
+            self._check(rel_path, inode)
+        node = _Node(name, inode, source)
+        parent.children[name] = node
+        nodes[rel_path] = node
+
+    def _check(self, rel_path, inode):
+        """L'inode repris de l'ancien paquet doit correspondre à l'index courant"""
+        entry = self.index.get(rel_path)
+        if entry is None:
+            ok = False
+        elif entry[0] == 'd':
+            ok = inode.is_dir()
+        elif entry[0] == 'l':
+            ok = inode.is_symlink() and inode.target == entry[1]
+        elif entry[0] == 'f':
+            ok = inode.is_file() and inode.size == entry[1]
+        else:
+            ok = False
+        if not ok:
+            raise IncrementalError(f"Ancien paquet incohérent avec son index: {rel_path}")
+
+    @staticmethod
+    def _postorder(root):
+        """Nœuds enfants avant parents, frères triés par nom (ordre mksquashfs)"""
+        order = []
+        stack = [(root, False)]
+        while stack:
+            node, done = stack.pop()
+            if done or node.children is None:
+                order.append(node)
+                continue
+            stack.append((node, True))
+            for child in sorted(node.children.values(), key=lambda n: n.name, reverse=True):
+                stack.append((child, False))
+        return order
+
+    # --- Écriture ---
+
+    def write(self, output):
+        """Écrit la nouvelle image dans output, retourne sa taille utile (bytes_used)"""
+        root = self._build_tree()
+        order = self._postorder(root)
+        for number, node in enumerate(order, 1):
+            node.number = number
+
+        old, delta = self.images
+        files = [n for n in order if n.children is None and n.inode.is_file()]
+        self.total = sum(sum(s & ~DATA_UNCOMPRESSED for s in n.inode.block_sizes) for n in files)
+        self.reused_bytes = sum(n.inode.size for n in files if n.source == OLD)
+
+        fd = os.open(output, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        sources = [os.open(image.path, os.O_RDONLY) for image in self.images]
+        try:
+            self._fd, self._sources = fd, sources
+            self._pos = 0
+            self._out(bytes(_SUPERBLOCK.size))
+            self._out(delta.compression_options())
+
+            # Données : ancien paquet dans son ordre d'origine (fichiers chauds en
+            # tête conservés), puis l'image delta ; les doublons restent partagés
+            blocks = {}
+            for node in sorted(files, key=lambda n: (n.source, n.inode.blocks_start)):
+                key = (node.source, node.inode.blocks_start, node.inode.block_sizes)
+                if key not in blocks:
+                    length = sum(s & ~DATA_UNCOMPRESSED for s in node.inode.block_sizes)
+                    blocks[key] = self._pos
+                    self._copy(node.source, node.inode.blocks_start, length)
+                node.start = blocks[key]
+
+            fragments = {}
+            fragment_table = []
+            for node in files:
+                if node.inode.fragment == NO_FRAGMENT:
+                    continue
+                key = (node.source, node.inode.fragment)
+                if key not in fragments:
+                    start, size_field = self.images[node.source].fragment_block(node.inode.fragment)
+                    fragments[key] = len(fragment_table)
+                    fragment_table.append((self._pos, size_field))
+                    self._copy(node.source, start, size_field & ~DATA_UNCOMPRESSED)
+            self._fragment_ids = fragments
+
+            inodes = _MetadataWriter(self.compress)
+            dirs = _MetadataWriter(self.compress)
+            self._ids = {}
+            parents = {}
+            for node in order:
+                if node.children is not None:
+                    for child in node.children.values():
+                        parents[id(child)] = node.number
+            for node in order:
+                self._write_inode(node, inodes, dirs, parents.get(id(node), len(order) + 1))
+
+            inode_table = self._pos
+            self._out(inodes.finish())
+            directory_table = self._pos
+            self._out(dirs.finish())
+            fragment_table_start = self._lookup_table(
+                b''.join(struct.pack('<QII', start, size, 0) for start, size in fragment_table))
+            ids = sorted(self._ids, key=self._ids.get)
+            id_table = self._lookup_table(struct.pack(f'<{len(ids)}I', *ids))
+            bytes_used = self._pos
+
+            flags = FLAG_DUPLICATES | FLAG_NO_XATTR | (delta.flags & squashfsreader.FLAG_COMP_OPT)
+            superblock = _SUPERBLOCK.pack(
+                SQUASHFS_MAGIC, len(order), int(time.time()), self.block_size, len(fragment_table),
+                delta.compression, delta.block_log, flags, len(ids), 4, 0, root.ref, bytes_used,
+                id_table, _NO_TABLE, inode_table, directory_table, fragment_table_start, _NO_TABLE)
+            os.pwrite(fd, superblock, 0)
+            self._out(bytes(-bytes_used % PAD_SIZE))
+            os.fsync(fd)
+            return bytes_used
+        finally:
+            os.close(fd)
+            for source in sources:
+                os.close(source)
+
+    def _out(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+        self._pos += len(data)
+
+    def _copy(self, source, offset, length):
+        """Recopie une plage brute d'une image (côté noyau si possible)"""
+        src = self._sources[source]
+        end = offset + length
+        while offset < end:
+            if self.cancelled():
+                raise IncrementalError("Annulé par l'utilisateur")
+            count = min(COPY_CHUNK, end - offset)
+            try:
+                n = os.copy_file_range(src, self._fd, count, offset)
+            except (AttributeError, OSError):
+                n = 0
+            if n <= 0:
+                data = os.pread(src, count, offset)
+                if not data:
+                    raise IncrementalError("Image source tronquée")
+                self._out(data)
+                n = len(data)
+            else:
+                self._pos += n
+            offset += n
+            self.copied += n
+            if self.callback:
+                self.callback(self.copied, self.total)
+
+    def _lookup_table(self, data):
+        """Table indexée (fragments, ids) : blocs de métadonnées puis pointeurs, retourne sa position"""
+        writer = _MetadataWriter(self.compress)
+        writer.write(data)
+        raw = writer.finish()
+        start = self._pos
+        self._out(raw)
+        table = self._pos
+        self._out(b''.join(struct.pack('<Q', start + s) for s in writer.starts))
+        return table
+
+    def _id(self, value):
+        return self._ids.setdefault(value, len(self._ids))
+
+    def _write_inode(self, node, inodes, dirs, parent_number):
+        inode = node.inode
+        base_type = inode.type if inode.type <= squashfsreader.T_SOCKET else inode.type - 7
+
+        if node.children is not None:
+            children = sorted(node.children.values(), key=lambda n: n.name)
+            dir_block, dir_offset = dirs.position()
+            listing = self._listing(children)
+            dirs.write(listing)
+            nlink = 2 + sum(1 for c in children if c.children is not None)
+            size = len(listing) + 3  # Entrées . et .. implicites
+            if size <= 0xFFFF and dir_block <= 0xFFFFFFFF:
+                itype = squashfsreader.T_DIR
+                body = struct.pack('<IIHHI', dir_block, nlink, size, dir_offset, parent_number)
+            else:
+                itype = squashfsreader.T_LDIR
+                body = struct.pack('<IIIIHHI', nlink, size, dir_block, parent_number, 0,
+                                   dir_offset, _NO_XATTR)
+        elif base_type == squashfsreader.T_FILE:
+            start = node.start
+            fragment = NO_FRAGMENT
+            if inode.fragment != NO_FRAGMENT:
+                fragment = self._fragment_ids[(node.source, inode.fragment)]
+            sizes = struct.pack(f'<{len(inode.block_sizes)}I', *inode.block_sizes)
+            if start <= 0xFFFFFFFF and inode.size <= 0xFFFFFFFF:
+                itype = squashfsreader.T_FILE
+                body = struct.pack('<IIII', start, fragment, inode.fragment_offset, inode.size)
+            else:
+                itype = squashfsreader.T_LFILE
+                body = struct.pack('<QQQIIII', start, inode.size, 0, 1, fragment,
+                                   inode.fragment_offset, _NO_XATTR)
+            body += sizes
+        elif base_type == squashfsreader.T_SYMLINK:
+            itype = base_type
+            target = inode.target.encode('utf-8', errors='surrogateescape')
+            body = struct.pack('<II', 1, len(target)) + target
+        elif base_type in (squashfsreader.T_BLKDEV, squashfsreader.T_CHRDEV):
+            itype = base_type
+            body = struct.pack('<II', 1, inode.rdev)
+        else:
+            itype = base_type
+            body = struct.pack('<I', 1)
+
+        block, offset = inodes.position()
+        node.ref = (block << 16) | offset
+        inodes.write(_INODE_HEADER.pack(itype, stat.S_IMODE(inode.mode), self._id(inode.uid),
+                                        self._id(inode.gid), inode.mtime, node.number) + body)
+
+    @staticmethod
+    def _listing(children):
+        """Entrées d'un dossier, groupées par bloc d'inodes (256 au plus par en-tête)"""
+        out = bytearray()
+        i = 0
+        while i < len(children):
+            block = children[i].ref >> 16
+            base = children[i].number
+            group = []
+            while (i < len(children) and len(group) < _DIR_MAX_ENTRIES and
+                   children[i].ref >> 16 == block and -32768 <= children[i].number - base <= 32767):
+                group.append(children[i])
+                i += 1
+            out += _DIR_HEADER.pack(len(group) - 1, block, base)
+            for child in group:
+                itype = child.inode.type
+                if itype > squashfsreader.T_SOCKET:
+                    itype -= 7  # Types étendus : type de base dans les entrées
+                out +=  _DIR_ENTRY.pack(child.ref & 0xFFFF, child.number - base, itype,
+                                       len(child.name) - 1) + child.name
+        return bytes(out)
+
+
+# --- Reconstruction ---
+
+class IncrementalBuild:
+    """Reconstruction d'un paquet en réutilisant les données de la version précédente
+
+    Args:
+        game_dir: dossier du jeu
+        pack_file: paquet à reconstruire (il peut ne pas exister encore)
+        profile: profil de compression de la nouvelle version (packtune)
+        output_file: fichier de construction (packbuild.partial_path), distinct du paquet
+        blocked: chemins jamais réutilisés (saves/extras/temps disposés)
+        root_excludes: motifs exclus à la racine par mksquashfs (*.tmp, *.log)
+    """
+
+    def __init__(self, game_dir, pack_file, profile, output_file, blocked=(), root_excludes=()):
+        self.game_dir = os.path.abspath(game_dir)
+        self.pack_file = pack_file
+        self.output_file = output_file
+        self.profile = profile
+        self.blocked = blocked
+        self.root_excludes = root_excludes
+        self.index = None
+        self.units = []
+        self.total_bytes = 0
+        self.reused_bytes = 0
+        self.changed_bytes = 0
+        self.exclude_file = None
+        self.delta_file = None
+        self.reason = None  # Raison d'une reconstruction complète
+        self.index_written = False
+        self.cancelled = False
+
+    def prepare(self, reuse=True):
+        """Écrit l'index du dossier (.packindex) et prépare la réutilisation de l'ancien paquet
+
+        Sans reuse, rien n'est lu ni écrit dans le dossier du jeu (voir full_cmd).
+
+        Returns:
+            True si la reconstruction peut être incrémentale (sinon voir reason)
+        """
+        if not reuse:
+            self.reason = "désactivée"
+            return False
+        self.index = scan(self.game_dir, self.blocked, self.root_excludes)
+        write_index(self.game_dir, self.index)
+        self.index_written = True
+        self.total_bytes = sum(e[1] for e in self.index.values() if e[0] == 'f')
+        self.changed_bytes = self.total_bytes
+        if not os.path.isfile(self.pack_file):
+            self.reason = "aucun paquet existant"
+            return False
+        if packvolumes.is_index(self.pack_file):
+            # La fusion recopie les blocs de l'ancienne image dans un seul fichier
+            self.reason = "ancien paquet découpé en volumes"
+            return False
+
+        try:
+            with squashfsreader.SquashfsImage(self.pack_file) as image:
+                if not packrecompress.same_profile(image, self.profile):
+                    self.reason = "profil de compression différent"
+                    return False
+                old_index = read_index(image)
+                old_size = image.bytes_used
+        except Exception as e:  # Ancien paquet corrompu : struct, zlib, lzma, zstd... -> reconstruction complète
+            self.reason = f"ancien paquet illisible ({e})"
+            return False
+        if old_index is None:
+            self.reason = "ancien paquet sans index d'empreintes"
+            return False
+
+        self.units = reusable(self.index, old_index)
+        self.reused_bytes = subtree_size(self.index, self.units)
+        self.changed_bytes = self.total_bytes - self.reused_bytes
+        if not self.reused_bytes:
+            self.reason = "aucun fichier inchangé"
+            return False
+
+        # Pic : ancien paquet + delta + nouvelle image dans le même dossier
+        directory = os.path.dirname(os.path.abspath(self.pack_file))
+        if shutil.disk_usage(directory).free < old_size + self.changed_bytes:
+            self.reason = "espace libre insuffisant"
+            return False
+
+        fd, self.exclude_file = tempfile.mkstemp(prefix='pack-unchanged-', suffix='.txt')
+        os.close(fd)
+        packstaging.write_exclude_file(self.exclude_file, self.units)
+        self.delta_file = os.path.join(directory, f".{os.path.basename(self.pack_file)}.delta-{os.getpid()}")
+        return True
+
+    def full_cmd(self, cmd):
+        """Commande mksquashfs de la reconstruction complète
+
+        Sans index écrit par cette construction, un .packindex resté d'une
+        construction précédente ne décrit plus le dossier : il est exclu.
+        """
+        if self.index_written:
+            return list(cmd)
+        return list(cmd) + ['-e', INDEX_FILE]
+
+    def delta_cmd(self, cmd):
+        """Commande mksquashfs de l'image delta (sortie temporaire, sous-arbres inchangés exclus)"""
+        cmd = list(cmd)
+        cmd[cmd.index(self.output_file)] = self.delta_file
+        return cmd + ['-ef', self.exclude_file]
+
+    def merge(self, callback=None):
+        """Assemble l'ancien paquet et l'image delta dans le fichier de construction
+
+        Lève IncrementalError si l'assemblage est impossible (le paquet d'origine
+        n'est jamais modifié).
+        """
+        try:
+            with squashfsreader.SquashfsImage(self.pack_file) as old, \
+                    squashfsreader.SquashfsImage(self.delta_file) as delta:
+                merger = ImageMerger(old, delta, self.index, self.units, callback,
+                                     lambda: self.cancelled)
+                merger.write(self.output_file)
+        except Exception as e:  # Ancien paquet corrompu : struct, zlib, lzma, zstd...
+            raise IncrementalError(str(e)) from e
+
+    def cancel(self):
+        self.cancelled = True
+
+    def cleanup(self):
+        for path in (self.exclude_file, self.delta_file):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def describe(self):
+        """Résumé de la reconstruction"""
+        if self.reason is not None:
+            return f"Reconstruction complète ({self.reason})"
+        return (f"Reconstruction incrémentale : {packbuild.format_size(self.reused_bytes)} réutilisés, "
+                f"{packbuild.format_size(self.changed_bytes)} compressés")
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(f"Usage: {sys.argv[0]} <paquet.wgp|lgp> <dossier_du_jeu>")
+        return 1
+
+    pack_file, game_dir = sys.argv[1], sys.argv[2]
+    try:
+        with squashfsreader.SquashfsImage(pack_file) as image:
+            old_index = read_index(image)
+    except (OSError, squashfsreader.SquashfsError) as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 1
+    if old_index is None:
+        print("Paquet sans index d'empreintes : reconstruction complète")
+        return 0
+
+    index = scan(game_dir, root_excludes=('*.tmp', '*.log'))
+    units = reusable(index, old_index)
+    total = sum(e[1] for e in index.values() if e[0] == 'f')
+    reused = subtree_size(index, units)
+    for rel_path in units:
+        print(rel_path)
+    print(f"{len(units)} sous-arbres inchangés : {packbuild.format_size(reused)} réutilisés, "
+          f"{packbuild.format_size(total - reused)} à compresser", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
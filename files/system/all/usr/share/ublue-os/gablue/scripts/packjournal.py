@@ -0,0 +1,222 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Journal - Journal de staging des saves/extras/temps, reprise après crash (sans Qt)
+
+En mode classique, makewgp/makelgp déplacent les saves/extras/temps dans
+.save/.extra/.temp et les remplacent par des symlinks vers /tmp/... le temps
+de créer le paquet. Si le processus est tué entre les deux, le dossier du jeu
+reste plein de symlinks cassés. Chaque opération (déplacement, suppression ou
+création de symlink) est donc écrite et synchronisée sur disque AVANT d'être
+faite. Au lancement suivant, le journal est rejoué à l'envers : uniquement des
+renommages, en O(nombre d'entrées), sans recopier les données.
+
+Le journal est stocké hors du dossier du jeu (il ne doit pas finir dans le
+paquet) : ~/.cache/gablue/staging/<empreinte du chemin>.journal
+
+Usage: packjournal.py recover <dossier_du_jeu>
+       packjournal.py list
+"""
+
+import sys
+import os
+import hashlib
+import json
+import shutil
+
+import packtransfer
+
+
+STAGING_DIRS = ('.save', '.extra', '.temp')
+STAGING_FILES = ('.symlinks_backup',)
+
+
+def journal_dir():
+    cache = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache, 'gablue', 'staging')
+
+
+def journal_path(game_dir):
+    """Chemin du journal d'un dossier de jeu"""
+    key = hashlib.sha1(os.path.realpath(game_dir).encode('utf-8', 'surrogateescape')).hexdigest()[:16]
+    return os.path.join(journal_dir(), f"{key}.journal")
+
+
+class StagingJournal:
+    """Journal des opérations de staging d'un dossier de jeu
+
+    Chaque entrée est une ligne JSON (chemins relatifs au dossier du jeu),
+    écrite et synchronisée avant l'opération qu'elle décrit :
+    - move : src déplacé vers dst
+    - unlink : symlink path (cible target) supprimé
+    - symlink : symlink path -> target créé
+
+    Args:
+        game_dir: dossier du jeu
+    """
+
+    def __init__(self, game_dir):
+        self.game_dir = os.path.realpath(game_dir)
+        self.path = journal_path(self.game_dir)
+        self._file = None
+
+    @property
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def begin(self):
+        """Démarre un nouveau journal (l'ancien doit avoir été rejoué)"""
+        if self.exists:
+            raise RuntimeError(f"Création interrompue non restaurée (journal {self.path})")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._write({'op': 'begin', 'game_dir': self.game_dir})
+        return self
+
+    def record(self, op, path, **fields):
+        """Enregistre une opération avant de l'exécuter"""
+        if self._file is None:
+            self.begin()
+        self._write(dict(op=op, path=path, **fields))
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Supprime le journal (dossier du jeu remis en état)"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def entries(self):
+        """Entrées du journal (une dernière ligne incomplète est ignorée)"""
+        entries = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break  # Crash pendant l'écriture de cette ligne
+        except OSError:
+            pass
+        return entries
+
+    def rollback(self):
+        """Rejoue le journal à l'envers puis supprime .save/.extra/.temp
+
+        Returns:
+            (succès, nombre d'entrées annulées). En cas de conflit (original et
+            copie présents tous les deux), rien n'est supprimé et le journal est
+            conservé pour ne perdre aucune donnée.
+        """
+        self.close()
+        entries = [e for e in self.entries() if e.get('op') != 'begin']
+        conflicts = []
+        for entry in reversed(entries):
+            path = os.path.join(self.game_dir, entry['path'])
+            op = entry['op']
+            if op == 'symlink':
+                # Retirer le symlink vers /tmp/... s'il est toujours en place
+                if os.path.islink(path) and os.readlink(path) == entry['target']:
+                    os.remove(path)
+            elif op == 'unlink':
+                # Recréer le symlink interne d'origine
+                if not os.path.lexists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.symlink(entry['target'], path)
+            elif op == 'move':
+                backup = os.path.join(self.game_dir, entry['dst'])
+                if not os.path.lexists(backup):
+                    continue  # Jamais déplacé, ou déjà restauré
+                if not os.path.lexists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.rename(backup, path)
+                elif os.path.islink(path):
+                    conflicts.append(entry['path'])
+                elif os.path.isdir(path) and os.path.isdir(backup):
+                    # Déplacement fichier par fichier interrompu : fusionner le reste
+                    packtransfer.Transfer().tree(backup, path, move=True)
+                elif os.path.isfile(path) and not os.path.isdir(backup):
+                    # Copie interrompue avant la suppression de l'original : il est intact
+                    continue
+                else:
+                    conflicts.append(entry['path'])
+
+        if conflicts:
+            for rel_path in conflicts:
+                print(f"Conflit, original et sauvegarde présents: {rel_path}", file=sys.stderr)
+            return False, len(entries)
+
+        for name in STAGING_DIRS:
+            shutil.rmtree(os.path.join(self.game_dir, name), ignore_errors=True)
+        for name in STAGING_FILES:
+            path = os.path.join(self.game_dir, name)
+            if os.path.lexists(path):
+                os.remove(path)
+        self.discard()
+        return True, len(entries)
+
+
+def recover(game_dir):
+    """Remet en état un dossier de jeu après une création interrompue
+
+    Returns:
+        None si aucun journal, sinon (succès, nombre d'entrées annulées)
+    """
+    journal = StagingJournal(game_dir)
+    if not journal.exists:
+        return None
+    return journal.rollback()
+
+
+def pending():
+    """Dossiers de jeu ayant un journal en attente"""
+    directory = journal_dir()
+    if not os.path.isdir(directory):
+        return []
+    games = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.journal'):
+            continue
+        try:
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                games.append(json.loads(f.readline())['game_dir'])
+        except (OSError, ValueError, KeyError):
+            continue
+    return games
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == 'list':
+        for game_dir in pending():
+            print(game_dir)
+        return 0
+
+    if len(sys.argv) < 3 or sys.argv[1] != 'recover':
+        print(f"Usage: {sys.argv[0]} recover <dossier_du_jeu>")
+        print(f"       {sys.argv[0]} list")
+        return 1
+
+    result = recover(sys.argv[2])
+    if result is None:
+        print("Aucune création interrompue pour ce dossier")
+        return 0
+    ok, count = result
+    if not ok:
+        print(f"Erreur: restauration incomplète, journal conservé: {journal_path(sys.argv[2])}",
+              file=sys.stderr)
+        return 1
+    print(f"{count} opérations annulées, dossier restauré")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
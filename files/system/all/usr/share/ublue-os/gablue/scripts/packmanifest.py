@@ -0,0 +1,220 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Manifest - Métadonnées des paquets WGP/LGP lisibles en une seule lecture (sans Qt)
+
+Le manifeste (nom interne, format d'image, exécutable, arguments, options
+fix/xbox/pds, listes saves/extras/temps, empreinte de l'icône, nombre de
+fichiers, taille, empreinte de l'image sur demande) est écrit :
+- dans le paquet, sous .manifest.json (visible une fois monté)
+- à la suite de l'image (squashfs ou EROFS), en bloc final. squashfs ignore
+  tout ce qui dépasse bytes_used, EROFS tout ce qui dépasse ses blocs : le
+  paquet reste montable tel quel, et un lecteur obtient le manifeste en lisant
+  la fin du fichier, sans unsquashfs ni squashfuse.
+
+L'empreinte de l'image entière ("digest") est facultative : elle demande une
+relecture complète du paquet et n'est calculée que si la création le demande
+("image_digest" de packbatch, case « Empreinte de l'image » de makewgp et
+makelgp). Sans elle, seules les empreintes par fichier d'un paquet vérifié à
+la création (packverify) permettent de le contrôler.
+
+Bloc final : <json compact> <magic 8 octets> <longueur u32> <crc32 u32>
+
+Usage: packmanifest.py <paquet.wgp|lgp> [clé]      (manifeste ou une valeur)
+       packmanifest.py list <dossier>              (une ligne JSON par paquet)
+"""
+
+import sys
+import os
+import hashlib
+import json
+import struct
+import zlib
+
+import packstaging
+
+
+MANIFEST_FILE = '.manifest.json'
+MANIFEST_VERSION = 1
+
+TRAILER_MAGIC = b'GBPKMF01'
+_FOOTER = struct.Struct('<8sII')
+TAIL_READ = 64 * 1024  # Une seule lecture couvre le manifeste dans la quasi-totalité des cas
+
+PACK_EXTENSIONS = ('.wgp', '.lgp')
+
+
+def file_digest(path, chunk_size=1024 * 1024, limit=None):
+    """Empreinte blake2b d'un fichier (ou de ses limit premiers octets)"""
+    h = hashlib.blake2b(digest_size=32)
+    remaining = limit
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = f.read(size)
+            if not chunk:
+                break
+            h.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return 'blake2b:' + h.hexdigest()
+
+
+def build_manifest(game_dir, internal_game_name, config, pack_type='wgp', index=None):
+    """Manifeste d'un paquet à partir de sa configuration de création"""
+    def paths(key):
+        items = config.get(key) or []
+        if key == 'temps' and packstaging.is_full_overlay(items):
+            return '*'
+        return [rel_path for _item_type, rel_path in items]
+
+    icon_path = os.path.join(game_dir, '.icon.png')
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'type': pack_type,
+        'format': config.get('format', 'squashfs'),
+        'gamename': internal_game_name,
+        'launch': config.get('exe', ''),
+        'args': config.get('args', ''),
+        'fix': bool(config.get('fix_controller')),
+        'xbox': config.get('xbox_filter') or None,
+        'pds': config.get('pds') or None,
+        'saves': paths('saves'),
+        'extras': paths('extras'),
+        'temps': paths('temps'),
+        'icon': file_digest(icon_path) if os.path.isfile(icon_path) else None,
+    }
+    if index is not None:
+        entries = list(index.walk(exclude_dirs=['__pycache__']))
+        manifest['files'] = len(entries)
+        manifest['size'] = sum(e.size for e in entries)
+    return manifest
+
+
+def write_manifest(game_dir, manifest):
+    """Écrit .manifest.json dans le dossier du jeu (inclus dans le paquet)"""
+    with open(os.path.join(game_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def append_trailer(pack_file, manifest, measure=True, digest=False):
+    """Ajoute le manifeste (avec la taille de l'image) à la fin du paquet
+
+    L'écriture ne dépend que de la taille du manifeste : l'empreinte de l'image
+    entière (une relecture complète du paquet) n'est calculée qu'avec digest.
+    Les paquets vérifiés à la création portent déjà les empreintes par fichier
+    (packverify). measure=False conserve image_size/digest du manifeste (index
+    multi-volumes).
+    """
+    strip_trailer(pack_file)
+    manifest = dict(manifest)
+    if measure:
+        image_size = os.path.getsize(pack_file)
+        manifest['image_size'] = image_size
+        if digest:
+            manifest['digest'] = file_digest(pack_file, limit=image_size)
+        else:
+            manifest.pop('digest', None)  # Empreinte d'une image précédente (recompression)
+    data = json.dumps(manifest, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    with open(pack_file, 'ab') as f:
+        f.write(data)
+        f.write(_FOOTER.pack(TRAILER_MAGIC, len(data), zlib.crc32(data)))
+    return manifest
+
+
+def strip_trailer(pack_file):
+    """Retire le bloc final d'un paquet (avant de le réécrire), retourne True si retiré"""
+    size = os.path.getsize(pack_file)
+    with open(pack_file, 'rb') as f:
+        footer = _read_footer(f, size)
+    if footer is None:
+        return False
+    with open(pack_file, 'r+b') as f:
+        f.truncate(size - _FOOTER.size - footer[0])
+    return True
+
+
+def _read_footer(f, size):
+    if size < _FOOTER.size:
+        return None
+    f.seek(size - _FOOTER.size)
+    magic, length, crc = _FOOTER.unpack(f.read(_FOOTER.size))
+    if magic != TRAILER_MAGIC or length > size - _FOOTER.size:
+        return None
+    return length, crc
+
+
+def read_manifest(pack_file):
+    """Lit le manifeste d'un paquet en une lecture (None si absent ou invalide)"""
+    try:
+        with open(pack_file, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _FOOTER.size:
+                return None
+            tail_size = min(size, TAIL_READ)
+            f.seek(size - tail_size)
+            tail = f.read(tail_size)
+            magic, length, crc = _FOOTER.unpack_from(tail, len(tail) - _FOOTER.size)
+            if magic != TRAILER_MAGIC or length > size - _FOOTER.size:
+                return None
+            if length + _FOOTER.size <= len(tail):
+                data = tail[len(tail) - _FOOTER.size - length:len(tail) - _FOOTER.size]
+            else:
+                # Manifeste plus grand que la lecture initiale (listes très longues)
+                f.seek(size - _FOOTER.size - length)
+                data = f.read(length)
+    except OSError:
+        return None
+    if zlib.crc32(data) != crc:
+        return None
+    try:
+        return json.loads(data.decode('utf-8'))
+    except ValueError:
+        return None
+
+
+def iter_packs(directory):
+    """Paquets .wgp/.lgp d'un dossier (non récursif, ordre alphabétique)"""
+    with os.scandir(directory) as it:
+        for entry in sorted(it, key=lambda e: e.name):
+            if entry.name.lower().endswith(PACK_EXTENSIONS) and entry.is_file():
+                yield entry.path
+
+
+def _format_value(value):
+    """Valeur pour un script shell : texte brut, booléens en true/false, listes par ligne"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return '\n'.join(str(v) for v in value)
+    return str(value)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <paquet.wgp|lgp> [clé]")
+        print(f"       {sys.argv[0]} list <dossier>")
+        return 1
+
+    if sys.argv[1] == 'list' and len(sys.argv) > 2:
+        for pack in iter_packs(sys.argv[2]):
+            manifest = read_manifest(pack)
+            print(json.dumps({'pack': pack, 'manifest': manifest}, ensure_ascii=False))
+        return 0
+
+    manifest = read_manifest(sys.argv[1])
+    if manifest is None:
+        return 1
+    if len(sys.argv) > 2:
+        if sys.argv[2] not in manifest:
+            return 1
+        print(_format_value(manifest[sys.argv[2]]))
+    else:
+        print(json.dumps(manifest, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Policy - Fichiers déjà compressés stockés sans recompression (sans Qt)
+
+Les vidéos Bink, médias .ogg/.mp4/.webm et archives compressées ne gagnent rien
+à être recompressés en zstd : cela coûte du CPU à la création et ralentit chaque
+lecture sous squashfuse. Les gros fichiers sont classés par extension connue ou
+par entropie d'un échantillon, et ceux jugés incompressibles sont marqués
+'uncompressed' dans un fichier d'actions mksquashfs (-action-file).
+
+Usage: packpolicy.py <dossier_du_jeu> [niveau_zstd]
+"""
+
+import sys
+import math
+import os
+
+import gameindex
+import packbuild
+import packstaging
+
+
+# Formats toujours compressés : pas besoin d'échantillonner
+INCOMPRESSIBLE_EXTENSIONS = {
+    # Vidéo
+    '.bik', '.bk2', '.usm', '.mp4', '.m4v', '.webm', '.mkv', '.avi', '.wmv', '.ogv', '.mov',
+    # Audio
+    '.ogg', '.oga', '.opus', '.mp3', '.m4a', '.aac', '.wma', '.flac', '.xma',
+    # Images
+    '.jpg', '.jpeg', '.png', '.webp', '.ktx2',
+    # Archives
+    '.zip', '.7z', '.rar', '.gz', '.xz', '.bz2', '.zst', '.lz4', '.cab',
+}
+
+# Archives de jeu parfois compressées, parfois non : décision par entropie
+SAMPLED_EXTENSIONS = {
+    '.pak', '.upk', '.pck', '.utoc', '.ucas', '.arc', '.dat', '.bin', '.big', '.vpk',
+    '.wad', '.pkg', '.rpf', '.bundle', '.assets', '.resource', '.forge', '.cpk', '.awb',
+}
+
+MIN_FILE_SIZE = 1024 * 1024   # En dessous, le gain CPU est négligeable
+SAMPLE_BLOCK = 64 * 1024      # Taille de chaque bloc échantillonné
+SAMPLE_BLOCKS = 4             # Blocs répartis sur le fichier
+ENTROPY_THRESHOLD = 7.9       # bits/octet au-delà desquels zstd ne gagne quasiment rien
+
+# Débit approximatif de zstd sur un cœur (Mo/s) selon le niveau, pour estimer le CPU économisé
+ZSTD_CORE_RATES = [(3, 300), (6, 120), (9, 70), (12, 40), (15, 15), (17, 8), (19, 4), (22, 2)]
+
+
+def shannon_entropy(data):
+    """Entropie de Shannon d'un bloc de données, en bits par octet (0 à 8)"""
+    if not data:
+        return 0.0
+    total = len(data)
+    entropy = 0.0
+    for value in range(256):
+        count = data.count(value)
+        if count:
+            p = count / total
+            entropy -= p * math.log2(p)
+    return entropy
+
+
+def sample_entropy(path, size):
+    """Entropie moyenne de blocs répartis sur le fichier"""
+    values = []
+    try:
+        with open(path, 'rb') as f:
+            for i in range(SAMPLE_BLOCKS):
+                offset = (size - SAMPLE_BLOCK) * i // max(1, SAMPLE_BLOCKS - 1)
+                f.seek(max(0, offset))
+                data = f.read(SAMPLE_BLOCK)
+                if data:
+                    values.append(shannon_entropy(data))
+    except OSError:
+        return None
+    return sum(values) / len(values) if values else None
+
+
+def zstd_core_rate(level):
+    """Débit zstd estimé sur un cœur (octets/s) pour un niveau donné"""
+    for max_level, rate in ZSTD_CORE_RATES:
+        if level <= max_level:
+            return rate * 1024 * 1024
+    return ZSTD_CORE_RATES[-1][1] * 1024 * 1024
+
+
+def action_quote(pattern):
+    """Met un argument de test d'action mksquashfs entre guillemets"""
+    return '"' + pattern.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class CompressionPolicy:
+    """Fichiers du jeu à stocker sans recompression
+
+    Args:
+        game_dir: dossier du jeu
+        index: GameIndex partagé (construit si None)
+        level: niveau zstd prévu (pour estimer le CPU économisé)
+    """
+
+    def __init__(self, game_dir, index=None, level=15):
+        self.game_dir = game_dir
+        self.index = index
+        self.level = level
+        self.files = []          # (rel_path, taille, raison)
+        self.skipped_bytes = 0
+        self.scanned_files = 0   # Fichiers dont l'entropie a été mesurée
+
+    def scan(self, exclude_dirs=('__pycache__', '.save', '.extra', '.temp')):
+        """Classe les gros fichiers du jeu, retourne self"""
+        if self.index is None:
+            self.index = gameindex.GameIndex(self.game_dir)
+        self.files = []
+        self.skipped_bytes = 0
+        self.scanned_files = 0
+        for entry in self.index.walk(exclude_dirs):
+            if entry.is_symlink or entry.size < MIN_FILE_SIZE:
+                continue
+            reason = self.classify(entry)
+            if reason:
+                self.files.append((entry.rel_path, entry.size, reason))
+                self.skipped_bytes += entry.size
+        return self
+
+    def classify(self, entry):
+        """Raison de ne pas compresser ('extension' / 'entropie'), ou None"""
+        ext = entry.ext
+        if ext in INCOMPRESSIBLE_EXTENSIONS:
+            return 'extension'
+        if ext in SAMPLED_EXTENSIONS or not ext:
+            self.scanned_files += 1
+            entropy = sample_entropy(os.path.join(self.game_dir, entry.rel_path), entry.size)
+            if entropy is not None and entropy >= ENTROPY_THRESHOLD:
+                return 'entropie'
+        return None
+
+    @property
+    def cpu_time_saved(self):
+        """Temps CPU de compression évité (secondes, estimation)"""
+        return self.skipped_bytes / zstd_core_rate(self.level)
+
+    def write_actions(self, path):
+        """Écrit le fichier d'actions mksquashfs (option -action-file)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for rel_path, _size, _reason in self.files:
+                pattern = packstaging.exclude_pattern(rel_path)
+                f.write(f"uncompressed @ pathname({action_quote(pattern)})\n")
+        return path
+
+    def describe(self):
+        """Résumé pour le rapport de création"""
+        return (f"{len(self.files)} fichiers déjà compressés stockés tels quels "
+                f"({packbuild.format_size(self.skipped_bytes)}), "
+                f"~{packbuild.format_duration(self.cpu_time_saved)} CPU économisés")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <dossier_du_jeu> [niveau_zstd]")
+        return 1
+
+    level = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    policy = CompressionPolicy(sys.argv[1], level=level).scan()
+    for rel_path, size, reason in policy.files:
+        print(f"{packbuild.format_size(size):>10}  {reason:<9}  {rel_path}")
+    print(policy.describe())
+    print(f"{policy.scanned_files} fichiers échantillonnés", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,369 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Predict - Taille et durée estimées d'un paquet avant création, choix du disque (sans Qt)
+
+Taille du jeu (index du dossier) × ratio mesuré en compressant un échantillon
+au profil choisi (packtune) : taille estimée du paquet. Durée estimée : la
+plus lente de la compression (débit mesuré sur l'échantillon) et de
+l'écriture au débit du disque de destination.
+
+Le débit d'écriture d'un volume est mesuré une fois (64 Mo écrits puis
+fsync) et gardé une semaine dans ~/.cache/gablue/disk-rates.json. Seule la
+destination choisie est mesurée d'office ; un autre disque ne l'est que
+lorsqu'il est envisagé comme suggestion (place suffisante, et gain possible
+si la création est limitée par l'écriture et non par la compression).
+
+Contrôle avant création :
+- refus si l'espace libre ne couvre pas la taille estimée avec 5 % de marge,
+  ou si le paquet dépasse 4 Go sur FAT32 sans découpage en volumes
+- avertissement sous 25 % de marge (estimation sur échantillon)
+- proposition du disque le plus rapide qui a la place, s'il fait gagner au
+  moins un quart de la durée
+
+Usage: packpredict.py <dossier_du_jeu> [dossier_de_sortie] [-level 15]
+"""
+
+import sys
+import os
+import json
+import time
+
+import gameindex
+import packbuild
+import packtune
+import packvolumes
+
+
+PREDICT_SAMPLE = 16 * 1024 * 1024
+RATE_TEST_SIZE = 64 * 1024 * 1024
+RATE_TEST_CHUNK = 4 * 1024 * 1024
+RATE_MAX_AGE = 7 * 24 * 3600
+REFUSE_MARGIN = 1.05
+WARN_MARGIN = 1.25
+FASTER_FACTOR = 0.75  # Autre disque proposé s'il prend au plus 75 % de la durée
+
+WRITABLE_FS = ('btrfs', 'ext4', 'ext3', 'xfs', 'f2fs', 'exfat', 'vfat', 'ntfs3', 'ntfs', 'fuseblk')
+FAT_FS = ('vfat', 'msdos')
+SYSTEM_MOUNTS = ('/boot', '/boot/efi', '/efi', '/sysroot', '/usr', '/etc')
+
+
+def rates_file():
+    cache = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache, 'gablue', 'disk-rates.json')
+
+
+class Prediction:
+    """Taille et durée estimées d'un paquet (mesures de l'échantillon)"""
+
+    def __init__(self, source_size, ratio, comp_rate, profile):
+        self.source_size = source_size
+        self.ratio = ratio
+        self.comp_rate = comp_rate  # octets source/s
+        self.profile = profile
+        self.predicted_size = int(source_size * ratio)
+
+    @classmethod
+    def from_tune(cls, result):
+        return cls(result.total_size, result.best.ratio, result.best.comp_rate, result.best.profile)
+
+    def build_time(self, write_rate=None):
+        """Durée estimée : compression ou écriture, la plus lente des deux"""
+        seconds = self.source_size / max(1, self.comp_rate)
+        if write_rate:
+            seconds = max(seconds, self.predicted_size / write_rate)
+        return seconds
+
+    def describe(self):
+        return (f"Taille estimée : {packbuild.format_size(self.source_size)} → "
+                f"{packbuild.format_size(self.predicted_size)} ({self.ratio:.0%}), "
+                f"compression {packbuild.format_size(self.comp_rate)}/s")
+
+
+class Destination:
+    """Volume monté où le paquet peut être écrit"""
+
+    def __init__(self, path, device, fstype, mount_point):
+        self.path = path
+        self.device = device
+        self.fstype = fstype
+        self.mount_point = mount_point
+        st = os.statvfs(path)
+        self.free = st.f_bavail * st.f_frsize
+        self.write_rate = None
+
+    def fits(self, prediction, margin=REFUSE_MARGIN):
+        return self.free >= prediction.predicted_size * margin
+
+    def label(self):
+        return f"{self.path} ({self.device}, {packbuild.format_size(self.free)} libres)"
+
+
+def _device_uuids():
+    """Chemin réel du périphérique -> UUID du système de fichiers"""
+    uuids = {}
+    try:
+        for name in os.listdir('/dev/disk/by-uuid'):
+            uuids[os.path.realpath(os.path.join('/dev/disk/by-uuid', name))] = name
+    except OSError:
+        pass
+    return uuids
+
+
+def mounted_destinations(preferred=None):
+    """Volumes physiques montés en écriture, un dossier inscriptible par volume
+
+    Le dossier retenu est preferred sur son propre volume, le dossier personnel
+    sur le sien, sinon le point de montage (disques externes).
+    """
+    home = os.path.expanduser('~')
+    candidates = [p for p in (preferred, home) if p]
+    destinations = {}
+    try:
+        with open('/proc/self/mounts') as f:
+            mounts = [line.split() for line in f]
+    except OSError:
+        return []
+    for device, mount_point, fstype, options, *_rest in mounts:
+        mount_point = mount_point.replace('\\040', ' ')
+        if not device.startswith('/dev/') or fstype not in WRITABLE_FS:
+            continue
+        if 'ro' in options.split(',') or mount_point in SYSTEM_MOUNTS:
+            continue
+        try:
+            dev = os.stat(mount_point).st_dev
+        except OSError:
+            continue
+        if dev in destinations:
+            continue
+        path = next((p for p in candidates if _same_device(p, dev)), mount_point)
+        if not os.access(path, os.W_OK):
+            continue
+        destinations[dev] = Destination(path, device, fstype, mount_point)
+    return list(destinations.values())
+
+
+def _same_device(path, dev):
+    try:
+        return os.stat(path).st_dev == dev
+    except OSError:
+        return False
+
+
+def measure_write_rate(directory, size=RATE_TEST_SIZE):
+    """Débit d'écriture séquentielle d'un dossier (octets/s, fsync compris)"""
+    chunk = os.urandom(RATE_TEST_CHUNK)  # Incompressible (btrfs compress=...)
+    path = os.path.join(directory, f".packpredict-{os.getpid()}.tmp")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        start = time.monotonic()
+        written = 0
+        while written < size:
+            written += os.write(fd, chunk)
+        os.fsync(fd)
+        return written / max(time.monotonic() - start, 1e-6)
+    finally:
+        os.close(fd)
+        os.remove(path)
+
+
+def load_write_rates(destinations, measure=()):
+    """Renseigne write_rate depuis le cache (par UUID) ; mesure celles de measure absentes du cache"""
+    try:
+        with open(rates_file()) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    uuids = _device_uuids()
+    now = time.time()
+    changed = False
+    for dest in destinations:
+        key = uuids.get(os.path.realpath(dest.device), dest.device)
+        entry = cache.get(key)
+        if entry and now - entry['time'] < RATE_MAX_AGE:
+            dest.write_rate = entry['rate']
+        elif dest in measure and dest.free > 4 * RATE_TEST_SIZE:
+            try:
+                dest.write_rate = measure_write_rate(dest.path)
+            except OSError:
+                continue
+            cache[key] = {'rate': dest.write_rate, 'time': now}
+            changed = True
+    if changed:
+        os.makedirs(os.path.dirname(rates_file()), exist_ok=True)
+        with open(rates_file(), 'w') as f:
+            json.dump(cache, f, indent=1)
+
+
+class Admission:
+    """Décision avant création : 'ok', 'warn' ou 'refuse', et disque proposé"""
+
+    def __init__(self, level, reasons, prediction, destination, suggestion=None):
+        self.level = level
+        self.reasons = reasons
+        self.prediction = prediction
+        self.destination = destination
+        self.suggestion = suggestion
+
+    def describe(self):
+        """Message affichable (estimations, motifs, proposition)"""
+        lines = [self.prediction.describe()]
+        if self.destination is not None:
+            lines.append(f"Durée estimée : "
+                         f"{packbuild.format_duration(self.prediction.build_time(self.destination.write_rate))}"
+                         f" vers {self.destination.label()}")
+        lines += self.reasons
+        if self.suggestion is not None:
+            lines.append(f"Disque conseillé : {self.suggestion.label()}, durée estimée "
+                         f"{packbuild.format_duration(self.prediction.build_time(self.suggestion.write_rate))}")
+        return '\n'.join(lines)
+
+
+def chosen_destination(output_dir, destinations):
+    """Destination correspondant au dossier de sortie (volume non listé : créée à part)"""
+    dev = os.stat(output_dir).st_dev
+    destination = next((d for d in destinations if _same_device(d.path, dev)), None)
+    return destination or Destination(output_dir, '?', '?', output_dir)
+
+
+def admit(prediction, output_dir, volume_size=None, destinations=None, measure=None):
+    """Vérifie la destination choisie et cherche un disque plus adapté
+
+    measure : fonction (destination) appelée pour mesurer le débit d'un disque
+    sans débit connu, uniquement s'il est envisagé comme suggestion.
+    """
+    destinations = destinations if destinations is not None else mounted_destinations(output_dir)
+    destination = chosen_destination(output_dir, destinations)
+
+    level, reasons = 'ok', []
+    needed = prediction.predicted_size
+    if not destination.fits(prediction):
+        level = 'refuse'
+        reasons.append(f"Espace libre insuffisant : {packbuild.format_size(destination.free)} "
+                       f"pour {packbuild.format_size(needed)} estimés")
+    elif not destination.fits(prediction, WARN_MARGIN):
+        level = 'warn'
+        reasons.append(f"Espace libre juste : {packbuild.format_size(destination.free)} "
+                       f"pour {packbuild.format_size(needed)} estimés")
+    if destination.fstype in FAT_FS and needed > packvolumes.FAT32_MAX \
+            and not (volume_size and volume_size <= packvolumes.FAT32_MAX):
+        level = 'refuse'
+        reasons.append("FAT32 : fichiers limités à 4 Go (découper le paquet en volumes)")
+
+    current = prediction.build_time(destination.write_rate)
+    suggestion = None
+    # Création limitée par la compression : aucun disque ne peut la raccourcir assez
+    faster_possible = prediction.build_time() <= current * FASTER_FACTOR
+    for dest in destinations:
+        if dest is destination or not dest.fits(prediction, WARN_MARGIN):
+            continue
+        if dest.fstype in FAT_FS and needed > packvolumes.FAT32_MAX:
+            continue
+        if level == 'ok' and not faster_possible:
+            break
+        if dest.write_rate is None and measure is not None:
+            measure(dest)
+        if dest.write_rate is None and level == 'ok':
+            continue  # Débit inconnu : pas de gain à promettre
+        duration = prediction.build_time(dest.write_rate)
+        if level != 'ok' or duration <= current * FASTER_FACTOR:
+            if suggestion is None or duration < prediction.build_time(suggestion.write_rate):
+                suggestion = dest
+    return Admission(level, reasons, prediction, destination, suggestion)
+
+
+class Predictor:
+    """Estimation complète avant création : échantillon, débits des disques, décision
+
+    Args:
+        game_dir: dossier du jeu
+        profile: profil de compression (packtune)
+        output_dir: dossier de destination choisi
+        tune_result: TuneResult déjà mesuré (compression automatique), évite un nouvel échantillon
+        callback: fonction (percent, message) pour la progression
+    """
+
+    def __init__(self, game_dir, profile, output_dir, index=None, tune_result=None,
+                 volume_size=None, callback=None):
+        self.game_dir = game_dir
+        self.profile = profile
+        self.output_dir = output_dir
+        self.index = index
+        self.tune_result = tune_result
+        self.volume_size = volume_size
+        self.callback = callback
+        self.cancelled = False
+        self.destinations = []
+        self._tuner = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self._tuner is not None:
+            self._tuner.cancel()
+
+    def run(self):
+        """Retourne une Admission (None si annulé ou échantillon impossible)"""
+        result = self.tune_result
+        if result is None:
+            self._tuner = packtune.Autotuner(self.game_dir, index=self.index, profiles=[self.profile],
+                                             sample_bytes=PREDICT_SAMPLE, callback=self._emit_sample)
+            result = self._tuner.run()
+        if result is None or self.cancelled:
+            return None
+        self._emit(90, "Mesure du débit du disque de destination...")
+        self.destinations = mounted_destinations(self.output_dir)
+        destination = chosen_destination(self.output_dir, self.destinations)
+        load_write_rates(self.destinations, measure=[destination])
+        if self.cancelled:
+            return None
+        admission = admit(Prediction.from_tune(result), self.output_dir, self.volume_size,
+                          self.destinations, measure=self._measure)
+        if self.cancelled:
+            return None
+        self._emit(100, "Estimation terminée")
+        return admission
+
+    def _measure(self, destination):
+        """Mesure d'un autre disque, seulement quand il est envisagé comme suggestion"""
+        if self.cancelled:
+            return
+        self._emit(95, f"Mesure du débit de {destination.path}...")
+        load_write_rates([destination], measure=[destination])
+
+    def _emit_sample(self, percent, message):
+        self._emit(percent * 9 // 10, message)
+
+    def _emit(self, percent, message):
+        if self.callback:
+            self.callback(percent, message)
+
+
+def main():
+    args = sys.argv[1:]
+    level = 15
+    if '-level' in args:
+        i = args.index('-level')
+        level = int(args[i + 1])
+        del args[i:i + 2]
+    if not args or len(args) > 2:
+        print(f"Usage: {sys.argv[0]} <dossier_du_jeu> [dossier_de_sortie] [-level 15]")
+        return 1
+    game_dir = os.path.abspath(args[0])
+    output_dir = os.path.abspath(args[1]) if len(args) > 1 else os.path.dirname(game_dir)
+
+    predictor = Predictor(game_dir, packtune.config_profile({'compression': level}), output_dir,
+                          index=gameindex.GameIndex(game_dir),
+                          callback=lambda pct, msg: print(f"[{pct:3d}%] {msg}", file=sys.stderr))
+    admission = predictor.run()
+    if admission is None:
+        print("Erreur: échantillon non compressé (mksquashfs disponible ?)", file=sys.stderr)
+        return 2
+    for dest in predictor.destinations:
+        rate = f"{packbuild.format_size(dest.write_rate)}/s" if dest.write_rate else "non mesuré"
+        print(f"  {dest.label()} : écriture {rate}")
+    print(admission.describe())
+    return {'ok': 0, 'warn': 0, 'refuse': 1}[admission.level]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Recompress - Changement de compression d'un paquet WGP/LGP sans extraction (sans Qt)
+
+Le contenu de l'image existante est lu directement (squashfsreader) et envoyé
+en flux tar à un nouveau mksquashfs (-tar, lecture sur l'entrée standard) avec
+le nouveau profil de compression. Le nouveau paquet est écrit à côté de
+l'ancien puis le remplace atomiquement ; le manifeste en fin de fichier est
+conservé. Espace disque supplémentaire au pic : un paquet compressé, jamais le
+jeu décompressé. Un paquet découpé en volumes est redécoupé à la même taille.
+
+Usage: packrecompress.py <paquet.wgp|lgp|dossier>... [-comp zstd|lz4|xz] [-level 3]
+                         [-block 128K] [-processors N] [-mem 2G] [-force]
+"""
+
+import sys
+import os
+import re
+import shutil
+import signal
+import stat
+import tarfile
+import threading
+import time
+
+import packbatch
+import packbuild
+import packmanifest
+import packtune
+import packvolumes
+import squashfsreader
+
+
+COMPRESSORS = ('zstd', 'lz4', 'xz')
+DEFAULT_PROFILE = {'comp': 'zstd', 'level': 3, 'block_size': 128 * 1024}
+
+TAR_BUFSIZE = 1024 * 1024
+PROGRESS_INTERVAL = 0.5  # secondes entre deux rappels de progression
+
+_TAR_TYPES = {
+    stat.S_IFDIR: tarfile.DIRTYPE,
+    stat.S_IFREG: tarfile.REGTYPE,
+    stat.S_IFLNK: tarfile.SYMTYPE,
+    stat.S_IFCHR: tarfile.CHRTYPE,
+    stat.S_IFBLK: tarfile.BLKTYPE,
+    stat.S_IFIFO: tarfile.FIFOTYPE,
+}
+
+
+def parse_size(value):
+    """Convertit une taille de bloc (ex: 128K, 1M) en octets"""
+    m = re.fullmatch(r'\s*(\d+)\s*([KM]?)B?\s*', str(value), re.IGNORECASE)
+    if not m:
+        raise ValueError(f"Taille de bloc invalide: {value}")
+    return int(m.group(1)) * {'': 1, 'K': 1024, 'M': 1024 * 1024}[m.group(2).upper()]
+
+
+def same_profile(image, profile):
+    """True si l'image utilise déjà ce profil (compression, niveau, taille de bloc)"""
+    if image.compression_name != profile['comp'] or image.block_size != profile['block_size']:
+        return False
+    if profile['comp'] == 'zstd':
+        return image.compression_level == profile['level']
+    return True
+
+
+def tar_info(rel_path, node):
+    """Entrée tar décrivant un inode de l'image"""
+    info = tarfile.TarInfo(rel_path)
+    info.type = _TAR_TYPES.get(stat.S_IFMT(node.mode), tarfile.REGTYPE)
+    info.mode = stat.S_IMODE(node.mode)
+    info.uid = node.uid
+    info.gid = node.gid
+    info.mtime = node.mtime
+    if node.is_file():
+        info.size = node.size
+    elif node.is_symlink():
+        info.linkname = node.target
+    elif info.type in (tarfile.CHRTYPE, tarfile.BLKTYPE):
+        # Encodage squashfs : majeur sur 12 bits, mineur réparti de part et d'autre
+        info.devmajor = (node.rdev >> 8) & 0xfff
+        info.devminor = (node.rdev & 0xff) | ((node.rdev >> 12) & 0xfff00)
+    return info
+
+
+class Recompressor:
+    """Recompresse un paquet avec un autre profil, sans l'extraire
+
+    Args:
+        pack_file: paquet .wgp/.lgp
+        profile: profil cible (dict packtune : comp, level, block_size)
+        processors: cœurs alloués à mksquashfs (None = tous)
+        mem_mb: mémoire allouée à mksquashfs en Mo (None = défaut)
+        callback: fonction (percent, message) pour la progression
+        keep: fonction (chemin relatif) -> bool, entrées conservées (None = toutes)
+    """
+
+    def __init__(self, pack_file, profile=None, processors=None, mem_mb=None, callback=None,
+                 keep=None):
+        self.pack_file = pack_file
+        self.profile = profile or DEFAULT_PROFILE
+        self.processors = processors
+        self.mem_mb = mem_mb
+        self.callback = callback
+        self.keep = keep
+        self.cancelled = False
+        self.runner = None
+        self.streamed_bytes = 0
+        self._stream_error = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self.runner is not None:
+            self.runner.cancel()
+
+    def run(self, force=False):
+        """Recompresse le paquet, retourne un dict de résultat
+
+        status : 'ok', 'skipped' (déjà au bon profil), 'cancelled' ou 'failed'
+        """
+        volumes = packvolumes.read_index(self.pack_file)
+        result = {'pack': self.pack_file, 'status': 'failed',
+                  'old_size': packvolumes.pack_size(self.pack_file),
+                  'new_size': None, 'wall_time': 0.0, 'error': None}
+        start = time.monotonic()
+        manifest = packmanifest.read_manifest(self.pack_file)
+        if manifest is not None:
+            manifest.pop('volumes', None)
+        directory = os.path.dirname(os.path.abspath(self.pack_file))
+        temp_file = os.path.join(directory, f".{os.path.basename(self.pack_file)}.recompress-{os.getpid()}")
+
+        try:
+            with squashfsreader.SquashfsImage(self.pack_file) as image:
+                if not force and same_profile(image, self.profile):
+                    result['status'] = 'skipped'
+                    return result
+                entries = [(rel_path, node) for rel_path, node in image.walk()
+                           if self.keep is None or self.keep(rel_path)]
+                total_size = sum(node.size for _rel, node in entries if node.is_file())
+
+                # L'ancienne image reste en place jusqu'au remplacement : il faut
+                # au moins sa taille en espace libre
+                if shutil.disk_usage(directory).free < image.bytes_used:
+                    raise OSError(f"Espace libre insuffisant dans {directory} "
+                                  f"({packbuild.format_size(image.bytes_used)} nécessaires)")
+
+                read_fd, write_fd = os.pipe()
+                cmd = ['mksquashfs', '-', temp_file, '-tar', '-noappend', '-percentage', '-progress']
+                cmd += packtune.profile_args(self.profile)
+                if self.processors:
+                    cmd += ['-processors', str(self.processors)]
+                if self.mem_mb:
+                    cmd += ['-mem', f"{self.mem_mb}M"]
+                self.runner = packbuild.MksquashfsRunner(cmd, total_size, temp_file, stdin=read_fd)
+                if self.cancelled:
+                    self.runner.cancel()
+
+                writer = threading.Thread(target=self._stream,
+                                          args=(image, entries, write_fd, total_size), daemon=True)
+                writer.start()
+                completed = self.runner.run()
+                writer.join()
+
+            if self.cancelled:
+                result['status'] = 'cancelled'
+                return result
+            if self._stream_error is not None:
+                raise self._stream_error
+            if completed.returncode != 0:
+                raise RuntimeError(f"mksquashfs a échoué: {completed.stderr}")
+
+            self._emit(100, "Remplacement du paquet...")
+            if manifest is not None:
+                packmanifest.append_trailer(temp_file, manifest)
+            packvolumes.commit(temp_file, self.pack_file,
+                               volumes['volume_size'] if volumes is not None else None)
+            result['status'] = 'ok'
+            result['new_size'] = packvolumes.pack_size(self.pack_file)
+            return result
+        except (OSError, RuntimeError, squashfsreader.SquashfsError, packvolumes.VolumeError) as e:
+            result['error'] = str(e)
+            return result
+        finally:
+            result['wall_time'] = round(time.monotonic() - start, 2)
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def _emit(self, percent, message):
+        if self.callback:
+            self.callback(percent, message)
+
+    def _stream(self, image, entries, write_fd, total_size):
+        """Écrit le contenu de l'image en tar dans le tube de mksquashfs"""
+        last = 0.0
+        try:
+            with os.fdopen(write_fd, 'wb', buffering=TAR_BUFSIZE) as pipe, \
+                    tarfile.open(fileobj=pipe, mode='w|', format=tarfile.PAX_FORMAT,
+                                 bufsize=TAR_BUFSIZE) as tar:
+                for rel_path, node in entries:
+                    if self.cancelled:
+                        return
+                    if stat.S_ISSOCK(node.mode):
+                        continue  # Pas de représentation tar
+                    info = tar_info(rel_path, node)
+                    if node.is_file():
+                        with image.open(rel_path) as data:
+                            tar.addfile(info, data)
+                        self.streamed_bytes += node.size
+                    else:
+                        tar.addfile(info)
+                    now = time.monotonic()
+                    if now - last >= PROGRESS_INTERVAL:
+                        last = now
+                        percent = min(99, self.streamed_bytes * 100 // max(1, total_size))
+                        self._emit(percent, f"{percent}% — {packbuild.format_size(self.streamed_bytes)} / "
+                                            f"{packbuild.format_size(total_size)} recompressés")
+        except BrokenPipeError:
+            pass  # mksquashfs arrêté (annulation ou erreur, remontée par le runner)
+        except (OSError, squashfsreader.SquashfsError) as e:
+            self._stream_error = e
+            if self.runner is not None:
+                self.runner.cancel()
+
+
+def main():
+    usage = (f"Usage: {sys.argv[0]} <paquet.wgp|lgp|dossier>... [-comp zstd|lz4|xz] [-level 3]\n"
+             f"       [-block 128K] [-processors N] [-mem 2G] [-force]")
+    args = sys.argv[1:]
+    if not args or args[0] in ('-h', '--help'):
+        print(usage)
+        return 1
+
+    options = {'-comp': None, '-level': None, '-block': None, '-processors': None, '-mem': None}
+    force = False
+    targets = []
+    while args:
+        arg = args.pop(0)
+        if arg in options:
+            if not args:
+                print(f"Option {arg} sans valeur\n{usage}", file=sys.stderr)
+                return 1
+            options[arg] = args.pop(0)
+        elif arg == '-force':
+            force = True
+        else:
+            targets.append(arg)
+
+    try:
+        profile = dict(DEFAULT_PROFILE)
+        if options['-comp']:
+            if options['-comp'] not in COMPRESSORS:
+                raise ValueError(f"Compression inconnue: {options['-comp']}")
+            profile['comp'] = options['-comp']
+            profile['level'] = None
+        if profile['comp'] == 'zstd':
+            profile['level'] = int(options['-level']) if options['-level'] else DEFAULT_PROFILE['level']
+        if options['-block']:
+            profile['block_size'] = parse_size(options['-block'])
+        processors = int(options['-processors']) if options['-processors'] else None
+        mem_mb = packbatch.parse_mem(options['-mem']) if options['-mem'] else None
+    except ValueError as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 1
+
+    packs = []
+    for target in targets:
+        packs.extend(packmanifest.iter_packs(target) if os.path.isdir(target) else [target])
+    if not packs:
+        print(usage, file=sys.stderr)
+        return 1
+
+    current = {'job': None}
+    signal.signal(signal.SIGINT, lambda *_: current['job'] and current['job'].cancel())
+    failed = 0
+    saved = 0
+    print(f"Profil cible : {packtune.profile_label(profile)}")
+    for pack in packs:
+        job = Recompressor(pack, profile, processors, mem_mb,
+                           lambda pct, msg: print(f"\r{msg}", end='', file=sys.stderr))
+        current['job'] = job
+        result = job.run(force)
+        print(file=sys.stderr)
+        name = os.path.basename(pack)
+        if result['status'] == 'ok':
+            saved += result['old_size'] - result['new_size']
+            print(f"{name} : {packbuild.format_size(result['old_size'])} → "
+                  f"{packbuild.format_size(result['new_size'])} "
+                  f"en {packbuild.format_duration(result['wall_time'])}")
+        elif result['status'] == 'skipped':
+            print(f"{name} : déjà au profil cible")
+        elif result['status'] == 'cancelled':
+            print(f"{name} : annulé")
+            return 1
+        else:
+            failed += 1
+            print(f"{name} : échec ({result['error']})", file=sys.stderr)
+    sign = '-' if saved >= 0 else '+'
+    print(f"{len(packs) - failed}/{len(packs)} paquets traités, {sign}{packbuild.format_size(abs(saved))}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
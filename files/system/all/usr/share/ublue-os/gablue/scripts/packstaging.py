@@ -0,0 +1,278 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Staging - Disposition des sauvegardes/extras/temps des paquets WGP/LGP
+
+Au lieu de copier les fichiers dans .save/.extra/.temp puis de remplacer les
+originaux par des symlinks (et de tout recopier après la compression), on décrit
+la disposition finale à mksquashfs avec des pseudo-fichiers :
+- les originaux sont exclus du scan (-e)
+- leur contenu est injecté sous .save/.extra/.temp (pseudo-fichiers 'f')
+- les symlinks vers /tmp/<wgp|lgp>-<saves|extra|temp> sont créés (pseudo 's')
+
+Le dossier du jeu n'est jamais modifié et chaque fichier n'est lu qu'une fois.
+
+Usage: packstaging.py <dossier_du_jeu> <nom_interne> <wgp|lgp>
+       (affiche les définitions générées, pour débogage)
+"""
+
+import sys
+import os
+import re
+import shlex
+import stat
+
+
+# Catégories : (clé de config, dossier interne, fichier de liste, base runtime)
+CATEGORIES = [
+    ('saves', '.save', '.savepath', 'saves'),
+    ('extras', '.extra', '.extrapath', 'extra'),
+    ('temps', '.temp', '.temppath', 'temp'),
+]
+
+# Caractères spéciaux pour les exclusions mksquashfs (-wildcards, fnmatch étendu)
+_WILDCARD_CHARS = '\\*?[]+@!()|'
+
+# Définition pseudo-fichier : "chemin" type mode uid gid [argument]
+_PSEUDO_LINE = re.compile(r'"((?:[^"\\]|\\.)*)" (\S) (\S+) (\d+) (\d+) ?(.*)')
+
+
+def pseudo_quote(path):
+    """Met un nom de fichier entre guillemets pour une définition pseudo-fichier"""
+    if '\n' in path:
+        raise ValueError(f"Nom de fichier invalide (retour à la ligne): {path!r}")
+    return '"' + path.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def exclude_pattern(rel_path):
+    """Échappe un chemin relatif pour l'utiliser tel quel avec -e et -wildcards"""
+    return ''.join('\\' + c if c in _WILDCARD_CHARS else c for c in rel_path)
+
+
+def exclude_path(pattern):
+    """Chemin relatif d'un motif produit par exclude_pattern"""
+    return re.sub(r'\\(.)', r'\1', pattern)
+
+
+def parse_pseudo_line(line):
+    """Décompose une définition pseudo-fichier : (chemin, type, mode, uid, gid, argument)
+
+    argument : fichier source pour 'f' (cat -- source), cible pour 's', None pour 'd'
+    """
+    m = _PSEUDO_LINE.fullmatch(line)
+    if not m:
+        raise ValueError(f"Définition pseudo-fichier invalide: {line!r}")
+    kind, rest = m.group(2), m.group(6)
+    if kind == 'f':
+        argument = shlex.split(rest)[-1]
+    elif kind == 's':
+        argument = rest
+    else:
+        argument = None
+    return (re.sub(r'\\(.)', r'\1', m.group(1)), kind, int(m.group(3), 8),
+            int(m.group(4)), int(m.group(5)), argument)
+
+
+def write_exclude_file(path, rel_paths):
+    """Écrit un fichier d'exclusions mksquashfs (-ef), un chemin échappé par ligne"""
+    with open(path, 'w', encoding='utf-8', errors='surrogateescape') as f:
+        for rel_path in rel_paths:
+            pattern = exclude_pattern(rel_path)
+            if pattern[0] in '# ':
+                pattern = '\\' + pattern  # Commentaire ou espace de tête dans un fichier -ef
+            f.write(pattern + '\n')
+    return path
+
+
+def runtime_base(pack_type, kind, internal_game_name):
+    """Dossier runtime vers lequel pointent les symlinks (ex: /tmp/wgp-saves/Jeu)"""
+    return f"/tmp/{pack_type}-{kind}/{internal_game_name}"
+
+
+def is_full_overlay(temps):
+    """Vérifie si la liste des temps correspond au mode 'full overlay' (marqueur *)"""
+    return bool(temps) and len(temps) == 1 and temps[0] == ('*', 'full_overlay')
+
+
+class PseudoStaging:
+    """Construit les définitions pseudo-fichiers et les exclusions pour mksquashfs"""
+
+    def __init__(self, game_dir, internal_game_name, pack_type='wgp'):
+        self.game_dir = os.path.abspath(game_dir)
+        self.internal_game_name = internal_game_name
+        self.pack_type = pack_type
+        self.lines = []
+        self.excludes = []
+        self._dirs = set()  # Dossiers pseudo déjà définis
+        self.file_count = 0
+        self.total_bytes = 0
+
+    def add_category(self, items, backup_dir, kind):
+        """Ajoute une catégorie (saves/extras/temps) au staging
+
+        Args:
+            items: liste de tuples (item_type, rel_path)
+            backup_dir: dossier interne du paquet ('.save', '.extra', '.temp')
+            kind: suffixe du dossier runtime ('saves', 'extra', 'temp')
+        """
+        # Toujours exclure un éventuel ancien dossier resté dans le jeu
+        self.excludes.append(exclude_pattern(backup_dir))
+        if not items:
+            return
+        self._add_dir(backup_dir, os.lstat(self.game_dir))
+        base = runtime_base(self.pack_type, kind, self.internal_game_name)
+
+        for item_type, rel_path in items:
+            source = os.path.join(self.game_dir, rel_path)
+            if not os.path.exists(source):
+                print(f"DEBUG: {rel_path} introuvable, ignoré")
+                continue
+
+            # Contenu sous .save/.extra/.temp (contenu uniquement pour les dossiers)
+            target = os.path.join(backup_dir, rel_path)
+            self._add_parents(target)
+            if item_type == 'dir' and os.path.isdir(source):
+                self._add_dir(target, os.stat(source))
+                self._add_tree(source, target)
+            else:
+                self._add_file(target, source)
+
+            # Un symlink externe absolu est conservé tel quel dans le paquet
+            if os.path.islink(source):
+                link_target = os.readlink(source)
+                if os.path.isabs(link_target) and not link_target.startswith(self.game_dir):
+                    print(f"DEBUG: Preserving external symlink {source} -> {link_target}")
+                    continue
+
+            # Remplacer l'original par un symlink vers le dossier runtime
+            self.excludes.append(exclude_pattern(rel_path))
+            st = os.lstat(source)
+            self.lines.append(
+                f"{pseudo_quote(rel_path)} s 777 {st.st_uid} {st.st_gid} "
+                f"{os.path.join(base, rel_path)}"
+            )
+
+    def _add_parents(self, path):
+        """Définit les dossiers parents d'un chemin interne"""
+        parent = os.path.dirname(path)
+        missing = []
+        while parent and parent not in self._dirs:
+            missing.append(parent)
+            parent = os.path.dirname(parent)
+        for d in reversed(missing):
+            # Reprendre les droits du dossier d'origine (.save/a/b -> a/b)
+            source = os.path.join(self.game_dir, d.split(os.sep, 1)[1])
+            st = os.stat(source) if os.path.isdir(source) else os.lstat(self.game_dir)
+            self._add_dir(d, st)
+
+    def _add_dir(self, path, st):
+        if path in self._dirs:
+            return
+        self._dirs.add(path)
+        self.lines.append(
+            f"{pseudo_quote(path)} d {stat.S_IMODE(st.st_mode):o} {st.st_uid} {st.st_gid}"
+        )
+
+    def _add_file(self, path, source):
+        """Ajoute un fichier dont le contenu est lu directement depuis la source"""
+        st = os.stat(source)
+        self.lines.append(
+            f"{pseudo_quote(path)} f {stat.S_IMODE(st.st_mode):o} {st.st_uid} {st.st_gid} "
+            f"cat -- {shlex.quote(source)}"
+        )
+        self.file_count += 1
+        self.total_bytes += st.st_size
+
+    def _add_tree(self, source, target):
+        """Ajoute récursivement un dossier en préservant les symlinks internes"""
+        with os.scandir(source) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        for entry in entries:
+            dest = os.path.join(target, entry.name)
+            if entry.is_symlink():
+                st = entry.stat(follow_symlinks=False)
+                self.lines.append(
+                    f"{pseudo_quote(dest)} s 777 {st.st_uid} {st.st_gid} "
+                    f"{os.readlink(entry.path)}"
+                )
+            elif entry.is_dir():
+                self._add_dir(dest, entry.stat())
+                self._add_tree(entry.path, dest)
+            elif entry.is_file():
+                self._add_file(dest, entry.path)
+
+    def write(self, path):
+        """Écrit le fichier de pseudo-définitions (option -pf de mksquashfs)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in self.lines:
+                f.write(line + '\n')
+        return path
+
+    def mksquashfs_args(self, pseudo_file):
+        """Arguments à ajouter à la commande mksquashfs"""
+        args = ['-pf', pseudo_file]
+        for pattern in self.excludes:
+            args.extend(['-e', pattern])
+        return args
+
+
+def write_path_lists(game_dir, config):
+    """Écrit .savepath/.extrapath/.temppath (format sans préfixe, compatible lanceurs)"""
+    for key, _backup_dir, list_file, _kind in CATEGORIES:
+        items = config.get(key) or []
+        path = os.path.join(game_dir, list_file)
+        if not items:
+            if os.path.exists(path):
+                os.remove(path)
+            continue
+        with open(path, 'w') as f:
+            if key == 'temps' and is_full_overlay(items):
+                f.write("*\n")
+                continue
+            for _item_type, rel_path in items:
+                f.write(f"{rel_path}\n")
+
+
+def build_staging(game_dir, internal_game_name, config, pack_type='wgp'):
+    """Construit le staging complet à partir d'une configuration de paquet"""
+    staging = PseudoStaging(game_dir, internal_game_name, pack_type)
+    for key, backup_dir, _list_file, kind in CATEGORIES:
+        items = config.get(key) or []
+        if key == 'temps' and is_full_overlay(items):
+            # Mode full overlay : rien à disposer, seulement le marqueur .temppath
+            items = []
+        staging.add_category(items, backup_dir, kind)
+    return staging
+
+
+def main():
+    if len(sys.argv) < 4:
+        print(f"Usage: {sys.argv[0]} <dossier_du_jeu> <nom_interne> <wgp|lgp>")
+        return 1
+
+    game_dir = sys.argv[1]
+    config = {'saves': [], 'extras': [], 'temps': []}
+    for key, _backup_dir, list_file, _kind in CATEGORIES:
+        path = os.path.join(game_dir, list_file)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line == '*':
+                    config[key] = [('*', 'full_overlay')]
+                    break
+                if line:
+                    item_type = 'dir' if os.path.isdir(os.path.join(game_dir, line)) else 'file'
+                    config[key].append((item_type, line))
+
+    staging = build_staging(game_dir, sys.argv[2], config, sys.argv[3])
+    for line in staging.lines:
+        print(line)
+    for pattern in staging.excludes:
+        print(f"# -e {pattern}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
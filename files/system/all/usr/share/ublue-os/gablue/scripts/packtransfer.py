@@ -0,0 +1,201 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Transfer - Déplacement et copie rapides des saves/extras/temps (sans Qt)
+
+Le mode classique de makewgp/makelgp déplace les saves/extras/temps dans
+.save/.extra/.temp puis les remet en place après la création du paquet. Au lieu
+de recopier chaque octet, chaque fichier est transféré par la méthode la moins
+coûteuse disponible :
+- os.rename sur le même système de fichiers (déplacement, métadonnées seules)
+- FICLONE (reflink btrfs/XFS : blocs partagés, métadonnées seules)
+- copy_file_range (copie côté noyau, reflink implicite sur certains FS)
+- copie classique en dernier recours
+
+Usage: packtransfer.py <source> <destination> [-move]
+"""
+
+import sys
+import os
+import errno
+import fcntl
+import shutil
+
+import packbuild
+
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int)
+
+METHODS = ('rename', 'reflink', 'copy_file_range', 'copy')
+METHOD_LABELS = {
+    'rename': "déplacés",
+    'reflink': "clonés (reflink)",
+    'copy_file_range': "copiés par le noyau",
+    'copy': "copiés",
+}
+
+# Erreurs signifiant "méthode non prise en charge ici" : on passe à la suivante
+_UNSUPPORTED = {errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTTY,
+                errno.ENOSYS, errno.EPERM, errno.EBADF, errno.ETXTBSY}
+
+COPY_CHUNK = 64 * 1024 * 1024
+
+
+def _remove(path):
+    """Supprime un fichier, un symlink ou un dossier existant"""
+    if os.path.islink(path) or not os.path.isdir(path):
+        if os.path.lexists(path):
+            os.remove(path)
+    else:
+        shutil.rmtree(path)
+
+
+class Transfer:
+    """Transferts de fichiers avec compteurs d'octets par méthode
+
+    Args:
+        reflink: essayer FICLONE/copy_file_range avant la copie classique
+    """
+
+    def __init__(self, reflink=True):
+        self.reflink = reflink
+        self.bytes = dict.fromkeys(METHODS, 0)
+        self.files = dict.fromkeys(METHODS, 0)
+
+    def _count(self, method, size, files=1):
+        self.bytes[method] += size
+        self.files[method] += files
+
+    def file(self, source, target, move=False):
+        """Copie (ou déplace) un fichier régulier, retourne la méthode utilisée"""
+        size = os.path.getsize(source)
+        if move:
+            try:
+                os.replace(source, target)
+                self._count('rename', size)
+                return 'rename'
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+        method = self._clone(source, target)
+        shutil.copystat(source, target)
+        if move:
+            os.remove(source)
+        self._count(method, size)
+        return method
+
+    def _clone(self, source, target):
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            if self.reflink:
+                try:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                    return 'reflink'
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED:
+                        raise
+                if hasattr(os, 'copy_file_range'):
+                    try:
+                        copied = 0
+                        while True:
+                            n = os.copy_file_range(src.fileno(), dst.fileno(), COPY_CHUNK)
+                            if n == 0:
+                                break
+                            copied += n
+                        return 'copy_file_range'
+                    except OSError as e:
+                        if e.errno not in _UNSUPPORTED or copied:
+                            raise
+            shutil.copyfileobj(src, dst, COPY_CHUNK)
+            return 'copy'
+
+    def tree(self, source, target, move=False):
+        """Copie (ou déplace) récursivement un dossier en préservant les symlinks"""
+        if move and not os.path.lexists(target):
+            os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+            try:
+                size, count = _tree_size(source)
+                os.rename(source, target)
+                self._count('rename', size, count)
+                return
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+        self.contents(source, target, move)
+        if move:
+            os.rmdir(source)
+
+    def contents(self, source, target, move=False):
+        """Copie (ou déplace) le contenu d'un dossier dans target (sans le dossier lui-même)
+
+        Les éléments déjà présents dans target sont remplacés. Les symlinks sont
+        recréés tels quels (cible inchangée).
+        """
+        os.makedirs(target, exist_ok=True)
+        for item in os.listdir(source):
+            s = os.path.join(source, item)
+            d = os.path.join(target, item)
+            if os.path.islink(s):
+                _remove(d)
+                os.symlink(os.readlink(s), d)
+                if move:
+                    os.remove(s)
+            elif os.path.isdir(s):
+                _remove(d)
+                self.tree(s, d, move)
+            else:
+                if os.path.isdir(d) and not os.path.islink(d):
+                    shutil.rmtree(d)
+                self.file(s, d, move)
+
+    @property
+    def total_bytes(self):
+        return sum(self.bytes.values())
+
+    def describe(self):
+        """Résumé des octets transférés par méthode"""
+        parts = [f"{packbuild.format_size(self.bytes[m])} {METHOD_LABELS[m]}"
+                 for m in METHODS if self.files[m]]
+        if not parts:
+            return "Aucun fichier transféré"
+        return "Transferts : " + ", ".join(parts)
+
+
+def _tree_size(path):
+    """Taille (octets) et nombre de fichiers d'un dossier, sans suivre les symlinks"""
+    size = 0
+    count = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            file_path = os.path.join(root, name)
+            if os.path.islink(file_path):
+                continue
+            try:
+                size += os.lstat(file_path).st_size
+                count += 1
+            except OSError:
+                pass
+    return size, count
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(f"Usage: {sys.argv[0]} <source> <destination> [-move]")
+        return 1
+
+    source, target = sys.argv[1], sys.argv[2]
+    move = '-move' in sys.argv[3:]
+    transfer = Transfer()
+    try:
+        if os.path.isdir(source) and not os.path.islink(source):
+            transfer.tree(source, target, move)
+        else:
+            transfer.file(source, target, move)
+    except OSError as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 1
+    print(transfer.describe())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Tune - Choix automatique du profil de compression des paquets WGP/LGP (sans Qt)
+
+Un échantillon représentatif du jeu (fenêtres réparties uniformément sur les
+octets du dossier) est compressé à l'essai avec plusieurs profils mksquashfs
+(niveaux zstd, tailles de blocs, lz4, xz). Pour chaque profil on mesure le ratio,
+la vitesse de compression et surtout le débit de décompression sur un seul cœur
+(comme squashfuse au lancement du jeu). Le meilleur profil est retenu selon
+l'objectif : chargement le plus rapide ou fichier le plus petit.
+
+Usage: packtune.py <dossier_du_jeu> [load|size]
+"""
+
+import sys
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import gameindex
+import packbuild
+
+
+# Profils essayés (dans l'ordre d'affichage)
+PROFILES = [
+    {'comp': 'zstd', 'level': 3, 'block_size': 128 * 1024},
+    {'comp': 'zstd', 'level': 9, 'block_size': 128 * 1024},
+    {'comp': 'zstd', 'level': 15, 'block_size': 128 * 1024},
+    {'comp': 'zstd', 'level': 19, 'block_size': 128 * 1024},
+    {'comp': 'zstd', 'level': 15, 'block_size': 1024 * 1024},
+    {'comp': 'zstd', 'level': 19, 'block_size': 1024 * 1024},
+    {'comp': 'lz4', 'level': None, 'block_size': 128 * 1024},
+    {'comp': 'xz', 'level': None, 'block_size': 1024 * 1024},
+]
+
+TARGETS = ('load', 'size')
+
+SAMPLE_BYTES = 32 * 1024 * 1024  # Taille totale de l'échantillon
+SAMPLE_WINDOW = 1024 * 1024      # Taille d'une fenêtre d'échantillonnage
+DISK_RATE = 400 * 1024 * 1024    # Débit disque supposé (SSD) pour le modèle de chargement
+
+
+def profile_args(profile):
+    """Options mksquashfs d'un profil de compression"""
+    args = ['-comp', profile['comp']]
+    if profile['comp'] == 'zstd':
+        args += ['-Xcompression-level', str(profile['level'])]
+    elif profile['comp'] == 'lz4':
+        args += ['-Xhc']
+    return args + ['-b', str(profile['block_size'])]
+
+
+def compression_args(config):
+    """Options de compression d'une configuration de paquet (profil auto ou niveau zstd)"""
+    if config.get('profile'):
+        return profile_args(config['profile'])
+    return ['-comp', 'zstd', '-Xcompression-level', str(config['compression'])]
+
+
+def config_profile(config):
+    """Profil d'une configuration de paquet (niveau zstd seul : blocs par défaut de mksquashfs)"""
+    if config.get('profile'):
+        return config['profile']
+    return {'comp': 'zstd', 'level': config['compression'], 'block_size': 128 * 1024}
+
+
+def profile_label(profile):
+    """Description courte d'un profil (ex: zstd 15, blocs 128 KB)"""
+    name = profile['comp']
+    if profile['level'] is not None:
+        name += f" {profile['level']}"
+    return f"{name}, blocs {packbuild.format_size(profile['block_size'])}"
+
+
+class Trial:
+    """Mesures d'un profil sur l'échantillon"""
+
+    def __init__(self, profile, sample_size, packed_size, comp_time, decomp_time):
+        self.profile = profile
+        self.ratio = packed_size / max(1, sample_size)
+        self.comp_rate = sample_size / max(comp_time, 1e-6)      # octets source/s
+        self.decomp_rate = sample_size / max(decomp_time, 1e-6)  # octets source/s, 1 cœur
+
+    @property
+    def load_cost(self):
+        """Temps de lecture d'un octet source : lecture disque + décompression"""
+        return self.ratio / DISK_RATE + 1 / self.decomp_rate
+
+
+class TuneResult:
+    """Profil retenu et estimations pour le paquet complet"""
+
+    def __init__(self, best, trials, total_size, target):
+        self.best = best
+        self.trials = trials
+        self.total_size = total_size
+        self.target = target
+        self.predicted_size = int(total_size * best.ratio)
+        self.predicted_time = total_size / best.comp_rate
+
+    def describe(self):
+        """Résumé affichable avant de lancer la création"""
+        goal = "chargement le plus rapide" if self.target == 'load' else "fichier le plus petit"
+        return (f"Profil retenu ({goal}) : {profile_label(self.best.profile)}\n"
+                f"Taille estimée : {packbuild.format_size(self.total_size)} → "
+                f"{packbuild.format_size(self.predicted_size)} ({self.best.ratio:.0%})\n"
+                f"Durée estimée : {packbuild.format_duration(self.predicted_time)}\n"
+                f"Décompression : {packbuild.format_size(self.best.decomp_rate)}/s par cœur")
+
+
+def pick_best(trials, target):
+    """Choisit le meilleur essai selon l'objectif ('load' ou 'size')"""
+    if target == 'size':
+        # Plus petit ; à 1% près, le plus rapide à charger
+        smallest = min(t.ratio for t in trials)
+        candidates = [t for t in trials if t.ratio <= smallest * 1.01]
+        return min(candidates, key=lambda t: t.load_cost)
+    return min(trials, key=lambda t: (t.load_cost, t.ratio))
+
+
+def sample_plan(index, sample_bytes=SAMPLE_BYTES, window=SAMPLE_WINDOW, exclude_dirs=('__pycache__',)):
+    """Fenêtres (chemin relatif, offset, longueur) réparties uniformément sur les octets du jeu
+
+    Chaque fenêtre tombe à une position régulière du flux de tous les fichiers
+    mis bout à bout : les gros fichiers sont représentés en proportion de leur
+    poids dans le paquet final.
+    """
+    entries = [e for e in index.walk(exclude_dirs) if not e.is_symlink and e.size > 0]
+    total = sum(e.size for e in entries)
+    if total <= sample_bytes:
+        return [(e.rel_path, 0, e.size) for e in entries]
+
+    count = max(1, sample_bytes // window)
+    step = total / count
+    plan = []
+    position = 0
+    next_point = step / 2
+    for entry in entries:
+        end = position + entry.size
+        while next_point < end and len(plan) < count:
+            offset = int(next_point - position)
+            length = min(window, entry.size)
+            offset = max(0, min(offset, entry.size - length))
+            if not plan or plan[-1][:2] != (entry.rel_path, offset):
+                plan.append((entry.rel_path, offset, length))
+            next_point += step
+        position = end
+    return plan
+
+
+class Autotuner:
+    """Essaie les profils sur un échantillon du jeu et retient le meilleur
+
+    Args:
+        game_dir: dossier du jeu
+        target: 'load' (chargement le plus rapide) ou 'size' (fichier le plus petit)
+        index: GameIndex partagé (construit si None)
+        processors: cœurs alloués à mksquashfs pendant les essais (None = tous)
+        callback: fonction (percent, message) pour la progression
+    """
+
+    def __init__(self, game_dir, target='load', index=None, processors=None,
+                 profiles=None, sample_bytes=SAMPLE_BYTES, callback=None):
+        if target not in TARGETS:
+            raise ValueError(f"Objectif invalide: {target}")
+        self.game_dir = game_dir
+        self.target = target
+        self.index = index
+        self.processors = processors
+        self.profiles = profiles or PROFILES
+        self.sample_bytes = sample_bytes
+        self.callback = callback
+        self.cancelled = False
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self.cancelled = True
+        with self._lock:
+            if self._proc and self._proc.poll() is None:
+                self._proc.terminate()
+
+    def run(self):
+        """Lance les essais, retourne un TuneResult (None si annulé)"""
+        if self.index is None:
+            self.index = gameindex.GameIndex(self.game_dir)
+        else:
+            self.index.refresh()
+        total_size = self.index.total_size(exclude_dirs=['__pycache__'])
+
+        # Travailler en mémoire si possible : on mesure le codec, pas le disque
+        work_root = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        work_dir = tempfile.mkdtemp(prefix='packtune-', dir=work_root)
+        try:
+            self._emit(0, "Échantillonnage du jeu...")
+            sample_dir = os.path.join(work_dir, 'sample')
+            sample_size = self._extract_sample(sample_dir)
+            if sample_size == 0 or self.cancelled:
+                return None
+
+            trials = []
+            for i, profile in enumerate(self.profiles):
+                self._emit(5 + 95 * i // len(self.profiles),
+                           f"Essai {i + 1}/{len(self.profiles)} : {profile_label(profile)}")
+                trial = self._trial(profile, sample_dir, sample_size, work_dir)
+                if self.cancelled:
+                    return None
+                if trial is not None:
+                    trials.append(trial)
+            if not trials:
+                return None
+            self._emit(100, "Essais terminés")
+            return TuneResult(pick_best(trials, self.target), trials, total_size, self.target)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _emit(self, percent, message):
+        if self.callback:
+            self.callback(percent, message)
+
+    def _extract_sample(self, sample_dir):
+        """Copie les fenêtres de l'échantillon dans un dossier de travail"""
+        os.makedirs(sample_dir)
+        sample_size = 0
+        for i, (rel_path, offset, length) in enumerate(sample_plan(self.index, self.sample_bytes)):
+            try:
+                with open(os.path.join(self.game_dir, rel_path), 'rb') as src:
+                    src.seek(offset)
+                    data = src.read(length)
+            except OSError:
+                continue
+            # Garder l'extension : certains profils réagissent au type de contenu
+            name = f"{i:05d}{os.path.splitext(rel_path)[1][:16]}"
+            with open(os.path.join(sample_dir, name), 'wb') as dst:
+                dst.write(data)
+            sample_size += len(data)
+        return sample_size
+
+    def _run(self, cmd):
+        with self._lock:
+            if self.cancelled:
+                return -1
+            self._proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return self._proc.wait()
+
+    def _trial(self, profile, sample_dir, sample_size, work_dir):
+        image = os.path.join(work_dir, 'trial.sqfs')
+        extract_dir = os.path.join(work_dir, 'extract')
+        cmd = ['mksquashfs', sample_dir, image, '-noappend', '-no-progress', '-quiet']
+        cmd += profile_args(profile)
+        if self.processors:
+            cmd += ['-processors', str(self.processors)]
+        try:
+            start = time.monotonic()
+            if self._run(cmd) != 0:
+                return None
+            comp_time = time.monotonic() - start
+            packed_size = os.path.getsize(image)
+
+            # Un seul cœur : squashfuse décompresse les blocs au fil des lectures
+            start = time.monotonic()
+            if self._run(['unsquashfs', '-processors', '1', '-no-progress',
+                          '-f', '-d', extract_dir, image]) != 0:
+                return None
+            decomp_time = time.monotonic() - start
+        finally:
+            shutil.rmtree(extract_dir, ignore_errors=True)
+            if os.path.exists(image):
+                os.remove(image)
+        return Trial(profile, sample_size, packed_size, comp_time, decomp_time)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <dossier_du_jeu> [load|size]")
+        return 1
+
+    target = sys.argv[2] if len(sys.argv) > 2 else 'load'
+    try:
+        tuner = Autotuner(sys.argv[1], target,
+                          callback=lambda pct, msg: print(f"[{pct:3d}%] {msg}", file=sys.stderr))
+    except ValueError as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 1
+    result = tuner.run()
+    if result is None:
+        print("Erreur: aucun essai n'a abouti (mksquashfs/unsquashfs disponibles ?)", file=sys.stderr)
+        return 1
+
+    for trial in result.trials:
+        mark = '*' if trial is result.best else ' '
+        print(f"{mark} {profile_label(trial.profile):<24} ratio {trial.ratio:6.1%}  "
+              f"compression {packbuild.format_size(trial.comp_rate)}/s  "
+              f"décompression {packbuild.format_size(trial.decomp_rate)}/s")
+    print(result.describe())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
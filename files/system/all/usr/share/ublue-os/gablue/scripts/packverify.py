@@ -0,0 +1,310 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Verify - Vérification d'un paquet WGP/LGP, empreintes par fichier (sans Qt)
+
+Après la création, chaque fichier de l'image est relu (squashfsreader, une
+instance par thread) pendant que le fichier source correspondant est haché :
+les deux flux passent par un pool de threads avec des lectures de 4 Mo (le
+hachage et la décompression relâchent le GIL), les plus gros fichiers en
+premier. Les différences sont signalées et la liste des empreintes rejoint le
+manifeste en fin de paquet ('file_digests') : une vérification ultérieure
+(wgpcheck --verify) relit le paquet seul, sans les sources.
+
+Empreinte : BLAKE3 (module blake3) ou XXH3-128 (module xxhash) si
+disponibles, sinon blake2b (bibliothèque standard). L'algorithme est noté
+dans le manifeste. Un paquet sans liste d'empreintes est vérifié sur
+l'empreinte globale de son image.
+
+Usage: packverify.py <paquet.wgp|lgp> [dossier_du_jeu] [-workers N]
+"""
+
+import sys
+import os
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import packbuild
+import packmanifest
+import packvolumes
+import squashfsreader
+
+
+DIGEST_KEY = 'file_digests'
+READ_SIZE = 4 * 1024 * 1024
+MAX_WORKERS = 16
+MAX_REPORTED = 20  # Différences détaillées dans le message d'erreur
+
+
+def _hashers():
+    """Algorithmes disponibles, du plus rapide au plus lent"""
+    algorithms = {}
+    try:
+        import blake3
+        algorithms['blake3'] = blake3.blake3
+    except ImportError:
+        pass
+    try:
+        import xxhash
+        algorithms['xxh3_128'] = xxhash.xxh3_128
+    except ImportError:
+        pass
+    algorithms['blake2b'] = lambda: hashlib.blake2b(digest_size=16)
+    return algorithms
+
+
+HASHERS = _hashers()
+
+
+class VerifyError(Exception):
+    """Vérification impossible (algorithme indisponible, image illisible)"""
+
+
+def default_algorithm():
+    return next(iter(HASHERS))
+
+
+def default_workers():
+    return min(MAX_WORKERS, 2 * (os.cpu_count() or 2))
+
+
+def new_hash(algorithm):
+    try:
+        return HASHERS[algorithm]()
+    except KeyError:
+        raise VerifyError(f"Algorithme d'empreinte indisponible: {algorithm} "
+                          f"(module python3-{algorithm.split('_')[0]} requis)") from None
+
+
+class PackVerifier:
+    """Relit un paquet en parallèle et compare ses fichiers aux sources et/ou au manifeste
+
+    Args:
+        pack_file: paquet squashfs (ou index multi-volumes)
+        game_dir: dossier source ; les fichiers présents au même chemin sont comparés
+        algorithm: algorithme d'empreinte (défaut : le plus rapide disponible)
+        callback: fonction (pourcentage, message) pour la progression
+    """
+
+    def __init__(self, pack_file, game_dir=None, algorithm=None, workers=None, callback=None):
+        self.pack_file = pack_file
+        self.game_dir = game_dir
+        self.algorithm = algorithm or default_algorithm()
+        self.workers = workers or default_workers()
+        self.callback = callback
+        self.cancelled = False
+        self.digests = {}      # chemin -> empreinte (fichiers de l'image)
+        self.mismatches = []   # (chemin, raison)
+        self.files = 0
+        self.bytes = 0
+        self.source_files = 0
+        self.wall_time = 0.0
+        self._done = 0
+        self._total = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._images = []
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self, expected=None):
+        """Vérifie le paquet, retourne True si aucune différence
+
+        expected : {chemin: empreinte} attendu (liste du manifeste), comparé
+        dans les deux sens (fichiers modifiés, manquants ou en trop).
+        """
+        new_hash(self.algorithm)
+        start = time.monotonic()
+        try:
+            with squashfsreader.SquashfsImage(self.pack_file) as image:
+                files = sorted(((rel, node) for rel, node in image.walk() if node.is_file()),
+                               key=lambda item: -item[1].size)
+            sources = {rel: path for rel, path in
+                       ((rel, self._source_path(rel, node.size)) for rel, node in files) if path}
+            self.files = len(files)
+            self.bytes = sum(node.size for _rel, node in files)
+            self.source_files = len(sources)
+            self._total = self.bytes + sum(node.size for rel, node in files if rel in sources)
+
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                image_futures = [(rel, pool.submit(self._image_digest, rel, node))
+                                 for rel, node in files]
+                source_futures = {rel: pool.submit(self._source_digest, path)
+                                  for rel, path in sources.items()}
+                for rel, future in image_futures:
+                    self.digests[rel] = future.result()
+                source_digests = {rel: future.result() for rel, future in source_futures.items()}
+        except squashfsreader.SquashfsError as e:
+            raise VerifyError(str(e)) from None
+        finally:
+            for image in self._images:
+                image.close()
+            self._images = []
+            self.wall_time = time.monotonic() - start
+        if self.cancelled:
+            return False
+
+        for rel, digest in source_digests.items():
+            if self.digests[rel] is not None and digest != self.digests[rel]:
+                self.mismatches.append((rel, "différent de la source"))
+        if expected is not None:
+            for rel, digest in self.digests.items():
+                if rel not in expected:
+                    self.mismatches.append((rel, "absent du manifeste"))
+                elif digest is not None and digest != expected[rel]:
+                    self.mismatches.append((rel, "empreinte différente"))
+            for rel in expected.keys() - self.digests.keys():
+                self.mismatches.append((rel, "manquant dans l'image"))
+        self.mismatches.sort()
+        return not self.mismatches
+
+    def _source_path(self, rel_path, size):
+        """Fichier source comparable (même chemin, fichier ordinaire de même taille)"""
+        if self.game_dir is None:
+            return None
+        path = os.path.join(self.game_dir, rel_path)
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return None  # Fichier propre à l'image (pseudo-fichiers saves/extras/temps)
+        if not os.path.isfile(path) or os.path.islink(path):
+            return None
+        if st.st_size != size:
+            self.mismatches.append((rel_path, f"taille différente de la source "
+                                              f"({size} octets dans l'image, {st.st_size} en source)"))
+            return None
+        return path
+
+    def _image(self):
+        """Lecteur de l'image propre au thread (décompresseurs non partageables)"""
+        image = getattr(self._local, 'image', None)
+        if image is None:
+            image = squashfsreader.SquashfsImage(self.pack_file)
+            self._local.image = image
+            with self._lock:
+                self._images.append(image)
+        return image
+
+    def _image_digest(self, rel_path, node):
+        if self.cancelled:
+            return None
+        h = new_hash(self.algorithm)
+        try:
+            for block in self._image().iter_blocks(node):
+                h.update(block)
+                self._advance(len(block))
+                if self.cancelled:
+                    return None
+        except Exception as e:  # Bloc corrompu : erreur du décompresseur (zlib, lzma, zstd...)
+            with self._lock:
+                self.mismatches.append((rel_path, f"illisible dans l'image ({e})"))
+            return None
+        return h.hexdigest()
+
+    def _source_digest(self, path):
+        if self.cancelled:
+            return None
+        h = new_hash(self.algorithm)
+        buffer = bytearray(READ_SIZE)
+        view = memoryview(buffer)
+        with open(path, 'rb', buffering=0) as f:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            while n := f.readinto(buffer):
+                h.update(view[:n])
+                self._advance(n)
+                if self.cancelled:
+                    return None
+        return h.hexdigest()
+
+    def _advance(self, count):
+        with self._lock:
+            before = self._done * 100 // max(1, self._total)
+            self._done += count
+            percent = self._done * 100 // max(1, self._total)
+        if self.callback and percent != before:
+            self.callback(percent, f"Vérification... {percent}% — "
+                                   f"{packbuild.format_size(self._done)} relus")
+
+    def manifest_fields(self):
+        """Champs du manifeste : liste des empreintes de l'image"""
+        return {DIGEST_KEY: {'algorithm': self.algorithm, 'files': self.digests}}
+
+    def describe(self):
+        """Résumé affichable de la vérification"""
+        rate = self._done / self.wall_time if self.wall_time > 0 else 0
+        summary = (f"Vérification : {self.files} fichiers ({packbuild.format_size(self.bytes)}) relus, "
+                   f"{self.source_files} comparés aux sources, en "
+                   f"{packbuild.format_duration(self.wall_time)} ({packbuild.format_size(rate)}/s)")
+        if not self.mismatches:
+            return summary
+        lines = [f"{summary}\n{len(self.mismatches)} différence(s) :"]
+        lines += [f"  {rel} : {reason}" for rel, reason in self.mismatches[:MAX_REPORTED]]
+        if len(self.mismatches) > MAX_REPORTED:
+            lines.append(f"  ... et {len(self.mismatches) - MAX_REPORTED} autre(s)")
+        return '\n'.join(lines)
+
+
+def image_digest(pack_file, manifest):
+    """Empreinte globale de l'image (volumes compris), comparable à manifest['digest']"""
+    index = packvolumes.read_index(pack_file)
+    paths = packvolumes.volume_paths(pack_file, index) if index is not None else [pack_file]
+    h = hashlib.blake2b(digest_size=32)
+    remaining = manifest['image_size']
+    buffer = bytearray(READ_SIZE)
+    view = memoryview(buffer)
+    for path in paths:
+        with open(path, 'rb', buffering=0) as f:
+            while remaining > 0 and (n := f.readinto(view[:min(READ_SIZE, remaining)])):
+                h.update(view[:n])
+                remaining -= n
+    return 'blake2b:' + h.hexdigest()
+
+
+def verify_pack(pack_file, game_dir=None, workers=None, callback=None):
+    """Vérifie un paquet existant d'après son manifeste, retourne (ok, message)
+
+    ok vaut None si le manifeste ne porte aucune empreinte (paquet non vérifiable).
+    """
+    manifest = packmanifest.read_manifest(pack_file)
+    if manifest is None:
+        return False, "manifeste absent ou illisible"
+    listing = manifest.get(DIGEST_KEY)
+    if listing is None or manifest.get('format', 'squashfs') != 'squashfs':
+        if 'digest' not in manifest:
+            return None, "aucune empreinte dans le manifeste (créé sans vérification)"
+        # Paquet antérieur aux empreintes par fichier (ou EROFS) : image entière
+        if image_digest(pack_file, manifest) != manifest['digest']:
+            return False, "empreinte de l'image différente"
+        return True, "empreinte de l'image conforme"
+    verifier = PackVerifier(pack_file, game_dir, listing['algorithm'], workers, callback)
+    ok = verifier.run(expected=listing['files'])
+    return ok, verifier.describe()
+
+
+def main():
+    args = sys.argv[1:]
+    workers = None
+    if '-workers' in args:
+        i = args.index('-workers')
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+    if not args or len(args) > 2 or args[0] in ('-h', '--help'):
+        print(f"Usage: {sys.argv[0]} <paquet.wgp|lgp> [dossier_du_jeu] [-workers N]")
+        return 1
+    try:
+        ok, message = verify_pack(args[0], args[1] if len(args) > 1 else None, workers)
+    except (OSError, VerifyError, packvolumes.VolumeError) as e:
+        print(f"{args[0]} : erreur ({e})", file=sys.stderr)
+        return 2
+    if ok is None:
+        print(f"{args[0]} : non vérifiable — {message}")
+        return 0
+    print(f"{args[0]} : {'OK' if ok else 'ERREUR'} — {message}")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,367 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Pack Volumes - Paquets WGP/LGP découpés en volumes de taille fixe (sans Qt)
+
+Un gros paquet peut être découpé en volumes Jeu.wgp.001, Jeu.wgp.002... (clés
+USB en FAT32 limitées à 4 Go par fichier, copie volume par volume, volumes
+répartis sur plusieurs disques). Jeu.wgp devient alors un petit index :
+
+    GBPKVOL1\\n <json : taille totale, volumes (nom, taille)> \\n <manifeste en bloc final>
+
+Le manifeste reste lisible en fin de fichier (packmanifest) et squashfsreader
+lit les volumes comme une seule image. Au lancement, wgpconcat (FUSE) expose
+la concaténation des volumes comme un fichier image monté par squashfuse.
+Un volume peut être déplacé sur un autre disque et remplacé par un lien
+symbolique, ou listé par chemin absolu dans l'index.
+
+Redécouper un paquet déjà découpé écrit une nouvelle génération de volumes
+(Jeu.wgp.g1.001, Jeu.wgp.g2.001...) à côté de l'ancienne : l'ancien index
+reste valide jusqu'au remplacement par le nouveau, et l'ancienne génération
+n'est supprimée qu'ensuite.
+
+Usage: packvolumes.py <index.wgp|lgp>                 (chemins des volumes, un par ligne)
+       packvolumes.py split <paquet.wgp|lgp> <taille>  (ex: 4000M, fat32)
+       packvolumes.py join <index.wgp|lgp> <image>
+"""
+
+import sys
+import os
+import json
+import mmap
+import re
+
+import packbuild
+import packmanifest
+
+
+INDEX_MAGIC = b'GBPKVOL1\n'
+INDEX_VERSION = 1
+INDEX_READ = 64 * 1024
+COPY_CHUNK = 64 * 1024 * 1024
+FAT32_MAX = 4 * 1024 * 1024 * 1024 - 1  # Taille maximale d'un fichier en FAT32
+
+
+class VolumeError(Exception):
+    """Index de volumes invalide ou volume manquant"""
+
+
+def parse_size(value):
+    """Convertit une taille de volume (ex: 4000M, 2G, fat32) en octets"""
+    if str(value).strip().lower() == 'fat32':
+        return FAT32_MAX
+    m = re.fullmatch(r'\s*(\d+)\s*([KMG]?)B?\s*', str(value), re.IGNORECASE)
+    if not m:
+        raise ValueError(f"Taille de volume invalide: {value}")
+    size = int(m.group(1)) * {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}[m.group(2).upper()]
+    if size < 1024 * 1024:
+        raise ValueError(f"Taille de volume trop petite: {value}")
+    return size
+
+
+def volume_name(pack_file, number, generation=0):
+    base = os.path.basename(pack_file)
+    if generation:
+        return f"{base}.g{generation}.{number:03d}"
+    return f"{base}.{number:03d}"
+
+
+def is_index(path):
+    """True si le fichier est un index de volumes"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(INDEX_MAGIC)) == INDEX_MAGIC
+    except OSError:
+        return False
+
+
+def read_index(path):
+    """Index d'un paquet multi-volumes (dict), None si le paquet n'est pas découpé"""
+    with open(path, 'rb') as f:
+        head = f.read(INDEX_READ)
+    if not head.startswith(INDEX_MAGIC):
+        return None
+    end = head.find(b'\n', len(INDEX_MAGIC))
+    if end < 0:
+        raise VolumeError(f"Index de volumes tronqué: {path}")
+    try:
+        return json.loads(head[len(INDEX_MAGIC):end].decode('utf-8'))
+    except ValueError as e:
+        raise VolumeError(f"Index de volumes invalide: {path} ({e})") from None
+
+
+def pack_size(path):
+    """Taille d'un paquet, volumes compris"""
+    index = read_index(path)
+    return index['size'] if index is not None else os.path.getsize(path)
+
+
+def volume_paths(path, index=None, check=True):
+    """Chemins des volumes d'un index (relatifs au dossier de l'index ou absolus)
+
+    Avec check, vérifie la présence et la taille de chaque volume (VolumeError).
+    """
+    index = index or read_index(path)
+    if index is None:
+        raise VolumeError(f"Paquet non découpé: {path}")
+    directory = os.path.dirname(os.path.abspath(path))
+    paths = []
+    for volume in index['volumes']:
+        volume_path = os.path.join(directory, volume['name'])
+        if check:
+            try:
+                size = os.path.getsize(volume_path)
+            except OSError:
+                raise VolumeError(f"Volume manquant: {volume_path}") from None
+            if size != volume['size']:
+                raise VolumeError(f"Taille inattendue pour {volume_path}: "
+                                  f"{size} au lieu de {volume['size']}")
+        paths.append(volume_path)
+    return paths
+
+
+def _copy_range(src, dst, offset, length):
+    """Recopie une plage d'un fichier vers un autre (côté noyau si possible)"""
+    end = offset + length
+    while offset < end:
+        count = min(COPY_CHUNK, end - offset)
+        try:
+            n = os.copy_file_range(src, dst, count, offset)
+        except (AttributeError, OSError):
+            n = 0
+        if n <= 0:
+            data = os.pread(src, count, offset)
+            if not data:
+                raise VolumeError("Paquet tronqué pendant le découpage")
+            n = os.write(dst, data)
+        offset += n
+
+
+def current_volumes(pack_file):
+    """Volumes référencés par l'index actuel du paquet (liste vide sinon)"""
+    try:
+        index = read_index(pack_file)
+    except (OSError, VolumeError):
+        return []
+    return volume_paths(pack_file, index, check=False) if index is not None else []
+
+
+def remove_volumes(pack_file, old_volumes=()):
+    """Supprime les volumes que l'index actuel ne référence plus
+
+    old_volumes : volumes de l'index remplacé (éventuellement hors du dossier),
+    relevés avant le remplacement. Les restes d'un découpage interrompu
+    (Jeu.wgp.NNN, Jeu.wgp.gN.NNN) sont supprimés aussi.
+    """
+    directory = os.path.dirname(os.path.abspath(pack_file))
+    keep = set(current_volumes(pack_file))
+    pattern = re.compile(re.escape(os.path.basename(pack_file)) + r'\.(g\d+\.)?\d{3}')
+    stale = [os.path.join(directory, name) for name in os.listdir(directory)
+             if pattern.fullmatch(name)]
+    for path in dict.fromkeys(stale + list(old_volumes)):
+        if path not in keep and os.path.lexists(path):
+            os.remove(path)
+
+
+def _fsync_dir(directory):
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def split(build_file, pack_file, volume_size):
+    """Découpe une image (image + manifeste final) en volumes indexés par pack_file
+
+    build_file : image construite à côté du paquet (.partial), dont les volumes
+    sont détachés depuis la fin par troncature (l'espace disque au pic ne
+    dépasse l'image que d'un volume), ou le paquet lui-même, alors recopié.
+    Les volumes sont écrits sous des noms temporaires et synchronisés, puis
+    renommés sous les noms d'une nouvelle génération que seul le nouvel index
+    référence. L'index remplace le paquet en dernier et les volumes de l'ancien
+    ne sont supprimés qu'après : une interruption laisse toujours l'ancien
+    paquet lisible. Retourne le nombre de volumes (1 : image non découpée).
+    """
+    in_place = os.path.abspath(build_file) == os.path.abspath(pack_file)
+    if in_place and is_index(pack_file):
+        raise VolumeError(f"Paquet déjà découpé: {pack_file}")
+    old_volumes = current_volumes(pack_file)
+    total_size = os.path.getsize(build_file)
+    if total_size <= volume_size:
+        if not in_place:
+            packbuild.commit_pack(build_file, pack_file)
+        remove_volumes(pack_file, old_volumes)
+        return 1
+    manifest = packmanifest.read_manifest(build_file)
+    count = (total_size + volume_size - 1) // volume_size
+    directory = os.path.dirname(os.path.abspath(pack_file))
+    # Première découpe : noms simples ; ensuite, génération suivant celle de l'index remplacé
+    old_index = read_index(pack_file) if old_volumes else None
+    generation = old_index.get('generation', 0) + 1 if old_index is not None else 0
+    temps = {}  # Numéro -> volume temporaire pas encore renommé
+
+    try:
+        src = os.open(build_file, os.O_RDONLY if in_place else os.O_RDWR)
+        try:
+            size = total_size
+            for number in range(count, 0 if in_place else 1, -1):
+                start = (number - 1) * volume_size
+                temps[number] = packbuild.partial_path(
+                    os.path.join(directory, volume_name(pack_file, number, generation)))
+                dst = os.open(temps[number], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    _copy_range(src, dst, start, size - start)
+                    os.fsync(dst)
+                finally:
+                    os.close(dst)
+                if not in_place:
+                    os.ftruncate(src, start)
+                size = start
+            if not in_place:
+                os.fsync(src)
+        finally:
+            os.close(src)
+        if not in_place:
+            # Reste de l'image : premier volume
+            temps[1] = packbuild.partial_path(
+                os.path.join(directory, volume_name(pack_file, 1, generation)))
+            os.replace(build_file, temps[1])
+        for number in sorted(temps):
+            os.replace(temps.pop(number),
+                       os.path.join(directory, volume_name(pack_file, number, generation)))
+    finally:
+        for path in temps.values():
+            if os.path.exists(path):
+                os.remove(path)
+    _fsync_dir(directory)
+
+    volumes = [{'name': volume_name(pack_file, number, generation),
+                'size': min(volume_size, total_size - (number - 1) * volume_size)}
+               for number in range(1, count + 1)]
+    index = {'version': INDEX_VERSION, 'size': total_size, 'volume_size': volume_size,
+             'generation': generation, 'volumes': volumes}
+    # Nom de build_file libéré par le renommage du premier volume
+    index_file = packbuild.partial_path(pack_file) if in_place else build_file
+    try:
+        with open(index_file, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            f.write(json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+            f.write(b'\n')
+        if manifest is not None:
+            # Manifeste de l'image entière, recopié tel quel
+            manifest['volumes'] = count
+            packmanifest.append_trailer(index_file, manifest, measure=False)
+        packbuild.commit_pack(index_file, pack_file)
+    finally:
+        if os.path.exists(index_file):
+            os.remove(index_file)
+    remove_volumes(pack_file, old_volumes)
+    return count
+
+
+def commit(build_file, pack_file, volume_size=None):
+    """Remplace le paquet par l'image construite, découpée si volume_size est donné
+
+    Retourne le nombre de volumes. Les volumes d'un découpage précédent sont
+    supprimés une fois le nouveau paquet en place.
+    """
+    if volume_size:
+        return split(build_file, pack_file, volume_size)
+    old_volumes = current_volumes(pack_file)
+    packbuild.commit_pack(build_file, pack_file)
+    remove_volumes(pack_file, old_volumes)
+    return 1
+
+
+def join(path, output):
+    """Reconstitue l'image d'un paquet multi-volumes dans un seul fichier"""
+    with open(output, 'wb') as dst:
+        for volume_path in volume_paths(path):
+            src = os.open(volume_path, os.O_RDONLY)
+            try:
+                _copy_range(src, dst.fileno(), 0, os.fstat(src).st_size)
+            finally:
+                os.close(src)
+
+
+class VolumeView:
+    """Volumes projetés en mémoire, lus comme un seul tampon (tranches uniquement)"""
+
+    def __init__(self, paths):
+        self._files = []
+        self._maps = []
+        self._starts = []
+        position = 0
+        try:
+            for path in paths:
+                f = open(path, 'rb')
+                self._files.append(f)
+                self._maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                self._starts.append(position)
+                position += len(self._maps[-1])
+        except (OSError, ValueError):
+            self.close()
+            raise
+        self._size = position
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("VolumeView : accès par tranche uniquement")
+        start, stop, _step = key.indices(self._size)
+        out = bytearray()
+        number = 0
+        while number + 1 < len(self._starts) and self._starts[number + 1] <= start:
+            number += 1
+        while start < stop and number < len(self._maps):
+            local = start - self._starts[number]
+            chunk = self._maps[number][local:local + (stop - start)]
+            out += chunk
+            start += len(chunk)
+            number += 1
+        return bytes(out)
+
+    def close(self):
+        for m in self._maps:
+            m.close()
+        for f in self._files:
+            f.close()
+        self._maps, self._files = [], []
+
+
+def main():
+    usage = (f"Usage: {sys.argv[0]} <index.wgp|lgp>\n"
+             f"       {sys.argv[0]} split <paquet.wgp|lgp> <taille>\n"
+             f"       {sys.argv[0]} join <index.wgp|lgp> <image>")
+    args = sys.argv[1:]
+    if not args or args[0] in ('-h', '--help'):
+        print(usage)
+        return 1
+    try:
+        if args[0] == 'split' and len(args) == 3:
+            count = split(args[1], args[1], parse_size(args[2]))
+            print(f"{count} volume(s)")
+            return 0
+        if args[0] == 'join' and len(args) == 3:
+            join(args[1], args[2])
+            return 0
+        if len(args) != 1:
+            print(usage, file=sys.stderr)
+            return 1
+        # Code 1 : paquet non découpé, code 2 : index invalide ou volume manquant
+        index = read_index(args[0])
+        if index is None:
+            return 1
+        for path in volume_paths(args[0], index):
+            print(path)
+        return 0
+    except (OSError, ValueError, VolumeError) as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
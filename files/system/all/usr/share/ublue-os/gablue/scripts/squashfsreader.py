@@ -0,0 +1,599 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Squashfs Reader - Lecture directe des paquets WGP/LGP en Python (sans unsquashfs ni FUSE)
+
+Analyse le superbloc, la table des inodes et la table des répertoires d'une
+image squashfs 4.0 et ne décompresse que les blocs de métadonnées et de données
+nécessaires au chemin demandé. Le fichier est projeté en mémoire (mmap) : les
+métadonnées souvent lues restent dans le cache de pages du noyau.
+
+Compressions : gzip, xz, lzma (bibliothèque standard), lz4 (module lz4 ou
+décodeur intégré), zstd (module zstandard, ou compression.zstd de Python 3.14).
+
+Usage: squashfsreader.py <paquet> ls [chemin]
+       squashfsreader.py <paquet> cat <chemin>
+       squashfsreader.py <paquet> stat <chemin>
+"""
+
+import sys
+import io
+import lzma
+import mmap
+import posixpath
+import stat
+import struct
+import zlib
+
+import packvolumes
+
+
+SQUASHFS_MAGIC = 0x73717368
+
+COMP_GZIP, COMP_LZMA, COMP_LZO, COMP_XZ, COMP_LZ4, COMP_ZSTD = 1, 2, 3, 4, 5, 6
+COMPRESSION_NAMES = {COMP_GZIP: 'gzip', COMP_LZMA: 'lzma', COMP_LZO: 'lzo',
+                     COMP_XZ: 'xz', COMP_LZ4: 'lz4', COMP_ZSTD: 'zstd'}
+
+# Types d'inodes (basiques puis étendus)
+T_DIR, T_FILE, T_SYMLINK, T_BLKDEV, T_CHRDEV, T_FIFO, T_SOCKET = 1, 2, 3, 4, 5, 6, 7
+T_LDIR, T_LFILE, T_LSYMLINK, T_LBLKDEV, T_LCHRDEV, T_LFIFO, T_LSOCKET = 8, 9, 10, 11, 12, 13, 14
+
+_TYPE_MODES = {
+    T_DIR: stat.S_IFDIR, T_LDIR: stat.S_IFDIR,
+    T_FILE: stat.S_IFREG, T_LFILE: stat.S_IFREG,
+    T_SYMLINK: stat.S_IFLNK, T_LSYMLINK: stat.S_IFLNK,
+    T_BLKDEV: stat.S_IFBLK, T_LBLKDEV: stat.S_IFBLK,
+    T_CHRDEV: stat.S_IFCHR, T_LCHRDEV: stat.S_IFCHR,
+    T_FIFO: stat.S_IFIFO, T_LFIFO: stat.S_IFIFO,
+    T_SOCKET: stat.S_IFSOCK, T_LSOCKET: stat.S_IFSOCK,
+}
+
+_SUPERBLOCK = struct.Struct('<IIIIIHHHHHHQQQQQQQQ')
+_INODE_HEADER = struct.Struct('<HHHHII')
+_DIR_HEADER = struct.Struct('<III')
+_DIR_ENTRY = struct.Struct('<HhHH')
+_FRAGMENT_ENTRY = struct.Struct('<QII')
+
+FLAG_COMP_OPT = 0x0400    # Options du compresseur stockées après le superbloc
+# Niveaux par défaut de mksquashfs (options absentes de l'image)
+DEFAULT_LEVELS = {COMP_GZIP: 9, COMP_ZSTD: 15}
+
+METADATA_SIZE = 8192
+METADATA_UNCOMPRESSED = 0x8000
+DATA_UNCOMPRESSED = 1 << 24
+NO_FRAGMENT = 0xFFFFFFFF
+MAX_SYMLINK_DEPTH = 40
+
+
+class SquashfsError(Exception):
+    """Image squashfs invalide ou non prise en charge"""
+
+
+# --- Décompression ---
+
+def _lz4_block_decompress(src, max_size):
+    """Décodeur LZ4 (format bloc brut, utilisé par squashfs) en Python pur"""
+    dst = bytearray()
+    i = 0
+    n = len(src)
+    while i < n:
+        token = src[i]
+        i += 1
+        length = token >> 4
+        if length == 15:
+            while True:
+                b = src[i]
+                i += 1
+                length += b
+                if b != 255:
+                    break
+        dst += src[i:i + length]
+        i += length
+        if i >= n:
+            break
+        offset = src[i] | (src[i + 1] << 8)
+        i += 2
+        if offset == 0 or offset > len(dst):
+            raise SquashfsError("lz4: décalage invalide")
+        match = token & 15
+        if match == 15:
+            while True:
+                b = src[i]
+                i += 1
+                match += b
+                if b != 255:
+                    break
+        match += 4
+        start = len(dst) - offset
+        if match <= offset:
+            dst += dst[start:start + match]
+        else:
+            # Recopie chevauchante (motif répété)
+            for k in range(match):
+                dst.append(dst[start + k])
+        if len(dst) > max_size:
+            raise SquashfsError("lz4: bloc trop grand")
+    return bytes(dst)
+
+
+def _make_decompressor(compression):
+    """Fonction (données, taille max) -> données décompressées"""
+    if compression == COMP_GZIP:
+        return lambda data, size: zlib.decompress(data)
+    if compression == COMP_XZ:
+        return lambda data, size: lzma.decompress(data, format=lzma.FORMAT_XZ)
+    if compression == COMP_LZMA:
+        return lambda data, size: lzma.decompress(data, format=lzma.FORMAT_ALONE)
+    if compression == COMP_LZ4:
+        try:
+            import lz4.block
+            return lambda data, size: lz4.block.decompress(data, uncompressed_size=size)
+        except ImportError:
+            return _lz4_block_decompress
+    if compression == COMP_ZSTD:
+        try:
+            import zstandard
+            dctx = zstandard.ZstdDecompressor()
+            return lambda data, size: dctx.decompress(data, max_output_size=size)
+        except ImportError:
+            pass
+        try:
+            from compression import zstd
+            return lambda data, size: zstd.decompress(data)
+        except ImportError:
+            pass
+        raise SquashfsError("zstd: module python3-zstandard requis")
+    raise SquashfsError(f"Compression non prise en charge: "
+                        f"{COMPRESSION_NAMES.get(compression, compression)}")
+
+
+# --- Inodes ---
+
+class SquashfsInode:
+    """Inode d'une image squashfs (sous-ensemble utile de stat)"""
+    __slots__ = ('ref', 'type', 'mode', 'uid', 'gid', 'mtime', 'inode_number', 'nlink',
+                 'size', 'blocks_start', 'block_sizes', 'fragment', 'fragment_offset',
+                 'dir_block', 'dir_offset', 'dir_size', 'target', 'rdev')
+
+    def __init__(self, ref, header, uid, gid):
+        itype, perms, _uid_idx, _gid_idx, mtime, inode_number = header
+        self.ref = ref
+        self.type = itype
+        self.mode = _TYPE_MODES.get(itype, 0) | perms
+        self.uid = uid
+        self.gid = gid
+        self.mtime = mtime
+        self.inode_number = inode_number
+        self.nlink = 1
+        self.size = 0
+        self.blocks_start = 0
+        self.block_sizes = ()
+        self.fragment = NO_FRAGMENT
+        self.fragment_offset = 0
+        self.dir_block = 0
+        self.dir_offset = 0
+        self.dir_size = 0
+        self.target = None
+        self.rdev = 0
+
+    def is_dir(self):
+        return stat.S_ISDIR(self.mode)
+
+    def is_file(self):
+        return stat.S_ISREG(self.mode)
+
+    def is_symlink(self):
+        return stat.S_ISLNK(self.mode)
+
+
+class SquashfsImage:
+    """Image squashfs ouverte en lecture (mmap)
+
+    Args:
+        path: chemin du paquet .wgp/.lgp (les données après l'image sont ignorées)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        if packvolumes.is_index(path):
+            # Paquet multi-volumes : les volumes sont lus comme une seule image
+            try:
+                self._mm = packvolumes.VolumeView(packvolumes.volume_paths(path))
+            except packvolumes.VolumeError as e:
+                raise SquashfsError(str(e)) from None
+        else:
+            self._file = open(path, 'rb')
+            try:
+                self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                self._file.close()
+                raise SquashfsError(f"Fichier vide: {path}")
+        try:
+            self._read_superblock()
+            self._decompress = _make_decompressor(self.compression)
+        except Exception:
+            self.close()
+            raise
+        self._metadata_cache = {}  # position -> (données, position suivante)
+        self._dir_cache = {}       # ref d'inode -> {nom: ref}
+        self._inode_cache = {}     # ref -> SquashfsInode
+        self._fragments = None
+        self._ids = None
+
+    def close(self):
+        if getattr(self, '_mm', None) is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Structures de bas niveau ---
+
+    def _read_superblock(self):
+        if len(self._mm) < _SUPERBLOCK.size:
+            raise SquashfsError("Image trop petite")
+        (magic, self.inode_count, self.mkfs_time, self.block_size, self.fragment_count,
+         self.compression, self.block_log, self.flags, self.id_count, major, minor,
+         self.root_inode, self.bytes_used, self.id_table, _xattr_table, self.inode_table,
+         self.directory_table, self.fragment_table, _export_table) = _SUPERBLOCK.unpack(
+            self._mm[0:_SUPERBLOCK.size])
+        if magic != SQUASHFS_MAGIC:
+            raise SquashfsError("Ce n'est pas une image squashfs")
+        if (major, minor) != (4, 0):
+            raise SquashfsError(f"Version squashfs non prise en charge: {major}.{minor}")
+        if self.bytes_used > len(self._mm):
+            raise SquashfsError("Image tronquée")
+
+    @property
+    def compression_name(self):
+        return COMPRESSION_NAMES.get(self.compression, str(self.compression))
+
+    @property
+    def compression_level(self):
+        """Niveau gzip/zstd de l'image (None pour les autres compressions)"""
+        level = DEFAULT_LEVELS.get(self.compression)
+        if level is not None and self.flags & FLAG_COMP_OPT:
+            # Bloc d'options toujours stocké non compressé, juste après le superbloc
+            level = struct.unpack('<I', self._mm[_SUPERBLOCK.size + 2:_SUPERBLOCK.size + 6])[0]
+        return level
+
+    def _metadata_block(self, pos):
+        """Bloc de métadonnées à une position absolue : (données, position suivante)"""
+        cached = self._metadata_cache.get(pos)
+        if cached is not None:
+            return cached
+        header = struct.unpack('<H', self._mm[pos:pos + 2])[0]
+        size = header & ~METADATA_UNCOMPRESSED
+        raw = self._mm[pos + 2:pos + 2 + size]
+        data = raw if header & METADATA_UNCOMPRESSED else self._decompress(raw, METADATA_SIZE)
+        cached = (data, pos + 2 + size)
+        self._metadata_cache[pos] = cached
+        return cached
+
+    def _read_metadata(self, pos, offset, length):
+        """Lit length octets de métadonnées à partir de (bloc, décalage), à cheval sur les blocs
+
+        Returns:
+            (données, position du bloc suivant, décalage suivant)
+        """
+        out = bytearray()
+        while True:
+            data, next_pos = self._metadata_block(pos)
+            chunk = data[offset:offset + length - len(out)]
+            out += chunk
+            offset += len(chunk)
+            if len(out) >= length:
+                return bytes(out), pos, offset
+            pos, offset = next_pos, 0
+
+    def _lookup_table(self, table_start, entry_size, count):
+        """Lit une table indexée (ids, fragments) : liste de pointeurs puis blocs"""
+        if count == 0:
+            return b''
+        total = entry_size * count
+        blocks = (total + METADATA_SIZE - 1) // METADATA_SIZE
+        pointers = struct.unpack(f'<{blocks}Q', self._mm[table_start:table_start + blocks * 8])
+        out = bytearray()
+        for pointer in pointers:
+            out += self._metadata_block(pointer)[0]
+        return bytes(out[:total])
+
+    def _id(self, index):
+        if self._ids is None:
+            raw = self._lookup_table(self.id_table, 4, self.id_count)
+            self._ids = struct.unpack(f'<{self.id_count}I', raw)
+        return self._ids[index] if index < len(self._ids) else 0
+
+    def _fragment(self, index):
+        if self._fragments is None:
+            self._fragments = self._lookup_table(self.fragment_table, _FRAGMENT_ENTRY.size,
+                                                 self.fragment_count)
+        if index >= self.fragment_count:
+            raise SquashfsError(f"Fragment invalide: {index}")
+        start, size, _unused = _FRAGMENT_ENTRY.unpack_from(self._fragments, index * _FRAGMENT_ENTRY.size)
+        return start, size
+
+    # --- Inodes et répertoires ---
+
+    def inode(self, ref):
+        """Inode à partir d'une référence (bloc << 16 | décalage)"""
+        cached = self._inode_cache.get(ref)
+        if cached is not None:
+            return cached
+        pos = self.inode_table + (ref >> 16)
+        offset = ref & 0xFFFF
+        raw, pos, offset = self._read_metadata(pos, offset, _INODE_HEADER.size)
+        header = _INODE_HEADER.unpack(raw)
+        node = SquashfsInode(ref, header, self._id(header[2]), self._id(header[3]))
+        itype = header[0]
+
+        def take(fmt):
+            nonlocal pos, offset
+            st = struct.Struct(fmt)
+            data, pos, offset = self._read_metadata(pos, offset, st.size)
+            return st.unpack(data)
+
+        if itype == T_DIR:
+            node.dir_block, node.nlink, node.dir_size, node.dir_offset, _parent = take('<IIHHI')
+        elif itype == T_LDIR:
+            (node.nlink, node.dir_size, node.dir_block, _parent, _index_count,
+             node.dir_offset, _xattr) = take('<IIIIHHI')
+        elif itype in (T_FILE, T_LFILE):
+            if itype == T_FILE:
+                node.blocks_start, node.fragment, node.fragment_offset, node.size = take('<IIII')
+            else:
+                (node.blocks_start, node.size, _sparse, node.nlink, node.fragment,
+                 node.fragment_offset, _xattr) = take('<QQQIIII')
+            if node.fragment == NO_FRAGMENT:
+                count = (node.size + self.block_size - 1) // self.block_size
+            else:
+                count = node.size // self.block_size
+            if count:
+                data, pos, offset = self._read_metadata(pos, offset, 4 * count)
+                node.block_sizes = struct.unpack(f'<{count}I', data)
+        elif itype in (T_SYMLINK, T_LSYMLINK):
+            node.nlink, target_size = take('<II')
+            data, pos, offset = self._read_metadata(pos, offset, target_size)
+            node.target = data.decode('utf-8', errors='surrogateescape')
+            node.size = target_size
+        elif itype in (T_BLKDEV, T_CHRDEV, T_LBLKDEV, T_LCHRDEV):
+            node.nlink, node.rdev = take('<II')
+        elif itype in (T_FIFO, T_SOCKET, T_LFIFO, T_LSOCKET):
+            node.nlink, = take('<I')
+        else:
+            raise SquashfsError(f"Type d'inode inconnu: {itype}")
+        self._inode_cache[ref] = node
+        return node
+
+    def _entries(self, node):
+        """Entrées d'un répertoire : {nom: ref d'inode}"""
+        cached = self._dir_cache.get(node.ref)
+        if cached is not None:
+            return cached
+        entries = {}
+        # dir_size compte 3 octets de plus que la liste (entrées . et ..)
+        remaining = node.dir_size - 3
+        pos = self.directory_table + node.dir_block
+        offset = node.dir_offset
+        while remaining > 0:
+            raw, pos, offset = self._read_metadata(pos, offset, _DIR_HEADER.size)
+            count, start, _base = _DIR_HEADER.unpack(raw)
+            remaining -= _DIR_HEADER.size
+            for _ in range(count + 1):
+                raw, pos, offset = self._read_metadata(pos, offset, _DIR_ENTRY.size)
+                entry_offset, _delta, _type, name_size = _DIR_ENTRY.unpack(raw)
+                name, pos, offset = self._read_metadata(pos, offset, name_size + 1)
+                remaining -= _DIR_ENTRY.size + name_size + 1
+                entries[name.decode('utf-8', errors='surrogateescape')] = (start << 16) | entry_offset
+        self._dir_cache[node.ref] = entries
+        return entries
+
+    def _resolve(self, path, follow_symlinks=True, depth=0):
+        """Inode d'un chemin (relatif à la racine de l'image)"""
+        if depth > MAX_SYMLINK_DEPTH:
+            raise OSError(f"Trop de niveaux de liens symboliques: {path}")
+        parts = [p for p in path.strip('/').split('/') if p and p != '.']
+        node = self.inode(self.root_inode)
+        resolved = []
+        for i, name in enumerate(parts):
+            if name == '..':
+                resolved = resolved[:-1]
+                node = self._resolve('/'.join(resolved), True, depth + 1)
+                continue
+            if not node.is_dir():
+                raise NotADirectoryError(f"Pas un dossier: {'/'.join(resolved)}")
+            ref = self._entries(node).get(name)
+            if ref is None:
+                raise FileNotFoundError(f"Introuvable dans le paquet: {path}")
+            node = self.inode(ref)
+            last = i == len(parts) - 1
+            if node.is_symlink() and (follow_symlinks or not last):
+                if node.target.startswith('/'):
+                    raise FileNotFoundError(f"Lien hors du paquet: {path} -> {node.target}")
+                target = posixpath.normpath(posixpath.join('/'.join(resolved), node.target))
+                node = self._resolve(target, True, depth + 1)
+                resolved = [p for p in target.split('/') if p and p != '.']
+            else:
+                resolved.append(name)
+        return node
+
+    # --- API publique ---
+
+    def stat(self, path, follow_symlinks=True):
+        """Inode d'un chemin (FileNotFoundError si absent)"""
+        return self._resolve(path, follow_symlinks)
+
+    def exists(self, path):
+        try:
+            self._resolve(path)
+            return True
+        except OSError:
+            return False
+
+    def listdir(self, path=''):
+        """Noms contenus dans un dossier (ordre squashfs, trié)"""
+        node = self._resolve(path)
+        if not node.is_dir():
+            raise NotADirectoryError(f"Pas un dossier: {path}")
+        return list(self._entries(node))
+
+    def readlink(self, path):
+        node = self._resolve(path, follow_symlinks=False)
+        if not node.is_symlink():
+            raise OSError(f"Pas un lien symbolique: {path}")
+        return node.target
+
+    def walk(self, path=''):
+        """Parcourt l'image : (chemin relatif, inode) pour chaque entrée, en profondeur"""
+        start = self._resolve(path)
+        stack = [(path.strip('/'), start)]
+        while stack:
+            base, node = stack.pop()
+            children = []
+            for name, ref in self._entries(node).items():
+                child = self.inode(ref)
+                rel_path = f"{base}/{name}" if base else name
+                yield rel_path, child
+                if child.is_dir():
+                    children.append((rel_path, child))
+            stack.extend(reversed(children))
+
+    def read(self, path, offset=0, size=None):
+        """Contenu d'un fichier (ou d'une plage), en ne décompressant que les blocs utiles"""
+        node = self._resolve(path)
+        if not node.is_file():
+            raise IsADirectoryError(f"Pas un fichier: {path}")
+        return self.read_inode(node, offset, size)
+
+    def read_inode(self, node, offset=0, size=None):
+        end = node.size if size is None else min(node.size, offset + size)
+        if offset >= end:
+            return b''
+        bs = self.block_size
+        out = bytearray()
+        first = offset // bs
+        last = (end - 1) // bs
+
+        # Position sur disque du premier bloc utile
+        pos = node.blocks_start
+        for i in range(first):
+            pos += node.block_sizes[i] & ~DATA_UNCOMPRESSED
+
+        for i in range(first, last + 1):
+            if i < len(node.block_sizes):
+                block = self._data_block(pos, node.block_sizes[i],
+                                         min(bs, node.size - i * bs))
+                pos += node.block_sizes[i] & ~DATA_UNCOMPRESSED
+            else:
+                block = self._fragment_data(node)
+            lo = offset - i * bs if i == first else 0
+            hi = end - i * bs if i == last else len(block)
+            out += block[lo:hi]
+        return bytes(out)
+
+    def iter_blocks(self, node):
+        """Blocs décompressés d'un fichier, dans l'ordre (lecture séquentielle)"""
+        bs = self.block_size
+        pos = node.blocks_start
+        for i, size_field in enumerate(node.block_sizes):
+            yield self._data_block(pos, size_field, min(bs, node.size - i * bs))
+            pos += size_field & ~DATA_UNCOMPRESSED
+        if node.size > len(node.block_sizes) * bs:
+            yield self._fragment_data(node)
+
+    def open(self, path):
+        """Fichier de l'image ouvert en lecture séquentielle (objet fichier binaire)"""
+        node = self._resolve(path)
+        if not node.is_file():
+            raise IsADirectoryError(f"Pas un fichier: {path}")
+        return io.BufferedReader(SquashfsFile(self, node), buffer_size=self.block_size)
+
+    def fragment_block(self, index):
+        """Bloc de fragments tel que stocké : (position, champ de taille brut)"""
+        return self._fragment(index)
+
+    def compression_options(self):
+        """Bloc d'options du compresseur tel que stocké (en-tête inclus), b'' si absent"""
+        if not self.flags & FLAG_COMP_OPT:
+            return b''
+        header = struct.unpack('<H', self._mm[_SUPERBLOCK.size:_SUPERBLOCK.size + 2])[0]
+        return self._mm[_SUPERBLOCK.size:_SUPERBLOCK.size + 2 + (header & ~METADATA_UNCOMPRESSED)]
+
+    def _data_block(self, pos, size_field, expected):
+        on_disk = size_field & ~DATA_UNCOMPRESSED
+        if on_disk == 0:
+            return bytes(expected)  # Bloc creux (sparse)
+        raw = self._mm[pos:pos + on_disk]
+        if size_field & DATA_UNCOMPRESSED:
+            return raw
+        return self._decompress(raw, self.block_size)
+
+    def _fragment_data(self, node):
+        start, size_field = self._fragment(node.fragment)
+        block = self._data_block(start, size_field, self.block_size)
+        tail = node.size % self.block_size
+        return block[node.fragment_offset:node.fragment_offset + tail]
+
+
+class SquashfsFile(io.RawIOBase):
+    """Lecture séquentielle d'un fichier de l'image, bloc par bloc"""
+
+    def __init__(self, image, node):
+        super().__init__()
+        self.node = node
+        self._blocks = image.iter_blocks(node)
+        self._current = b''
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._pos >= len(self._current):
+            self._current = next(self._blocks, b'')
+            self._pos = 0
+            if not self._current:
+                return 0
+        chunk = self._current[self._pos:self._pos + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[2] not in ('ls', 'cat', 'stat'):
+        print(f"Usage: {sys.argv[0]} <paquet> ls [chemin]")
+        print(f"       {sys.argv[0]} <paquet> cat <chemin>")
+        print(f"       {sys.argv[0]} <paquet> stat <chemin>")
+        return 1
+
+    command = sys.argv[2]
+    path = sys.argv[3] if len(sys.argv) > 3 else ''
+    try:
+        with SquashfsImage(sys.argv[1]) as image:
+            if command == 'ls':
+                for name in image.listdir(path):
+                    print(name)
+            elif command == 'cat':
+                sys.stdout.buffer.write(image.read(path))
+            else:
+                node = image.stat(path, follow_symlinks=False)
+                print(f"mode {stat.filemode(node.mode)} uid {node.uid} gid {node.gid} "
+                      f"taille {node.size} mtime {node.mtime}"
+                      + (f" -> {node.target}" if node.is_symlink() else ""))
+    except (OSError, SquashfsError) as e:
+        print(f"Erreur: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -94,6 +94,42 @@ handle_existing_output() {
 # Fonctions d'extraction
 #======================================
 
+# Paquet multi-volumes (packvolumes.py) : monte la concaténation des volumes
+# avec wgpconcat et affiche le chemin de l'image à extraire (le paquet sinon)
+mount_volumes() {
+    local PACK_FILE="$1"
+    if [ "$(head -c 8 "$PACK_FILE" 2>/dev/null)" != "GBPKVOL1" ]; then
+        echo "$PACK_FILE"
+        return 0
+    fi
+    local volumes=()
+    mapfile -t volumes < <(/usr/share/ublue-os/gablue/scripts/packvolumes.py "$PACK_FILE")
+    if [ ${#volumes[@]} -eq 0 ]; then
+        echo "Volumes du paquet manquants ou incomplets: $PACK_FILE" >&2
+        return 1
+    fi
+    mkdir -p "$TEMP_DIR.volumes"
+    wgpconcat "$TEMP_DIR.volumes" "${volumes[@]}" >&2 || return 1
+    echo "$TEMP_DIR.volumes/image"
+}
+
+# Démonte la concaténation des volumes si elle a été montée
+unmount_volumes() {
+    [ -d "$TEMP_DIR.volumes" ] || return 0
+    fusermount -uz "$TEMP_DIR.volumes" 2>/dev/null || true
+    rmdir "$TEMP_DIR.volumes" 2>/dev/null || true
+}
+
+# Extrait le squashfs du paquet
+run_extractor() {
+    local PACK_IMAGE
+    PACK_IMAGE=$(mount_volumes "$LGPACK_FILE") || return 1
+    local RESULT=0
+    unsquashfs -f -d "$TEMP_DIR" -no-xattrs "$PACK_IMAGE" || RESULT=$?
+    unmount_volumes
+    return $RESULT
+}
+
 # Extrait le squashfs avec interface graphique
 extract_with_dialog() {
     # Fenêtre d'attente avec bouton Annuler
@@ -101,7 +137,7 @@ extract_with_dialog() {
     local KDIALOG_PID=$!
 
     # Lancer unsquashfs en arrière-plan
-    unsquashfs -f -d "$TEMP_DIR" -no-xattrs "$LGPACK_FILE" &
+    run_extractor &
     local UNSQUASH_PID=$!
 
     # Surveiller tant que unsquashfs tourne
@@ -110,6 +146,7 @@ extract_with_dialog() {
         if ! kill -0 $KDIALOG_PID 2>/dev/null; then
             kill -9 $UNSQUASH_PID 2>/dev/null
             pkill -9 unsquashfs 2>/dev/null
+            unmount_volumes
             rm -rf "$TEMP_DIR"
             echo ""
             echo "Extraction annulée"
@@ -128,7 +165,7 @@ extract_with_dialog() {
 # Extrait le squashfs en mode console
 extract_console() {
     echo "Extraction de $LGPACK_FILE..."
-    unsquashfs -f -d "$TEMP_DIR" -no-xattrs "$LGPACK_FILE"
+    run_extractor
 }
 
 # Lance l'extraction
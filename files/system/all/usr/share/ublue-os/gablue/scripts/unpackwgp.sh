@@ -94,14 +94,56 @@ handle_existing_output() {
 # Fonctions d'extraction
 #======================================
 
-# Extrait le squashfs avec interface graphique
+# Paquet multi-volumes (packvolumes.py) : monte la concaténation des volumes
+# avec wgpconcat et affiche le chemin de l'image à extraire (le paquet sinon)
+mount_volumes() {
+    local PACK_FILE="$1"
+    if [ "$(head -c 8 "$PACK_FILE" 2>/dev/null)" != "GBPKVOL1" ]; then
+        echo "$PACK_FILE"
+        return 0
+    fi
+    local volumes=()
+    mapfile -t volumes < <(/usr/share/ublue-os/gablue/scripts/packvolumes.py "$PACK_FILE")
+    if [ ${#volumes[@]} -eq 0 ]; then
+        echo "Volumes du paquet manquants ou incomplets: $PACK_FILE" >&2
+        return 1
+    fi
+    mkdir -p "$TEMP_DIR.volumes"
+    wgpconcat "$TEMP_DIR.volumes" "${volumes[@]}" >&2 || return 1
+    echo "$TEMP_DIR.volumes/image"
+}
+
+# Démonte la concaténation des volumes si elle a été montée
+unmount_volumes() {
+    [ -d "$TEMP_DIR.volumes" ] || return 0
+    fusermount -uz "$TEMP_DIR.volumes" 2>/dev/null || true
+    rmdir "$TEMP_DIR.volumes" 2>/dev/null || true
+}
+
+# Extrait l'image du paquet (squashfs, ou EROFS selon le manifeste)
+run_extractor() {
+    local PACK_FORMAT
+    PACK_FORMAT=$(/usr/share/ublue-os/gablue/scripts/packmanifest.py "$WGPACK_FILE" format 2>/dev/null)
+    local PACK_IMAGE
+    PACK_IMAGE=$(mount_volumes "$WGPACK_FILE") || return 1
+    local RESULT=0
+    if [ "$PACK_FORMAT" = "erofs" ]; then
+        fsck.erofs --extract="$TEMP_DIR" --force --no-xattrs "$PACK_IMAGE" || RESULT=$?
+    else
+        unsquashfs -f -d "$TEMP_DIR" -no-xattrs "$PACK_IMAGE" || RESULT=$?
+    fi
+    unmount_volumes
+    return $RESULT
+}
+
+# Extrait le paquet avec interface graphique
 extract_with_dialog() {
     # Fenêtre d'attente avec bouton Annuler
     kdialog --msgbox "Extraction en cours...\nAppuyez sur Annuler pour arrêter" --ok-label "Annuler" >/dev/null &
     local KDIALOG_PID=$!
 
-    # Lancer unsquashfs en arrière-plan
-    unsquashfs -f -d "$TEMP_DIR" -no-xattrs "$WGPACK_FILE" &
+    # Lancer l'extraction en arrière-plan
+    run_extractor &
     local UNSQUASH_PID=$!
 
     # Surveiller tant que unsquashfs tourne
@@ -110,6 +152,8 @@ extract_with_dialog() {
         if ! kill -0 $KDIALOG_PID 2>/dev/null; then
             kill -9 $UNSQUASH_PID 2>/dev/null
             pkill -9 unsquashfs 2>/dev/null
+            pkill -9 fsck.erofs 2>/dev/null
+            unmount_volumes
             rm -rf "$TEMP_DIR"
             echo ""
             echo "Extraction annulée"
@@ -125,10 +169,10 @@ extract_with_dialog() {
     wait $UNSQUASH_PID
 }
 
-# Extrait le squashfs en mode console
+# Extrait le paquet en mode console
 extract_console() {
     echo "Extraction de $WGPACK_FILE..."
-    unsquashfs -f -d "$TEMP_DIR" -no-xattrs "$WGPACK_FILE"
+    run_extractor
 }
 
 # Lance l'extraction
@@ -155,6 +199,13 @@ extract_wgp() {
     # Renommer le dossier temporaire en dossier final
     mv "$TEMP_DIR" "$OUTPUT_DIR"
 
+    # Paquet mince : recopier les gros fichiers depuis le magasin partagé de la bibliothèque
+    local PACK_DEDUPE="/usr/share/ublue-os/gablue/scripts/packdedupe.py"
+    if [ -x "$PACK_DEDUPE" ] && ! "$PACK_DEDUPE" materialize "$OUTPUT_DIR" "$WGPACK_FILE"; then
+        echo "Erreur lors de la restauration des fichiers du magasin partagé"
+        exit 1
+    fi
+
     # Lire le fichier .gamename pour obtenir le nom interne du jeu
     local GAMENAME_FILE="$OUTPUT_DIR/.gamename"
     if [ -f "$GAMENAME_FILE" ]; then
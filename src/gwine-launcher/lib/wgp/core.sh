@@ -19,8 +19,13 @@ init_wgp_variables() {
 
     local GAMENAME_CONTENT
     local UNSQUASHFS_BIN
-    UNSQUASHFS_BIN=$(get_system_tool unsquashfs)
-    GAMENAME_CONTENT=$("$UNSQUASHFS_BIN" -cat "$WGPACK_FILE" ".gamename" 2>/dev/null)
+    local PACK_MANIFEST="/usr/share/ublue-os/gablue/scripts/packmanifest.py"
+    # Manifeste en fin de fichier (une lecture), sinon .gamename via unsquashfs (anciens packs)
+    if [ ! -x "$PACK_MANIFEST" ] || \
+       ! GAMENAME_CONTENT=$("$PACK_MANIFEST" "$WGPACK_FILE" gamename 2>/dev/null); then
+        UNSQUASHFS_BIN=$(get_system_tool unsquashfs)
+        GAMENAME_CONTENT=$("$UNSQUASHFS_BIN" -cat "$WGPACK_FILE" ".gamename" 2>/dev/null)
+    fi
     if [ -n "$GAMENAME_CONTENT" ]; then
         GAME_INTERNAL_NAME="$GAMENAME_CONTENT"
         GAME_INTERNAL_NAME="${GAME_INTERNAL_NAME%.}"
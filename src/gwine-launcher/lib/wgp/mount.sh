@@ -181,12 +181,26 @@ mount_wgp() {
         unmount_overlay "$MOUNT_DIR" -f -l
     fi
 
-    local SQUASHFUSE_BIN
-    SQUASHFUSE_BIN=$(get_system_tool squashfuse)
+    # Format de l'image (manifeste) : squashfs par défaut, EROFS en option
+    local PACK_MANIFEST="/usr/share/ublue-os/gablue/scripts/packmanifest.py"
+    local PACK_FORMAT=""
+    [ -x "$PACK_MANIFEST" ] && PACK_FORMAT=$("$PACK_MANIFEST" "$WGPACK_FILE" format 2>/dev/null)
+    local MOUNT_BIN
+    local MOUNT_OPTS=()
+    if [ "$PACK_FORMAT" = "erofs" ]; then
+        MOUNT_BIN=$(get_system_tool erofsfuse)
+    else
+        MOUNT_BIN=$(get_system_tool squashfuse)
+        MOUNT_OPTS=(-r)
+    fi
 
+    # Paquet découpé en volumes : l'image est la concaténation exposée par wgpconcat
+    local PACK_IMAGE="$WGPACK_FILE"
+    mount_wgp_volumes
+    
     ensure_dir -s "$MOUNT_DIR"
     echo "Montage de $WGPACK_FILE sur $MOUNT_DIR..."
-    "$SQUASHFUSE_BIN" -r "$WGPACK_FILE" "$MOUNT_DIR"
+    "$MOUNT_BIN" "${MOUNT_OPTS[@]}" "$PACK_IMAGE" "$MOUNT_DIR"
 
     if [ $? -ne 0 ]; then
         echo "Échec du montage, nettoyage forcé du point de montage..."
@@ -196,6 +210,7 @@ mount_wgp() {
         # Maintenant on peut tuer les processus FUSE
         pkill -9 -f "squashfuse.*$(basename "$WGPACK_NAME")" 2>/dev/null || true
         pkill -9 -f "squashfuse.*$MOUNT_DIR" 2>/dev/null || true
+        pkill -9 -f "erofsfuse.*$MOUNT_DIR" 2>/dev/null || true
         sleep 0.3
         # Supprimer le répertoire
         rmdir "$MOUNT_DIR" 2>/dev/null || rm -rf "$MOUNT_DIR" 2>/dev/null || true
@@ -207,19 +222,96 @@ mount_wgp() {
         # Réessayer le montage une fois
         ensure_dir -s "$MOUNT_DIR"
         echo "Nouvelle tentative de montage sur $MOUNT_DIR..."
-        "$SQUASHFUSE_BIN" -r "$WGPACK_FILE" "$MOUNT_DIR"
+        "$MOUNT_BIN" "${MOUNT_OPTS[@]}" "$PACK_IMAGE" "$MOUNT_DIR"
         
         if [ $? -ne 0 ]; then
             error_exit "Erreur lors du montage du squashfs"
         fi
     fi
     
+    mount_wgp_store
+    
     echo "$$:$(date +%s)" > "$LOCK_FILE"
     
     # Supprimer le marqueur de relancement après montage réussi
     rm -f "$GWINE_LOCK_DIR/wgp-relaunch-$WGPACK_NAME" 2>/dev/null || true
 }
 
+# =============================================================================
+# Paquets multi-volumes (voir packvolumes.py)
+# =============================================================================
+
+mount_wgp_volumes() {
+    # Jeu.wgp est un index GBPKVOL1 : les volumes Jeu.wgp.001, .002... sont
+    # concaténés par wgpconcat (FUSE) dans $MOUNT_DIR.volumes/image
+    [ "$(head -c 8 "$WGPACK_FILE" 2>/dev/null)" = "GBPKVOL1" ] || return 0
+    
+    local PACK_VOLUMES="/usr/share/ublue-os/gablue/scripts/packvolumes.py"
+    local VOLUMES_DIR="$MOUNT_DIR.volumes"
+    local volumes=()
+    mapfile -t volumes < <("$PACK_VOLUMES" "$WGPACK_FILE")
+    [ ${#volumes[@]} -gt 0 ] || error_exit "Volumes du paquet manquants ou incomplets: $WGPACK_FILE"
+    
+    local WGPCONCAT_BIN
+    WGPCONCAT_BIN=$(get_system_tool wgpconcat)
+    fusermount -uz "$VOLUMES_DIR" 2>/dev/null || true
+    ensure_dir -s "$VOLUMES_DIR"
+    echo "Assemblage de ${#volumes[@]} volumes..."
+    "$WGPCONCAT_BIN" "$VOLUMES_DIR" "${volumes[@]}" || error_exit "Erreur lors de l'assemblage des volumes"
+    PACK_IMAGE="$VOLUMES_DIR/image"
+}
+
+# =============================================================================
+# Magasin de contenu partagé (paquets minces, voir packdedupe.py)
+# =============================================================================
+
+mount_wgp_store() {
+    # Les gros fichiers d'un paquet mince sont des liens vers /tmp/wgp-store/<id>/<empreinte> :
+    # le magasin de la bibliothèque doit être monté à cet endroit (/tmp = SHARED_TMP_DIR dans bwrap)
+    local PACK_MANIFEST="/usr/share/ublue-os/gablue/scripts/packmanifest.py"
+    [ -x "$PACK_MANIFEST" ] || return 0
+    
+    local store_id store_path
+    store_id=$("$PACK_MANIFEST" "$WGPACK_FILE" store_id 2>/dev/null) || return 0
+    [ -n "$store_id" ] || return 0
+    store_path=$("$PACK_MANIFEST" "$WGPACK_FILE" store_path 2>/dev/null)
+    
+    local store_file
+    store_file="$(dirname "$WGPACK_FILE")/$store_path"
+    [ -f "$store_file" ] || error_exit "Magasin de contenu introuvable: $store_file"
+    
+    # Un montage par version du magasin (inode) : un jeu déjà lancé garde la sienne,
+    # le lien wgp-store/<id> désigne toujours la plus récente (qui contient les précédentes)
+    local version mounts_dir store_mount
+    version=$(stat -c %i "$store_file")
+    mounts_dir="$SHARED_TMP_DIR/wgp-store-mounts"
+    store_mount="$mounts_dir/$store_id-$version"
+    
+    if ! mountpoint -q "$store_mount" 2>/dev/null || ! ls "$store_mount" >/dev/null 2>&1; then
+        fusermount -uz "$store_mount" 2>/dev/null || true
+        ensure_dir -s "$store_mount"
+        echo "Montage du magasin partagé $store_file..."
+        local SQUASHFUSE_BIN
+        SQUASHFUSE_BIN=$(get_system_tool squashfuse)
+        "$SQUASHFUSE_BIN" -r "$store_file" "$store_mount" || \
+            error_exit "Erreur lors du montage du magasin partagé"
+    fi
+    ensure_dir -s "$SHARED_TMP_DIR/wgp-store"
+    ln -sfn "../wgp-store-mounts/$store_id-$version" "$SHARED_TMP_DIR/wgp-store/$store_id"
+    
+    # Hors bac à sable, /tmp/wgp-store/<id> mène au même montage
+    mkdir -p /tmp/wgp-store 2>/dev/null && \
+        ln -sfn "$SHARED_TMP_DIR/wgp-store/$store_id" "/tmp/wgp-store/$store_id" 2>/dev/null || true
+    
+    # Anciennes versions : démontées si plus aucun jeu ne les utilise (échec sinon)
+    local old_mount
+    for old_mount in "$mounts_dir/$store_id"-*; do
+        [ "$old_mount" = "$store_mount" ] && continue
+        [ -d "$old_mount" ] || continue
+        fusermount -u "$old_mount" 2>/dev/null && rmdir "$old_mount" 2>/dev/null || true
+    done
+}
+
 # =============================================================================
 # Démontage et nettoyage du pack WGP
 # =============================================================================
@@ -248,6 +340,7 @@ cleanup_wgp() {
         # Tuer les processus FUSE
         pkill -9 -f "squashfuse.*$WGPACK_NAME" 2>/dev/null || true
         pkill -9 -f "squashfuse.*$MOUNT_DIR" 2>/dev/null || true
+        pkill -9 -f "erofsfuse.*$MOUNT_DIR" 2>/dev/null || true
         sleep 0.3
         # Forcer le démontage
         umount -l "$MOUNT_DIR" 2>/dev/null || true
@@ -258,5 +351,11 @@ cleanup_wgp() {
         rmdir "$MOUNT_DIR" 2>/dev/null || rm -rf "$MOUNT_DIR" 2>/dev/null || true
     fi
     
+    # Concaténation des volumes (après l'image montée par-dessus)
+    if [ -d "$MOUNT_DIR.volumes" ]; then
+        fusermount -uz "$MOUNT_DIR.volumes" 2>/dev/null || umount -l "$MOUNT_DIR.volumes" 2>/dev/null || true
+        rmdir "$MOUNT_DIR.volumes" 2>/dev/null || true
+    fi
+    
     rm -f "$GWINE_LOCK_DIR/wgp-lock-$WGPACK_NAME" 2>/dev/null || true
 }
@@ -0,0 +1,237 @@
+/*
+ * wgpconcat - Expose les volumes d'un paquet WGP/LGP multi-volumes comme un
+ *             seul fichier image (FUSE, lecture seule)
+ *
+ * Usage : wgpconcat <point_de_montage> <volume1> [volume2...] [-f]
+ *
+ * Comportement :
+ *   - <point_de_montage>/image est la concatenation des volumes, dans l'ordre
+ *     (monte ensuite par squashfuse ou erofsfuse comme un paquet ordinaire)
+ *   - Les volumes sont ouverts avant le passage en arriere-plan : ils peuvent
+ *     etre donnes en chemins relatifs
+ *   - Boucle FUSE multi-thread : les lectures independantes (lecture anticipee
+ *     du noyau, threads de squashfuse) sont servies en parallele
+ *   - Volumes sur des disques differents : une lecture qui chevauche plusieurs
+ *     volumes est decoupee et chaque morceau est lu par son propre thread, et
+ *     la fin d'un volume lu sequentiellement declenche la lecture anticipee du
+ *     debut du suivant (posix_fadvise WILLNEED) sur son disque
+ *   - -f : reste au premier plan (debogage)
+ */
+
+#define _GNU_SOURCE
+#define FUSE_USE_VERSION 31
+#include <errno.h>
+#include <fcntl.h>
+#include <fuse.h>
+#include <pthread.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/stat.h>
+#include <time.h>
+#include <unistd.h>
+
+#define IMAGE_NAME "image"
+#define IMAGE_PATH "/" IMAGE_NAME
+#define MAX_VOLUMES 999
+#define PREFETCH_WINDOW (8 * 1024 * 1024)
+
+struct volume {
+    int fd;
+    off_t start;  /* Position du volume dans l'image */
+    off_t size;
+    dev_t dev;
+};
+
+struct piece {
+    const struct volume *vol;
+    char *buf;
+    size_t size;
+    off_t offset;  /* Position dans le volume */
+    ssize_t result;
+};
+
+static struct volume *volumes;
+static int nvolumes;
+static off_t total_size;
+static int spread;  /* Volumes repartis sur plusieurs disques */
+static time_t mount_time;
+
+static void die(const char *msg) {
+    fprintf(stderr, "%s\n", msg);
+    exit(1);
+}
+
+/* Volume contenant une position de l'image (recherche dichotomique) */
+static int find_volume(off_t offset) {
+    int lo = 0, hi = nvolumes - 1;
+    while (lo < hi) {
+        int mid = (lo + hi + 1) / 2;
+        if (volumes[mid].start <= offset)
+            lo = mid;
+        else
+            hi = mid - 1;
+    }
+    return lo;
+}
+
+/* pread complet (reprend apres EINTR ou lecture partielle) */
+static ssize_t pread_full(int fd, char *buf, size_t size, off_t offset) {
+    size_t done = 0;
+    while (done < size) {
+        ssize_t n = pread(fd, buf + done, size - done, offset + done);
+        if (n < 0) {
+            if (errno == EINTR) continue;
+            return -errno;
+        }
+        if (n == 0) break;
+        done += n;
+    }
+    return done;
+}
+
+static void *read_piece(void *arg) {
+    struct piece *p = arg;
+    p->result = pread_full(p->vol->fd, p->buf, p->size, p->offset);
+    return NULL;
+}
+
+/* Lecture anticipee du debut du volume suivant quand on approche de la fin */
+static void prefetch_next(int index, off_t offset, size_t size) {
+    const struct volume *vol = &volumes[index];
+    if (index + 1 >= nvolumes) return;
+    if (offset + (off_t)size + PREFETCH_WINDOW < vol->size) return;
+    posix_fadvise(volumes[index + 1].fd, 0, PREFETCH_WINDOW, POSIX_FADV_WILLNEED);
+}
+
+static int concat_getattr(const char *path, struct stat *st, struct fuse_file_info *fi) {
+    (void)fi;
+    memset(st, 0, sizeof(*st));
+    st->st_uid = getuid();
+    st->st_gid = getgid();
+    st->st_mtime = st->st_atime = st->st_ctime = mount_time;
+    if (strcmp(path, "/") == 0) {
+        st->st_mode = S_IFDIR | 0555;
+        st->st_nlink = 2;
+        return 0;
+    }
+    if (strcmp(path, IMAGE_PATH) == 0) {
+        st->st_mode = S_IFREG | 0444;
+        st->st_nlink = 1;
+        st->st_size = total_size;
+        st->st_blocks = (total_size + 511) / 512;
+        return 0;
+    }
+    return -ENOENT;
+}
+
+static int concat_readdir(const char *path, void *buf, fuse_fill_dir_t filler, off_t offset,
+                          struct fuse_file_info *fi, enum fuse_readdir_flags flags) {
+    (void)offset; (void)fi; (void)flags;
+    if (strcmp(path, "/") != 0) return -ENOENT;
+    filler(buf, ".", NULL, 0, 0);
+    filler(buf, "..", NULL, 0, 0);
+    filler(buf, IMAGE_NAME, NULL, 0, 0);
+    return 0;
+}
+
+static int concat_open(const char *path, struct fuse_file_info *fi) {
+    if (strcmp(path, IMAGE_PATH) != 0) return -ENOENT;
+    if ((fi->flags & O_ACCMODE) != O_RDONLY) return -EACCES;
+    fi->keep_cache = 1;  /* Contenu immuable : garder le cache de pages entre ouvertures */
+    return 0;
+}
+
+static int concat_read(const char *path, char *buf, size_t size, off_t offset,
+                       struct fuse_file_info *fi) {
+    (void)path; (void)fi;
+    if (offset >= total_size) return 0;
+    if (offset + (off_t)size > total_size) size = total_size - offset;
+
+    /* Decoupage de la lecture par volume */
+    struct piece pieces[8];
+    int npieces = 0;
+    int index = find_volume(offset);
+    size_t done = 0;
+    while (done < size && index < nvolumes) {
+        const struct volume *vol = &volumes[index];
+        off_t local = offset + done - vol->start;
+        size_t count = size - done;
+        if (local + (off_t)count > vol->size) count = vol->size - local;
+        if (npieces == (int)(sizeof(pieces) / sizeof(pieces[0]))) break;
+        pieces[npieces++] = (struct piece){vol, buf + done, count, local, 0};
+        prefetch_next(index, local, count);
+        done += count;
+        index++;
+    }
+
+    pthread_t threads[8];
+    int threaded[8] = {0};
+    if (spread && npieces > 1) {
+        for (int i = 1; i < npieces; i++)
+            threaded[i] = pthread_create(&threads[i], NULL, read_piece, &pieces[i]) == 0;
+    }
+    for (int i = 0; i < npieces; i++) {
+        if (!threaded[i]) read_piece(&pieces[i]);
+    }
+    for (int i = 1; i < npieces; i++) {
+        if (threaded[i]) pthread_join(threads[i], NULL);
+    }
+
+    ssize_t total = 0;
+    for (int i = 0; i < npieces; i++) {
+        if (pieces[i].result < 0) return pieces[i].result;
+        total += pieces[i].result;
+        if ((size_t)pieces[i].result < pieces[i].size) break;  /* Volume tronque */
+    }
+    return total;
+}
+
+static const struct fuse_operations concat_ops = {
+    .getattr = concat_getattr,
+    .readdir = concat_readdir,
+    .open = concat_open,
+    .read = concat_read,
+};
+
+int main(int argc, char **argv) {
+    int foreground = 0;
+    const char *mountpoint = NULL;
+
+    volumes = calloc(argc, sizeof(*volumes));
+    if (!volumes) die("Erreur: memoire insuffisante");
+
+    for (int i = 1; i < argc; i++) {
+        if (strcmp(argv[i], "-f") == 0) {
+            foreground = 1;
+        } else if (!mountpoint) {
+            mountpoint = argv[i];
+        } else {
+            if (nvolumes == MAX_VOLUMES) die("Erreur: trop de volumes");
+            struct volume *vol = &volumes[nvolumes];
+            struct stat st;
+            vol->fd = open(argv[i], O_RDONLY | O_CLOEXEC);
+            if (vol->fd == -1 || fstat(vol->fd, &st) == -1) {
+                fprintf(stderr, "Erreur ouverture %s: %s\n", argv[i], strerror(errno));
+                return 1;
+            }
+            vol->start = total_size;
+            vol->size = st.st_size;
+            vol->dev = st.st_dev;
+            if (nvolumes > 0 && vol->dev != volumes[0].dev) spread = 1;
+            posix_fadvise(vol->fd, 0, 0, POSIX_FADV_RANDOM);
+            total_size += st.st_size;
+            nvolumes++;
+        }
+    }
+    if (!mountpoint || nvolumes == 0) {
+        fprintf(stderr, "Usage: %s <point_de_montage> <volume1> [volume2...] [-f]\n", argv[0]);
+        return 1;
+    }
+    mount_time = time(NULL);
+
+    char *fuse_argv[] = {argv[0], (char *)mountpoint, "-o", "ro,default_permissions,fsname=wgpconcat",
+                         foreground ? "-f" : NULL, NULL};
+    int fuse_argc = foreground ? 5 : 4;
+    return fuse_main(fuse_argc, fuse_argv, &concat_ops, NULL);
+}